@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Analysis Daemon - Warm Model over Local HTTP / Unix Socket
+==========================================================
+
+Keeps one initialized NetworkBehaviorParser (domain categories, ML stack,
+unpickled model) in memory and serves analyses over HTTP/1.1 keep-alive,
+on a TCP port or a Unix domain socket, so callers such as n8n workflows
+pay milliseconds per request instead of a full process start.
+
+Endpoints:
+    POST /analyze        {"logs": [...], "window_minutes": 30}  (or a bare list of logs) -> result
+    POST /analyze/batch  {"windows": [[...], {"logs": [...]}, ...]}                     -> {"results": [...]}
+    GET  /metrics        request counters and latency histograms (JSON)
+    GET  /health         model status
+
+At most max_concurrency analyses run at once; a request waits for a slot
+within its timeout budget, then gets 503 (no slot) or 504 (analysis still
+running when the budget ran out). With batch_wait_ms > 0, concurrent
+analyses share batched model inference (see inference_batcher).
+
+Usage:
+    python analysis_daemon.py [127.0.0.1:8765 | /path/to/insightnet.sock] [max_concurrency] [timeout_seconds] [batch_wait_ms]
+"""
+
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Latency histogram bucket upper bounds in milliseconds (last bucket is +inf)
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+
+class DaemonOverloaded(Exception):
+    """No analysis slot became free within the request timeout"""
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (constant memory)"""
+
+    def __init__(self, buckets_ms=LATENCY_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float):
+        index = len(self.buckets_ms)
+        for i, bound in enumerate(self.buckets_ms):
+            if ms <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return float(self.buckets_ms[i]) if i < len(self.buckets_ms) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> Dict:
+        cumulative = 0
+        buckets = {}
+        for bound, n in zip(list(self.buckets_ms) + ['+Inf'], self.counts):
+            cumulative += n
+            buckets[f"le_{bound}"] = cumulative
+        return {
+            'count': self.count,
+            'mean_ms': self.total_ms / self.count if self.count else None,
+            'max_ms': self.max_ms,
+            'p50_ms': self.quantile(0.5),
+            'p95_ms': self.quantile(0.95),
+            'p99_ms': self.quantile(0.99),
+            'buckets': buckets,
+        }
+
+
+def _json_default(value):
+    """NumPy scalars -> Python numbers, anything else -> str (as save_results does)"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class AnalysisDaemon:
+    """Bounded-concurrency front end for a warm NetworkBehaviorParser"""
+
+    def __init__(self, parser, max_concurrency: int = 4, request_timeout: float = 30.0):
+        self.parser = parser
+        self.max_concurrency = max_concurrency
+        self.request_timeout = request_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='analysis')
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._server = None
+        self._unix_socket = None
+        self.started_at = time.time()
+
+        self.in_flight = 0
+        self.counters = {'requests': 0, 'rejected': 0, 'timeouts': 0, 'errors': 0, 'bad_requests': 0}
+        self.latency = {'/analyze': LatencyHistogram(), '/analyze/batch': LatencyHistogram()}
+
+    def run(self, fn, *args):
+        """Run fn in the analysis pool within the request timeout
+
+        The slot is held until fn finishes, even after a 504, so the pool never
+        runs more than max_concurrency analyses.
+        """
+        deadline = time.monotonic() + self.request_timeout
+        if not self._slots.acquire(timeout=self.request_timeout):
+            raise DaemonOverloaded()
+        with self._lock:
+            self.in_flight += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future.result(timeout=max(deadline - time.monotonic(), 0.0))
+
+    def _release(self, _future):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def analyze(self, payload) -> Dict:
+        logs, options = self._window(payload)
+        return self.run(self.parser.analyze_logs, logs, *options)
+
+    def analyze_batch(self, payload) -> Dict:
+        windows = payload.get('windows') if isinstance(payload, dict) else payload
+        if not isinstance(windows, list):
+            raise ValueError("expected {\"windows\": [...]}")
+        parsed = [self._window(window) for window in windows]
+        results = self.run(lambda: [self.parser.analyze_logs(logs, *options) for logs, options in parsed])
+        return {'results': results}
+
+    @staticmethod
+    def _window(payload):
+        """(logs, (window_minutes, need_probabilities)) from a request body"""
+        if isinstance(payload, list):
+            logs, options = payload, (30, True)
+        elif isinstance(payload, dict) and isinstance(payload.get('logs'), list):
+            logs, options = payload['logs'], (int(payload.get('window_minutes', 30)),
+                                              bool(payload.get('need_probabilities', True)))
+        else:
+            raise ValueError("expected a list of logs or {\"logs\": [...]}")
+        if not all(isinstance(log, dict) for log in logs):
+            raise ValueError("every log must be a JSON object")
+        return logs, options
+
+    def count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def observe(self, path: str, seconds: float):
+        with self._lock:
+            self.latency[path].observe(seconds * 1000)
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            metrics = {
+                'uptime_seconds': time.time() - self.started_at,
+                'max_concurrency': self.max_concurrency,
+                'request_timeout': self.request_timeout,
+                'in_flight': self.in_flight,
+                **self.counters,
+                'latency': {path: histogram.to_dict() for path, histogram in self.latency.items()},
+            }
+        classifier = self.parser.classifier
+        metrics['model_version'] = classifier.model_version
+        metrics['inference_paths'] = classifier.inference_path_stats()
+        if self.parser.micro_batcher:
+            metrics['micro_batching'] = self.parser.micro_batcher.stats()
+        if self.parser.results_sink:
+            metrics['results_sink'] = self.parser.results_sink.stats()
+        return metrics
+
+    def health(self) -> Dict:
+        classifier = self.parser.classifier
+        return {
+            'status': 'ok' if classifier.is_trained else 'training',
+            'model_version': classifier.model_version,
+            'provisional': not classifier.is_trained,
+        }
+
+    def serve(self, address: str = '127.0.0.1:8765'):
+        """Serve until shutdown(); address is host:port or a Unix socket path"""
+        if '/' in address or address.endswith('.sock'):
+            if os.path.exists(address):
+                os.remove(address)  # Stale socket from a previous run
+            self._server = _UnixHTTPServer(address, _Handler)
+            self._unix_socket = address
+        else:
+            host, _, port = address.rpartition(':')
+            self._server = ThreadingHTTPServer((host or '127.0.0.1', int(port)), _Handler)
+        self._server.daemon_threads = True
+        self._server.analysis_daemon = self
+        logger.info(f"Analysis daemon listening on {address} "
+                    f"(max {self.max_concurrency} concurrent, timeout {self.request_timeout}s)")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if self._unix_socket and os.path.exists(self._unix_socket):
+                os.remove(self._unix_socket)
+
+    def shutdown(self):
+        """Stop serving (callable from another thread or a signal handler)"""
+        if self._server:
+            threading.Thread(target=self._server.shutdown, daemon=True).start()
+        self._executor.shutdown(wait=False)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """HTTP over a Unix domain socket"""
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive: no connection setup per request
+
+    def setup(self):
+        # Headers and body go out as separate writes: without TCP_NODELAY, Nagle + delayed ACK add ~40 ms
+        self.disable_nagle_algorithm = self.request.family != socket.AF_UNIX
+        super().setup()
+
+    def address_string(self):
+        # Unix socket peers have no address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+    def _send(self, status: int, body: Dict):
+        data = json.dumps(body, default=_json_default).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        daemon = self.server.analysis_daemon
+        if self.path == '/metrics':
+            self._send(200, daemon.metrics())
+        elif self.path == '/health':
+            self._send(200, daemon.health())
+        else:
+            self._send(404, {'error': f"unknown path {self.path}"})
+
+    def do_POST(self):
+        daemon = self.server.analysis_daemon
+        header = self.headers.get('Content-Length')
+        if header is None:
+            self.close_connection = True
+            self._send(411, {'error': "Content-Length required"})
+            return
+        try:
+            length = int(header)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True  # Body length unknown, so the stream can't be reused
+            self._send(400, {'error': f"invalid Content-Length {header!r}"})
+            return
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True  # Body is not read, so the stream can't be reused
+            self._send(413, {'error': f"request body over {MAX_BODY_BYTES} bytes"})
+            return
+        body = self.rfile.read(length)
+
+        handlers = {'/analyze': daemon.analyze, '/analyze/batch': daemon.analyze_batch}
+        handler = handlers.get(self.path)
+        if handler is None:
+            self._send(404, {'error': f"unknown path {self.path}"})
+            return
+
+        start = time.perf_counter()
+        daemon.count('requests')
+        try:
+            result = handler(json.loads(body or b'null'))
+        except (ValueError, TypeError) as e:
+            daemon.count('bad_requests')
+            self._send(400, {'error': str(e)})
+            return
+        except DaemonOverloaded:
+            daemon.count('rejected')
+            self._send(503, {'error': 'all analysis slots busy'})
+            return
+        except FutureTimeoutError:
+            daemon.count('timeouts')
+            self._send(504, {'error': f"analysis exceeded {daemon.request_timeout}s"})
+            return
+        except Exception as e:
+            daemon.count('errors')
+            logger.error(f"Analysis request failed: {e}")
+            self._send(500, {'error': str(e)})
+            return
+
+        daemon.observe(self.path, time.perf_counter() - start)
+        self._send(200, result)
+
+
+def main():
+    """Command-line entry point"""
+    from main import NetworkBehaviorParser, configure_logging
+
+    if len(sys.argv) > 1 and sys.argv[1] in ['--help', '-h', 'help']:
+        print("Usage: python analysis_daemon.py [host:port | socket_path] [max_concurrency] [timeout_seconds] [batch_wait_ms]")
+        print("\nExamples:")
+        print("  python analysis_daemon.py 127.0.0.1:8765 4 30")
+        print("  python analysis_daemon.py 127.0.0.1:8765 32 30 10   # micro-batch up to 10 ms")
+        print("  python analysis_daemon.py /tmp/insightnet.sock")
+        return
+
+    address = sys.argv[1] if len(sys.argv) > 1 else '127.0.0.1:8765'
+    max_concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    timeout = float(sys.argv[3]) if len(sys.argv) > 3 else 30.0
+    batch_wait_ms = float(sys.argv[4]) if len(sys.argv) > 4 else 0.0
+
+    configure_logging('analysis_daemon.log')
+    parser = NetworkBehaviorParser(micro_batch_max_wait_ms=batch_wait_ms,
+                                   micro_batch_max_rows=max(max_concurrency, 1))
+    parser.initialize()
+    daemon = AnalysisDaemon(parser, max_concurrency, timeout)
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: daemon.shutdown())
+    print(f"🚀 InsightNet daemon serving on {address} (Ctrl+C to stop)")
+    try:
+        daemon.serve(address)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        parser.shutdown()
+        print("\n✅ Daemon stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Shared pytest fixtures: run from this directory and train one small model per session"""
+
+import logging
+import os
+
+import pytest
+
+from enhanced_classifier import EnhancedBehaviorClassifier
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture(autouse=True)
+def package_dir(monkeypatch):
+    """Default paths (training_data.json, domain_categories.json) resolve against this directory"""
+    monkeypatch.chdir(HERE)
+
+
+@pytest.fixture(scope='session')
+def trained_model_file(tmp_path_factory):
+    """A model freshly trained with train_with_validation (held-out split recorded)"""
+    previous_cwd = os.getcwd()
+    os.chdir(HERE)
+    logging.disable(logging.INFO)
+    try:
+        classifier = EnhancedBehaviorClassifier()
+        classifier.train_with_validation()
+        path = str(tmp_path_factory.mktemp('model') / 'enhanced_behavior_model.pkl')
+        classifier.save_model(path)
+    finally:
+        logging.disable(logging.NOTSET)
+        os.chdir(previous_cwd)
+    return path
+
+
+@pytest.fixture
+def trained_classifier(trained_model_file):
+    """A private copy of the session model"""
+    classifier = EnhancedBehaviorClassifier()
+    classifier.load_model(trained_model_file)
+    return classifier
@@ -20,7 +20,6 @@ Author: Network Behavior Analysis System
 Date: August 2025
 """
 
-import pandas as pd
 import json
 import hashlib
 import sys
@@ -47,6 +46,9 @@ def convert_csv_to_networklog_json(csv_file, output_file='networkLogs.json'):
         print(f"❌ Error: File {csv_file} not found!")
         return None
     
+    # pandas is imported here so `--help` and importers of detect_column_mapping start fast
+    import pandas as pd
+    
     try:
         # Read CSV file
         print(f"📁 Reading CSV file...")
@@ -184,6 +186,8 @@ def get_column_value(row, column_name, default=''):
     """
     Safely get value from row with fallback to default
     """
+    import pandas as pd
+    
     if column_name and column_name in row:
         value = row[column_name]
         return str(value) if pd.notna(value) else default
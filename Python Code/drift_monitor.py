@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Bounded-Memory Feature Drift Monitoring
+=======================================
+
+KLL quantile sketches (Karnin, Lang & Liberty, 2016) summarize the
+distribution of every model feature in fixed memory. A reference sketch is
+built from the training rows and saved with the model; a live sketch is
+fed every scored window. Comparing the two gives a per-feature PSI and
+Kolmogorov-Smirnov report without keeping any raw feature history.
+
+All features of a window arrive together, so one sketch holds every
+feature as a column: levels fill and compact in lockstep and each update
+is a single row append.
+"""
+
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Rules of thumb: PSI > 0.2 is a significant shift, > 0.1 worth watching
+PSI_THRESHOLD = 0.2
+KS_THRESHOLD = 0.1
+
+
+class KLLSketch:
+    """Column-wise KLL sketch: approximate quantiles of n_features streams in O(k) memory"""
+
+    def __init__(self, n_features: int, k: int = 200, c: float = 2 / 3, seed: int = 42):
+        self.n_features = n_features
+        self.k = k
+        self.c = c
+        self.n = 0
+        self._buffer: List[np.ndarray] = []  # Level 0 rows, appended one window at a time
+        self.levels: List[np.ndarray] = [np.empty((0, n_features))]  # Compacted items per level
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        """KLL capacity: k at the top level, shrinking geometrically towards level 0"""
+        return max(2, int(np.ceil(self.k * self.c ** (len(self.levels) - 1 - level))))
+
+    def update(self, x):
+        """Add one row (one value per feature)"""
+        self._buffer.append(np.asarray(x, dtype=float).ravel())
+        self.n += 1
+        if len(self._buffer) + len(self.levels[0]) >= self._capacity(0):
+            self._compress()
+
+    def update_batch(self, X) -> "KLLSketch":
+        """Add many rows"""
+        for row in np.asarray(X, dtype=float):
+            self.update(row)
+        return self
+
+    def _compress(self):
+        """Compact every full level: sort, keep every other item, promote with double weight"""
+        self.levels[0] = np.vstack([self.levels[0]] + self._buffer) if self._buffer else self.levels[0]
+        self._buffer = []
+        for level in range(len(self.levels)):
+            if len(self.levels[level]) < self._capacity(level):
+                continue
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty((0, self.n_features)))
+
+            items = np.sort(self.levels[level], axis=0)
+            odd = len(items) % 2
+            offset = int(self._rng.integers(2))
+            promoted = items[offset:len(items) - odd:2]
+            self.levels[level] = items[len(items) - odd:]  # An odd leftover stays at this level
+            self.levels[level + 1] = np.vstack([self.levels[level + 1], promoted])
+
+    def _weighted_items(self):
+        """All retained items with their weights (2^level)"""
+        levels = list(self.levels)
+        if self._buffer:
+            levels[0] = np.vstack([levels[0]] + self._buffer)
+        items = np.vstack(levels)
+        weights = np.concatenate([np.full(len(level_items), 2.0 ** level)
+                                  for level, level_items in enumerate(levels)])
+        return items, weights
+
+    def cdf(self, values: np.ndarray, feature: int) -> np.ndarray:
+        """Approximate P(X <= value) for one feature"""
+        items, weights = self._weighted_items()
+        if len(items) == 0:
+            return np.zeros(len(values))
+        order = np.argsort(items[:, feature], kind='stable')
+        sorted_items = items[order, feature]
+        cumulative = np.cumsum(weights[order])
+        positions = np.searchsorted(sorted_items, values, side='right')
+        return np.where(positions > 0, cumulative[np.maximum(positions - 1, 0)], 0.0) / cumulative[-1]
+
+    def quantiles(self, qs: Iterable[float], feature: int) -> np.ndarray:
+        """Approximate quantiles of one feature"""
+        items, weights = self._weighted_items()
+        order = np.argsort(items[:, feature], kind='stable')
+        cumulative = np.cumsum(weights[order]) / weights.sum()
+        positions = np.searchsorted(cumulative, np.asarray(list(qs)), side='left')
+        return items[order, feature][np.minimum(positions, len(order) - 1)]
+
+    def values(self, feature: int) -> np.ndarray:
+        """Retained items of one feature (candidate points for the KS statistic)"""
+        items, _ = self._weighted_items()
+        return items[:, feature]
+
+    def retained(self) -> int:
+        """Rows currently held (memory is retained x n_features floats)"""
+        return len(self._buffer) + sum(len(level) for level in self.levels)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_rng'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._rng = np.random.default_rng(self.n)
+
+
+def population_stability_index(reference: KLLSketch, current: KLLSketch, feature: int,
+                               bins: int = 10) -> float:
+    """PSI over reference-quantile bins"""
+    edges = np.unique(reference.quantiles(np.arange(1, bins) / bins, feature))
+    expected = np.diff(np.concatenate([[0.0], reference.cdf(edges, feature), [1.0]]))
+    actual = np.diff(np.concatenate([[0.0], current.cdf(edges, feature), [1.0]]))
+    expected = np.clip(expected, 1e-4, None)
+    actual = np.clip(actual, 1e-4, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def ks_statistic(reference: KLLSketch, current: KLLSketch, feature: int) -> float:
+    """Largest gap between the two approximate CDFs"""
+    points = np.unique(np.concatenate([reference.values(feature), current.values(feature)]))
+    return float(np.max(np.abs(reference.cdf(points, feature) - current.cdf(points, feature))))
+
+
+class DriftMonitor:
+    """Live feature sketch compared against the sketch saved at training time"""
+
+    def __init__(self, feature_columns: List[str], reference: KLLSketch, k: int = 200,
+                 psi_threshold: float = PSI_THRESHOLD, ks_threshold: float = KS_THRESHOLD):
+        self.feature_columns = list(feature_columns)
+        self.reference = reference
+        self.k = k
+        self.psi_threshold = psi_threshold
+        self.ks_threshold = ks_threshold
+        self.current = KLLSketch(len(self.feature_columns), k)
+        self._lock = threading.Lock()
+
+    def update(self, features: Dict):
+        """Add one scored window"""
+        row = [features.get(col, 0) for col in self.feature_columns]
+        with self._lock:
+            self.current.update(row)
+
+    def reset(self, reference: Optional[KLLSketch] = None):
+        """Start a new live sketch (e.g. after a model swap)"""
+        with self._lock:
+            if reference is not None:
+                self.reference = reference
+            self.current = KLLSketch(len(self.feature_columns), self.k)
+
+    def report(self, features: Optional[Iterable[str]] = None) -> Dict:
+        """Per-feature PSI and KS against the training reference"""
+        selected = [col for col in self.feature_columns if features is None or col in set(features)]
+        per_feature = {}
+        # Reports are rare; holding the lock keeps the live sketch consistent while it is read
+        with self._lock:
+            for col in selected:
+                i = self.feature_columns.index(col)
+                psi = population_stability_index(self.reference, self.current, i)
+                ks = ks_statistic(self.reference, self.current, i)
+                per_feature[col] = {
+                    'psi': round(psi, 4),
+                    'ks': round(ks, 4),
+                    'drifted': psi > self.psi_threshold or ks > self.ks_threshold,
+                }
+            windows, sketch_rows = self.current.n, self.current.retained()
+
+        drifted = [col for col, stats in per_feature.items() if stats['drifted']]
+        return {
+            'windows': windows,
+            'reference_windows': self.reference.n,
+            'drifted_features': drifted,
+            'max_psi': max((s['psi'] for s in per_feature.values()), default=0.0),
+            'features': per_feature,
+            'sketch_rows': sketch_rows,
+        }
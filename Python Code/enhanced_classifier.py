@@ -5,17 +5,23 @@ Now integrated with Domain Intelligence for superior categorization
 """
 
 import numpy as np
-import pandas as pd
-from sklearn.ensemble import IsolationForest
-from sklearn.model_selection import cross_val_score, StratifiedKFold, train_test_split
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
-import xgboost as xgb
+import copy
+import hashlib
 import json
 import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
 from collections import defaultdict, Counter
 from datetime import datetime
-import joblib
+
+# pandas, scikit-learn, XGBoost and joblib are imported where they are used:
+# importing this module (and main.py) stays fast for CLI tools and cached-model runs
+
+from drift_monitor import KLLSketch
+from prediction_cache import PredictionCache
+from resource_scheduler import get_scheduler, measure_cpu
+from streaming_anomaly import HalfSpaceTrees
 
 # Import domain intelligence
 # Domain intelligence is now integrated directly
@@ -23,6 +29,53 @@ DOMAIN_INTELLIGENCE_AVAILABLE = True
 
 logger = logging.getLogger(__name__)
 
+# Model input features, in training-matrix column order
+FEATURE_COLUMNS = [
+    'total_queries', 'unique_domains', 'entertainment_pct', 'work_pct',
+    'unethical_pct', 'neutral_pct', 'shopping_pct', 'session_duration',
+    'queries_per_minute', 'domain_entropy', 'top_domain_concentration',
+    'blocked_queries_pct', 'category_diversity', 'peak_activity_hour',
+    'weekend_activity', 'avg_query_length', 'query_length_variance',
+    'social_media_pct', 'streaming_pct', 'dev_tools_pct', 'cloud_services_pct',
+    'pure_entertainment_pct', 'entertainment_tracking_pct'  # Enhanced domain intelligence features
+]
+
+# Features produced together by the domain-intelligence category pass
+CATEGORY_SHARE_FEATURES = (
+    'entertainment_pct', 'work_pct', 'unethical_pct', 'neutral_pct', 'shopping_pct',
+    'pure_entertainment_pct', 'entertainment_tracking_pct'
+)
+
+# Infrastructure/support domains excluded from the user-facing query count
+INFRASTRUCTURE_KEYWORDS = (
+    'firebase', 'crashlytics', 'googleapis.com', 'play.googleapis', 'play-',
+    'doubleclick', 'googlesyndication', 'googleadservices', 'googletagmanager',
+    'app-measurement', 'analytics', 'tracking', 'newrelic', 'branch.io',
+    'appsflyer', 'amplitude', 'mixpanel', 'bugsnag', 'sentry.io', 'cdn.'
+)
+
+# Features read by the dominance overrides in predict_enhanced and by _detect_anomaly
+RULE_FEATURES = (
+    'entertainment_pct', 'work_pct', 'unethical_pct',
+    'queries_per_minute', 'domain_entropy', 'total_queries', 'peak_activity_hour'
+)
+
+# Training-matrix cache: bump the version whenever feature augmentation changes
+AUGMENTATION_VERSION = 1
+AUGMENTATION_SEED = 42
+
+# Cascade: windows the linear first pass must agree with XGBoost on (validation split)
+CASCADE_TARGET_AGREEMENT = 0.99
+
+# update(): KS critical value coefficient c(alpha) for alpha = 0.01 (drift test per feature)
+DRIFT_KS_C_ALPHA = 1.628
+
+# Confidence of a rule label with no measured precision (never fired in training, or no training data)
+DEFAULT_RULE_CONFIDENCE = 0.5
+
+# Learned anomaly detectors predict_enhanced can use (feature-pattern rules always apply)
+ANOMALY_MODES = ('isolation_forest', 'streaming', 'both')
+
 class EnhancedFeatureExtractor:
     """Enhanced feature extraction with domain intelligence integration"""
     
@@ -34,6 +87,9 @@ class EnhancedFeatureExtractor:
         
         # Domain intelligence is now integrated directly
         self.domain_intelligence = self  # Use self for domain intelligence methods
+        
+        # Optional lazy mode: only compute these features (None = compute everything)
+        self.required_features = None
         logger.info("Domain Intelligence System integrated successfully")
     
     def load_domain_categories(self, domain_categories_file):
@@ -212,22 +268,27 @@ class EnhancedFeatureExtractor:
             'detailed_breakdown': detailed_breakdown
         }
     
-    def extract_enhanced_features(self, dns_logs, window_minutes=30):
-        """Extract enhanced features with domain intelligence integration"""
+    def extract_enhanced_features(self, dns_logs, window_minutes=30, required_features=None):
+        """Extract enhanced features with domain intelligence integration
+        
+        required_features: optional set of feature names some consumer needs
+        (see EnhancedBehaviorClassifier.required_features). Features outside it
+        are not computed and keep their _empty_features() defaults; metadata
+        (category_counts, top_domains) is always produced.
+        """
         if not dns_logs:
             return self._empty_features()
         
-        # FILTER: Ignore infrastructure/support domains - only analyze user-facing domains
-        infrastructure_keywords = [
-            'firebase', 'crashlytics', 'googleapis.com', 'play.googleapis', 'play-',
-            'doubleclick', 'googlesyndication', 'googleadservices', 'googletagmanager',
-            'app-measurement', 'analytics', 'tracking', 'newrelic', 'branch.io',
-            'appsflyer', 'amplitude', 'mixpanel', 'bugsnag', 'sentry.io', 'cdn.'
-        ]
+        if required_features is None:
+            required_features = self.required_features
         
+        def needed(*names):
+            return required_features is None or any(name in required_features for name in names)
+        
+        # FILTER: Ignore infrastructure/support domains - only analyze user-facing domains
         filtered_logs = [
             log for log in dns_logs 
-            if not any(kw in log.get('domain', '').lower() for kw in infrastructure_keywords)
+            if not any(kw in log.get('domain', '').lower() for kw in INFRASTRUCTURE_KEYWORDS)
         ]
         
         if not filtered_logs:
@@ -239,7 +300,10 @@ class EnhancedFeatureExtractor:
         all_domains = [log.get('domain', '') for log in filtered_logs if log.get('domain')]
         
         # Use domain intelligence for comprehensive analysis if available
-        if self.domain_intelligence:
+        if not needed(*CATEGORY_SHARE_FEATURES):
+            entertainment_pct = work_pct = unethical_pct = neutral_pct = shopping_pct = 0
+            pure_entertainment_pct = entertainment_tracking_pct = 0
+        elif self.domain_intelligence:
             try:
                 intelligence_result = self.domain_intelligence.analyze_user_behavior_with_intelligence(filtered_logs)
                 
@@ -284,30 +348,43 @@ class EnhancedFeatureExtractor:
         unique_domains = len(domain_counts)
         top_domain_concentration = max(domain_counts.values()) / total_queries if domain_counts else 0
         blocked_queries_pct = blocked_count / total_queries if total_queries > 0 else 0
+        defaults = self._empty_features()
         
         # Temporal features
-        timestamps = [log.get('timestamp', '') for log in dns_logs if log.get('timestamp')]
-        session_duration = self._calculate_session_duration(timestamps)
-        queries_per_minute = total_queries / max(session_duration, 1) if session_duration > 0 else total_queries
+        timestamps = []
+        if needed('session_duration', 'queries_per_minute', 'peak_activity_hour', 'weekend_activity'):
+            timestamps = [log.get('timestamp', '') for log in dns_logs if log.get('timestamp')]
+        session_duration = defaults['session_duration']
+        queries_per_minute = defaults['queries_per_minute']
+        if needed('session_duration', 'queries_per_minute'):
+            session_duration = self._calculate_session_duration(timestamps)
+            queries_per_minute = total_queries / max(session_duration, 1) if session_duration > 0 else total_queries
         
         # Diversity metrics
-        domain_entropy = self._calculate_entropy(list(domain_counts.values()))
-        category_diversity = len(set([self.categorize_domain(domain, all_domains) for domain in domain_counts.keys()]))
+        domain_entropy = defaults['domain_entropy']
+        if needed('domain_entropy'):
+            domain_entropy = self._calculate_entropy(list(domain_counts.values()))
+        category_diversity = defaults['category_diversity']
+        if needed('category_diversity'):
+            category_diversity = len(set([self.categorize_domain(domain, all_domains) for domain in domain_counts.keys()]))
         
         # Behavioral patterns
-        peak_hour = self._extract_peak_activity_hour(timestamps)
-        weekend_activity = self._calculate_weekend_activity(timestamps)
+        peak_hour = self._extract_peak_activity_hour(timestamps) if needed('peak_activity_hour') else defaults['peak_activity_hour']
+        weekend_activity = self._calculate_weekend_activity(timestamps) if needed('weekend_activity') else defaults['weekend_activity']
         
         # Query patterns
-        query_lengths = [len(log.get('domain', '')) for log in dns_logs]
-        avg_query_length = np.mean(query_lengths) if query_lengths else 0
-        query_length_variance = np.var(query_lengths) if query_lengths else 0
+        avg_query_length = defaults['avg_query_length']
+        query_length_variance = defaults['query_length_variance']
+        if needed('avg_query_length', 'query_length_variance'):
+            query_lengths = [len(log.get('domain', '')) for log in dns_logs]
+            avg_query_length = np.mean(query_lengths) if query_lengths else 0
+            query_length_variance = np.var(query_lengths) if query_lengths else 0
         
         # Enhanced specific indicators
-        social_media_pct = self._calculate_social_media_percentage(dns_logs)
-        streaming_pct = self._calculate_streaming_percentage(dns_logs)
-        dev_tools_pct = self._calculate_dev_tools_percentage(dns_logs)
-        cloud_services_pct = self._calculate_cloud_services_percentage(dns_logs)
+        social_media_pct = self._calculate_social_media_percentage(dns_logs) if needed('social_media_pct') else 0
+        streaming_pct = self._calculate_streaming_percentage(dns_logs) if needed('streaming_pct') else 0
+        dev_tools_pct = self._calculate_dev_tools_percentage(dns_logs) if needed('dev_tools_pct') else 0
+        cloud_services_pct = self._calculate_cloud_services_percentage(dns_logs) if needed('cloud_services_pct') else 0
         
         return {
             # Basic features (now enhanced with domain intelligence)
@@ -521,10 +598,29 @@ class EnhancedFeatureExtractor:
             'category_counts': {}, 'top_domains': {}
         }
 
+
+def _ks_statistic(a, b) -> float:
+    """Two-sample Kolmogorov-Smirnov statistic (max distance between empirical CDFs)"""
+    values = np.concatenate([a, b])
+    cdf_a = np.searchsorted(np.sort(a), values, side='right') / len(a)
+    cdf_b = np.searchsorted(np.sort(b), values, side='right') / len(b)
+    return float(np.max(np.abs(cdf_a - cdf_b)))
+
+
+def _fold_accuracy(model, X, y, train, test) -> float:
+    """Fit a fresh copy of model on one CV fold and return its test accuracy (module level: runs in workers)"""
+    from sklearn.base import clone
+    return float(clone(model).fit(X[train], y[train]).score(X[test], y[test]))
+
+
 class EnhancedBehaviorClassifier:
     """Enhanced XGBoost classifier with advanced features and overfitting prevention"""
     
     def __init__(self, training_data_file='training_data.json'):
+        import xgboost as xgb
+        from sklearn.ensemble import IsolationForest
+        from sklearn.preprocessing import StandardScaler, LabelEncoder
+        
         # XGBoost with overfitting-resistant configuration (SAME as main.py core classifier)
         self.model = xgb.XGBClassifier(
             # Tree parameters (prevent overfitting)
@@ -534,6 +630,7 @@ class EnhancedBehaviorClassifier:
             # Boosting parameters
             n_estimators=100,               # Can be higher due to early stopping
             learning_rate=0.1,              # Conservative learning rate
+            early_stopping_rounds=10,       # Stop when validation mlogloss stalls
             
             # Regularization (KEY for overfitting prevention)
             reg_alpha=0.1,                  # L1 regularization
@@ -546,7 +643,7 @@ class EnhancedBehaviorClassifier:
             
             # Other parameters
             random_state=42,
-            n_jobs=-1,                      # Use all cores
+            n_jobs=-1,                      # Use all cores (resource scheduler pins this when training)
             eval_metric='mlogloss',         # Multi-class log loss
             
             # Handle class imbalance
@@ -556,44 +653,112 @@ class EnhancedBehaviorClassifier:
         self.scaler = StandardScaler()
         self.label_encoder = LabelEncoder()
         self.anomaly_detector = IsolationForest(contamination=0.1, random_state=42)
-        self.feature_columns = [
-            'total_queries', 'unique_domains', 'entertainment_pct', 'work_pct',
-            'unethical_pct', 'neutral_pct', 'shopping_pct', 'session_duration',
-            'queries_per_minute', 'domain_entropy', 'top_domain_concentration',
-            'blocked_queries_pct', 'category_diversity', 'peak_activity_hour',
-            'weekend_activity', 'avg_query_length', 'query_length_variance',
-            'social_media_pct', 'streaming_pct', 'dev_tools_pct', 'cloud_services_pct',
-            'pure_entertainment_pct', 'entertainment_tracking_pct'  # Enhanced domain intelligence features
-        ]
+        self.streaming_detector = None  # Half-Space Trees, updated online by predict_enhanced
+        self.anomaly_mode = 'isolation_forest'
+        self.drift_reference = None  # KLL sketch of the training features (see drift_monitor)
+        self.feature_columns = list(FEATURE_COLUMNS)
         self.is_trained = False
         self.training_data_file = training_data_file
         self.cv_scores = None
+        self.model_version = None  # Set by the model registry when loaded from a versioned artifact
+        self.search_results = None
+        self.training_phases = []
+        # Row indices of the split the model was trained on (see training_matrix_key)
+        self.training_split = None
+        # 'in_memory' (train_with_validation) or 'out_of_core' (external_memory_training)
+        self.training_pipeline = 'in_memory'
+        # Measured precision of each dominance rule, reported as its confidence (see calibrate_rules)
+        self.rule_precision = None
+        self._required_features = None  # (cache key, feature set) for lazy extraction
+        
+        # Reservoir sample of raw training rows kept for warm-start updates
+        self.reservoir_size = 500
+        self.reservoir_X = None
+        self.reservoir_y = None
+        self.reservoir_seen = 0
+        self._reservoir_rng = np.random.default_rng(42)
+        
+        # Two-stage cascade: logistic regression decides confident windows, XGBoost the rest
+        self.cascade_enabled = False
+        self.cascade_model = None
+        self.cascade_threshold = None  # Minimum top-2 probability margin to skip XGBoost
+        self.cascade_stats = None
+        
+        # Inference path counters (rule short-circuit / override / model)
+        self.path_counts = Counter()
+        
+        # Optional memo of predict_enhanced results (see enable_prediction_cache)
+        self.prediction_cache = None
+        # Optional memo of explain_batch results, sized separately (see enable_explanation_cache)
+        self.explanation_cache = None
     
-    def train_with_validation(self):
-        """Train Enhanced XGBoost model with validation set and early stopping"""
-        X, y = self.load_training_data()
-        
-        if len(X) == 0:
-            logger.error("No training data available")
-            return
-        
-        # Prepare features
-        X_processed = X[self.feature_columns].fillna(0)
-        
-        # Split data - create validation set for early stopping
-        X_temp, X_test, y_temp, y_test = train_test_split(
-            X_processed, y, test_size=0.25, random_state=42, stratify=y
+    @staticmethod
+    def split_training_rows(y) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Seeded, stratified train/validation/test row indices (60/15/25 %)
+        
+        Deterministic for a given label vector, so the split of an unchanged
+        training matrix can be rebuilt for models saved without training_split.
+        """
+        from sklearn.model_selection import train_test_split
+        
+        y = np.asarray(y)
+        idx_temp, idx_test = train_test_split(
+            np.arange(len(y)), test_size=0.25, random_state=42, stratify=y
         )
         
         # Further split for validation set
-        X_train, X_val, y_train, y_val = train_test_split(
-            X_temp, y_temp, test_size=0.2, random_state=42, stratify=y_temp
+        idx_train, idx_val = train_test_split(
+            idx_temp, test_size=0.2, random_state=42, stratify=y[idx_temp]
         )
+        return idx_train, idx_val, idx_test
+    
+    def train_with_validation(self, search: Optional[str] = None, search_trials: int = 20):
+        """Train Enhanced XGBoost model with validation set and early stopping
+        
+        search: None (use the configured hyperparameters), 'random' or 'halving'
+        """
+        from sklearn.base import clone
+        from sklearn.metrics import classification_report, accuracy_score
+        from joblib import Parallel, delayed
+        from sklearn.model_selection import StratifiedKFold
+        
+        scheduler = get_scheduler()
+        # This run's phase timings only (another training may run concurrently)
+        self.training_phases = phases = []
+        with scheduler.phase('load_data', records=phases):
+            X_processed, y = self.load_training_matrix()
+        
+        if len(X_processed) == 0:
+            logger.error("No training data available")
+            return
+        
+        # Split row indices - create validation set for early stopping
+        y = np.asarray(y)
+        idx_train, idx_val, idx_test = self.split_training_rows(y)
+        X_train, y_train = X_processed[idx_train], y[idx_train]
+        X_val, y_val = X_processed[idx_val], y[idx_val]
+        X_test, y_test = X_processed[idx_test], y[idx_test]
+        
+        # Persisted so later tools (model_compaction) evaluate on rows the model never trained on
+        self.training_split = {
+            'matrix_key': self.training_matrix_key(),
+            'train': idx_train,
+            'val': idx_val,
+            'test': idx_test,
+        }
+        self.training_pipeline = 'in_memory'
+        self.calibrate_rules(X_processed, y)
         
         logger.info(f"Enhanced Training samples: {len(X_train)}")
         logger.info(f"Enhanced Validation samples: {len(X_val)}")
         logger.info(f"Enhanced Test samples: {len(X_test)}")
         
+        # Keep a sample of raw training rows so update() can mix old data with new labels
+        self._reset_reservoir(np.asarray(X_train, dtype=float), np.asarray(y_train))
+        
+        # Bounded-memory summary of the training distribution for drift monitoring
+        self.drift_reference = KLLSketch(len(self.feature_columns)).update_batch(X_train)
+        
         # Scale features
         X_train_scaled = self.scaler.fit_transform(X_train)
         X_val_scaled = self.scaler.transform(X_val)
@@ -604,17 +769,34 @@ class EnhancedBehaviorClassifier:
         y_val_encoded = self.label_encoder.transform(y_val)
         y_test_encoded = self.label_encoder.transform(y_test)
         
+        # Optional hyperparameter search on the same train/validation split
+        if search:
+            self.run_hyperparameter_search(
+                X_train_scaled, y_train_encoded, X_val_scaled, y_val_encoded,
+                mode=search, n_trials=search_trials
+            )
+        
         # Train XGBoost with early stopping (SAME as main.py)
         logger.info("Training Enhanced XGBoost classifier with early stopping...")
         
-        self.model.fit(
-            X_train_scaled, y_train_encoded,
-            eval_set=[(X_train_scaled, y_train_encoded), (X_val_scaled, y_val_encoded)],
-            verbose=False
-        )
+        # A single fit owns every core
+        scheduler.configure_xgb(self.model)
+        with scheduler.phase('xgb_fit', records=phases):
+            self.model.fit(
+                X_train_scaled, y_train_encoded,
+                eval_set=[(X_train_scaled, y_train_encoded), (X_val_scaled, y_val_encoded)],
+                verbose=False
+            )
         
         # Train anomaly detector
-        self.anomaly_detector.fit(X_train_scaled)
+        scheduler.configure_sklearn(self.anomaly_detector)
+        with scheduler.phase('anomaly_fit', records=phases):
+            self.anomaly_detector.fit(X_train_scaled)
+            self.streaming_detector = HalfSpaceTrees().fit(X_train_scaled)
+        
+        # Linear first pass for cascade inference
+        with scheduler.phase('cascade_fit', records=phases):
+            self.fit_cascade(X_train_scaled, y_train_encoded, X_val_scaled, X_test_scaled, y_test_encoded)
         
         # Get predictions
         y_pred = self.model.predict(X_test_scaled)
@@ -646,8 +828,23 @@ class EnhancedBehaviorClassifier:
         self.analyze_xgb_feature_importance()
         
         # Cross-validation for additional validation
+        # Folds have no eval_set, so fix the tree count at the early-stopped iteration
+        cv_model = clone(self.model).set_params(
+            early_stopping_rounds=None,
+            n_estimators=self.model.best_iteration + 1
+        )
         cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
-        cv_scores = cross_val_score(self.model, X_train_scaled, y_train_encoded, cv=cv, scoring='accuracy')
+        # Folds run in parallel, each with its share of XGBoost threads
+        allocation = scheduler.allocate(cv.get_n_splits())
+        scheduler.configure_xgb(cv_model, allocation.inner)
+        with scheduler.phase('cross_validation', allocation, records=phases) as phase:
+            # Each fold reports its own CPU: loky workers outlive the phase and are never reaped
+            folds = Parallel(n_jobs=allocation.outer)(
+                delayed(measure_cpu)(_fold_accuracy, cv_model, X_train_scaled, y_train_encoded, train, test)
+                for train, test in cv.split(X_train_scaled, y_train_encoded)
+            )
+            phase['worker_cpu_seconds'] += sum(cpu for _, cpu in folds)
+        cv_scores = np.array([accuracy for accuracy, _ in folds])
         self.cv_scores = cv_scores
         logger.info(f"Enhanced Cross-validation: {cv_scores.mean():.3f} (+/- {cv_scores.std() * 2:.3f})")
         
@@ -662,10 +859,403 @@ class EnhancedBehaviorClassifier:
                 logger.info(f"Enhanced Best validation score: {self.model.best_score}")
         
         self.is_trained = True
+        self._model_changed()
         logger.info("Enhanced XGBoost model training completed")
     
+    def required_features(self, include_anomaly_detector: bool = True) -> set:
+        """Feature names the loaded model and rules actually read
+        
+        Union of the features XGBoost splits on, the features the anomaly
+        detectors selected by anomaly_mode split on (unless excluded) and
+        RULE_FEATURES - or every column while the cascade's linear first pass
+        is active. Used by EnhancedFeatureExtractor to skip computing
+        everything else.
+        """
+        cache_key = (include_anomaly_detector, self.model_version, self.anomaly_mode, self.cascade_enabled)
+        if self._required_features is not None and self._required_features[0] == cache_key:
+            return self._required_features[1]
+        
+        required = set(RULE_FEATURES)
+        if not self.is_trained or self.cascade_enabled:
+            # The logistic first pass weighs every column
+            return set(self.feature_columns)
+        
+        booster = self.model.get_booster()
+        for name in booster.get_score(importance_type='weight'):
+            # Unnamed boosters report features as f0, f1, ... in column order
+            if name.startswith('f') and name[1:].isdigit():
+                required.add(self.feature_columns[int(name[1:])])
+            else:
+                required.add(name)
+        
+        use_streaming = self.anomaly_mode != 'isolation_forest' and self.streaming_detector is not None
+        if include_anomaly_detector and use_streaming:
+            required.update(self.feature_columns[i] for i in self.streaming_detector.used_features())
+        
+        use_isolation_forest = self.anomaly_mode != 'streaming' or self.streaming_detector is None
+        if include_anomaly_detector and use_isolation_forest and hasattr(self.anomaly_detector, 'estimators_'):
+            for estimator, features in zip(self.anomaly_detector.estimators_,
+                                           self.anomaly_detector.estimators_features_):
+                split_features = estimator.tree_.feature
+                required.update(self.feature_columns[int(features[i])] for i in split_features[split_features >= 0])
+        
+        skipped = [col for col in self.feature_columns if col not in required]
+        logger.info(f"Lazy features: computing {len(required)}, skipping {len(skipped)} {skipped}")
+        self._required_features = (cache_key, required)
+        return required
+    
+    def fit_cascade(self, X_train_scaled, y_train_encoded, X_val_scaled,
+                    X_test_scaled=None, y_test_encoded=None,
+                    target_agreement: float = CASCADE_TARGET_AGREEMENT) -> Dict:
+        """Fit the linear first pass and calibrate its escalation margin
+        
+        The threshold is the smallest top-2 probability margin at which the
+        linear model agrees with XGBoost on at least target_agreement of the
+        validation windows it would decide alone.
+        """
+        from sklearn.linear_model import LogisticRegression
+        
+        self.cascade_model = LogisticRegression(max_iter=1000, random_state=42)
+        self.cascade_model.fit(X_train_scaled, y_train_encoded)
+        
+        linear = self._linear_probabilities(X_val_scaled)
+        margin = self._top2_margin(linear)
+        agree = linear.argmax(axis=1) == self.model.predict_proba(X_val_scaled).argmax(axis=1)
+        
+        # Most confident first; running agreement if everything down to that margin is accepted
+        order = np.argsort(-margin)
+        running = np.cumsum(agree[order]) / np.arange(1, len(order) + 1)
+        accepted = np.nonzero(running >= target_agreement)[0]
+        self.cascade_threshold = float(margin[order][accepted[-1]]) if len(accepted) else float('inf')
+        
+        stats = {'threshold': self.cascade_threshold, 'target_agreement': target_agreement}
+        if X_test_scaled is not None:
+            stats.update(self.evaluate_cascade(X_test_scaled, y_test_encoded))
+        self.cascade_stats = stats
+        return stats
+    
+    def evaluate_cascade(self, X_scaled, y_encoded) -> Dict:
+        """Escalation rate and accuracy of cascade vs XGBoost-only inference"""
+        start = time.perf_counter()
+        xgb_probabilities = self.model.predict_proba(X_scaled)
+        xgb_seconds = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        cascade_probabilities, escalated = self.predict_cascade(X_scaled)
+        cascade_seconds = time.perf_counter() - start
+        
+        stats = {
+            'windows': len(X_scaled),
+            'escalation_rate': float(escalated.mean()) if len(X_scaled) else 0.0,
+            'cascade_accuracy': float(np.mean(cascade_probabilities.argmax(axis=1) == y_encoded)),
+            'xgb_accuracy': float(np.mean(xgb_probabilities.argmax(axis=1) == y_encoded)),
+            'agreement': float(np.mean(cascade_probabilities.argmax(axis=1) == xgb_probabilities.argmax(axis=1))),
+            'cascade_seconds': cascade_seconds,
+            'xgb_seconds': xgb_seconds,
+        }
+        logger.info(f"Cascade: {stats['escalation_rate']:.1%} of windows escalated to XGBoost, "
+                    f"accuracy {stats['cascade_accuracy']:.3f} vs XGBoost-only {stats['xgb_accuracy']:.3f} "
+                    f"(margin threshold {self.cascade_threshold:.3f})")
+        return stats
+    
+    def predict_cascade(self, X_scaled):
+        """Class probabilities from the cascade and a mask of windows sent to XGBoost"""
+        X_scaled = np.asarray(X_scaled)
+        if self.cascade_model is None:
+            return self.model.predict_proba(X_scaled), np.ones(len(X_scaled), dtype=bool)
+        
+        probabilities = self._linear_probabilities(X_scaled)
+        escalated = self._top2_margin(probabilities) < self.cascade_threshold
+        if escalated.any():
+            probabilities[escalated] = self.model.predict_proba(X_scaled[escalated])
+        return probabilities, escalated
+    
+    def _reset_cascade(self):
+        """Drop a linear first pass that no longer matches the feature scaling"""
+        if self.cascade_model is not None:
+            logger.info("Cascade first pass invalidated - retrain to re-enable cascade inference")
+        self.cascade_model = None
+        self.cascade_threshold = None
+        self.cascade_stats = None
+    
+    def _linear_probabilities(self, X_scaled):
+        """Multinomial logistic regression probabilities as one matrix product + softmax"""
+        logits = X_scaled @ self.cascade_model.coef_.T + self.cascade_model.intercept_
+        logits -= logits.max(axis=1, keepdims=True)
+        probabilities = np.exp(logits)
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+        
+    @staticmethod
+    def _top2_margin(probabilities):
+        """Gap between the two most likely classes per row"""
+        top2 = np.partition(probabilities, -2, axis=1)[:, -2:]
+        return top2[:, 1] - top2[:, 0]
+        
+    def train_out_of_core(self, partition_dir: str, val_partitions: int = 1,
+                          test_partitions: int = 1) -> Dict:
+        """Train from date-partitioned feature files larger than memory
+        
+        Partitions are streamed through an XGBoost DataIter; the newest
+        partitions form the test split and the ones before them validation.
+        """
+        from external_memory_training import train_out_of_core
+        
+        stats = train_out_of_core(self, partition_dir, val_partitions, test_partitions)
+        self.training_split = None  # Trained on partitions, not the training matrix
+        self.training_pipeline = 'out_of_core'
+        self._model_changed()
+        self._reset_cascade()  # Fitted on the old scaler
+        self.analyze_xgb_feature_importance()
+        return stats
+    
+    def update(self, new_rows: List[Dict], extra_rounds: int = 20,
+               drift_threshold: float = 0.5) -> Dict:
+        """Fold newly labeled windows into the trained model without a full retrain
+        
+        Continues boosting from the existing booster on the new rows plus a
+        reservoir sample of old training data, keeping the scaler. Drift is the
+        share of features whose distribution differs (KS test) from reservoir
+        rows with the same label, so a batch of mostly one class is not mistaken
+        for covariate shift. Above drift_threshold the model is retrained on the
+        full training matrix plus the new rows instead (never on the reservoir
+        alone). The cascade first pass is dropped either way.
+        """
+        import pandas as pd
+        import xgboost as xgb
+        
+        if not self.is_trained:
+            logger.error("Enhanced model not trained yet - run train_with_validation first")
+            return {}
+        
+        start = time.perf_counter()
+        known_labels = set(self.label_encoder.classes_)
+        rows = [row for row in new_rows if row.get('label') in known_labels]
+        if len(rows) < len(new_rows):
+            logger.warning(f"Skipping {len(new_rows) - len(rows)} rows with missing or unknown labels")
+        if not rows:
+            logger.error("No usable labeled rows for update")
+            return {}
+        
+        df_new = pd.DataFrame(rows)
+        missing_features = [col for col in self.feature_columns if col not in df_new.columns]
+        if missing_features:
+            self._augment_missing_features(df_new, missing_features)
+        X_new = df_new[self.feature_columns].fillna(0).to_numpy(dtype=float)
+        y_new = df_new['label'].to_numpy()
+        
+        if self.reservoir_X is None:
+            self._rebuild_reservoir_from_training_file()
+        
+        X_combined = np.vstack([self.reservoir_X, X_new]) if self.reservoir_X is not None else X_new
+        y_combined = np.concatenate([self.reservoir_y, y_new]) if self.reservoir_y is not None else y_new
+        
+        if len(np.unique(y_combined)) < len(self.label_encoder.classes_):
+            logger.error("Update data does not cover every class - skipping update")
+            return {}
+        
+        drift = self._class_conditional_drift(X_new, y_new)
+        retrain = drift > drift_threshold
+        accuracy_before = float(np.mean(self.model.predict(self.scaler.transform(X_new)) ==
+                                        self.label_encoder.transform(y_new)))
+        
+        params = self.model.get_params()
+        params.update(early_stopping_rounds=None, n_jobs=get_scheduler().total_cores)
+        
+        booster = self.model.get_booster()
+        best_iteration = getattr(self.model, 'best_iteration', None) if self.model.early_stopping_rounds else None
+        if best_iteration is not None:
+            # Drop the trees early stopping rejected (slicing also clears best_iteration)
+            booster = booster[:best_iteration + 1]
+        
+        if retrain:
+            logger.warning(f"Feature drift {drift:.2f} > {drift_threshold} - "
+                           f"retraining on the full training matrix plus {len(rows)} new rows")
+            X_full, y_full = self.load_training_matrix()
+            X_all = np.vstack([np.asarray(X_full, dtype=float), X_new])
+            y_all = np.concatenate([np.asarray(y_full), y_new])
+            X_scaled = self.scaler.fit_transform(X_all)
+            params['n_estimators'] = booster.num_boosted_rounds()
+            updated = xgb.XGBClassifier(**params)
+            updated.fit(X_scaled, self.label_encoder.transform(y_all), verbose=False)
+            self.anomaly_detector.fit(X_scaled)
+            self.streaming_detector = HalfSpaceTrees().fit(X_scaled)
+            self.training_split = None  # Every row is training data now
+        else:
+            X_scaled = self.scaler.transform(X_combined)
+            params['n_estimators'] = extra_rounds
+            updated = xgb.XGBClassifier(**params)
+            updated.fit(X_scaled, self.label_encoder.transform(y_combined), xgb_model=booster, verbose=False)
+        
+        # Its escalation threshold was calibrated against the previous booster
+        self._reset_cascade()
+        self.model = updated
+        self._model_changed()
+        self._update_reservoir(X_new, y_new)
+        if self.drift_reference is not None:
+            self.drift_reference.update_batch(X_new)
+        
+        accuracy_after = float(np.mean(self.model.predict(self.scaler.transform(X_new)) ==
+                                       self.label_encoder.transform(y_new)))
+        stats = {
+            'rows': len(rows),
+            'reservoir_rows': 0 if self.reservoir_X is None else len(self.reservoir_X),
+            'mode': 'retrain' if retrain else 'warm_start',
+            'drift': drift,
+            'total_trees': self.model.get_booster().num_boosted_rounds(),
+            'new_rows_accuracy_before': accuracy_before,
+            'new_rows_accuracy_after': accuracy_after,
+            'seconds': time.perf_counter() - start,
+        }
+        logger.info(f"Enhanced model updated ({stats['mode']}) with {stats['rows']} rows in "
+                    f"{stats['seconds']:.2f}s - new-row accuracy {accuracy_before:.3f} -> {accuracy_after:.3f}")
+        return stats
+    
+    def _class_conditional_drift(self, X_new, y_new) -> float:
+        """Share of features whose new rows differ from same-label reservoir rows
+        
+        Per label, a feature counts as drifted when the two-sample KS statistic
+        exceeds its critical value at alpha = 0.01; labels are weighted by their
+        number of new rows.
+        """
+        if self.reservoir_X is None:
+            logger.warning("No reservoir to measure drift against - assuming none")
+            return 0.0
+        
+        drifted = 0.0
+        weight = 0
+        for label in np.unique(y_new):
+            new = X_new[y_new == label]
+            reference = self.reservoir_X[self.reservoir_y == label]
+            if len(reference) == 0:
+                continue
+            n, m = len(new), len(reference)
+            critical = DRIFT_KS_C_ALPHA * np.sqrt((n + m) / (n * m))
+            shifted = [_ks_statistic(new[:, j], reference[:, j]) > critical for j in range(X_new.shape[1])]
+            drifted += n * float(np.mean(shifted))
+            weight += n
+        return drifted / weight if weight else 0.0
+    
+    def _reset_reservoir(self, X, y):
+        """Start a fresh reservoir sample from training rows"""
+        self.reservoir_X = None
+        self.reservoir_y = None
+        self.reservoir_seen = 0
+        self._update_reservoir(X, y)
+    
+    def _update_reservoir(self, X, y):
+        """Reservoir sampling (Algorithm R) so every row seen has equal chance to be kept"""
+        if self.reservoir_X is None:
+            self.reservoir_X = np.empty((0, X.shape[1]), dtype=float)
+            self.reservoir_y = np.empty(0, dtype=y.dtype)
+        
+        keep_X = list(self.reservoir_X)
+        keep_y = list(self.reservoir_y)
+        for row, label in zip(X, y):
+            self.reservoir_seen += 1
+            if len(keep_X) < self.reservoir_size:
+                keep_X.append(row)
+                keep_y.append(label)
+            else:
+                j = int(self._reservoir_rng.integers(self.reservoir_seen))
+                if j < self.reservoir_size:
+                    keep_X[j] = row
+                    keep_y[j] = label
+        
+        self.reservoir_X = np.array(keep_X, dtype=float)
+        self.reservoir_y = np.array(keep_y)
+    
+    def _rebuild_reservoir_from_training_file(self):
+        """Seed the reservoir for models saved before reservoirs were persisted"""
+        X, y = self.load_training_matrix()
+        if len(X) == 0:
+            logger.warning("No training data for reservoir - updating on new rows only")
+            return
+        self._reset_reservoir(np.asarray(X, dtype=float), np.asarray(y))
+    
+    def run_hyperparameter_search(self, X_train, y_train, X_val, y_val,
+                                  mode: str = 'random', n_trials: int = 20) -> Dict:
+        """Search hyperparameters in a process pool and adopt the best config"""
+        from hyperparameter_search import HyperparameterSearch
+        
+        logger.info(f"Running {mode} hyperparameter search with {n_trials} trials...")
+        searcher = HyperparameterSearch(mode=mode, n_trials=n_trials)
+        allocation = get_scheduler().allocate(searcher.max_workers)
+        with get_scheduler().phase('hyperparameter_search', allocation, records=self.training_phases) as phase:
+            results = searcher.run(X_train, y_train, X_val, y_val)
+            # Trials run in pool processes and report their own CPU
+            phase['worker_cpu_seconds'] += sum(trial['cpu_seconds'] for trial in results['trials'])
+        
+        # The config was selected with this round budget (and early stopping) - train it with the same
+        self.model.set_params(**results['best_config'], n_estimators=results['best_n_estimators'],
+                              early_stopping_rounds=results['early_stopping_rounds'])
+        self.search_results = results
+        
+        logger.info(f"Search finished in {results['search_seconds']:.1f}s "
+                    f"({results['max_workers']} workers x {results['threads_per_trial']} threads)")
+        logger.info(f"Best config: {results['best_config']}")
+        logger.info(f"Best validation accuracy: {results['best_val_accuracy']:.3f} "
+                    f"(mlogloss {results['best_val_logloss']:.4f}, {results['best_iteration'] + 1} trees)")
+        return results
+    
+    def training_matrix_key(self) -> str:
+        """Fingerprint of the training matrix: file contents, feature columns and augmentation"""
+        digest = hashlib.sha256()
+        with open(self.training_data_file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        digest.update(f"|v{AUGMENTATION_VERSION}|seed{AUGMENTATION_SEED}|".encode())
+        digest.update(','.join(self.feature_columns).encode())
+        return digest.hexdigest()[:16]
+    
+    def load_training_matrix(self, cache_dir: Optional[str] = None):
+        """Return the augmented float32 feature matrix and labels, memory-mapped from cache
+        
+        The cache key covers the training file contents, the feature columns and
+        AUGMENTATION_VERSION, so any change to those rebuilds the matrix.
+        """
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(self.training_data_file) or '.', '.training_cache')
+        
+        try:
+            key = self.training_matrix_key()
+        except OSError as e:
+            logger.error(f"Error loading training data: {e}")
+            return np.empty((0, len(self.feature_columns)), dtype=np.float32), np.array([])
+        
+        X_path = os.path.join(cache_dir, f"training_{key}_X.npy")
+        y_path = os.path.join(cache_dir, f"training_{key}_y.npy")
+        
+        if os.path.exists(X_path) and os.path.exists(y_path):
+            X = np.load(X_path, mmap_mode='r')
+            y = np.load(y_path, mmap_mode='r')
+            logger.info(f"Loaded cached training matrix {X.shape} from {cache_dir}")
+            return X, y
+        
+        df, labels = self.load_training_data()
+        if len(df) == 0:
+            return np.empty((0, len(self.feature_columns)), dtype=np.float32), np.array([])
+        
+        X = df[self.feature_columns].fillna(0).to_numpy(dtype=np.float32)
+        y = np.asarray(labels).astype(str)
+        
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            for path, array in ((X_path, X), (y_path, y)):
+                # Write then rename so concurrent runs never read a partial file
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    np.save(f, array)
+                os.replace(tmp_path, path)
+            logger.info(f"Cached training matrix {X.shape} to {cache_dir}")
+        except OSError as e:
+            logger.warning(f"Could not cache training matrix: {e}")
+        
+        return X, y
+    
     def load_training_data(self):
         """Load training data from JSON file with automatic feature augmentation"""
+        import pandas as pd
+        
         try:
             with open(self.training_data_file, 'r') as f:
                 training_data = json.load(f)
@@ -680,50 +1270,7 @@ class EnhancedBehaviorClassifier:
                 logger.warning(f"Training data missing {len(missing_features)} enhanced features")
                 logger.info("Automatically generating enhanced features from basic data...")
                 
-                # Generate enhanced features based on existing basic features
-                for col in missing_features:
-                    if col == 'shopping_pct':
-                        # Shopping is usually a subset of work or neutral
-                        df[col] = df.get('work_pct', 0) * np.random.uniform(0.05, 0.15, len(df))
-                    elif col == 'top_domain_concentration':
-                        # High entropy = low concentration
-                        df[col] = np.clip(1.0 - (df.get('domain_entropy', 2) / 5.0), 0.2, 0.8)
-                    elif col == 'blocked_queries_pct':
-                        # Minimal blocked queries in training data
-                        df[col] = np.random.uniform(0, 0.05, len(df))
-                    elif col == 'category_diversity':
-                        # Based on entropy
-                        df[col] = np.clip(df.get('domain_entropy', 2) / 1.5, 1, 5).astype(int)
-                    elif col == 'peak_activity_hour':
-                        # Random working hours
-                        df[col] = np.random.choice(range(9, 18), len(df))
-                    elif col == 'weekend_activity':
-                        # Mostly weekday activity
-                        df[col] = np.random.uniform(0, 0.3, len(df))
-                    elif col == 'query_length_variance':
-                        # Based on avg_query_length
-                        df[col] = df.get('avg_query_length', 15) * np.random.uniform(0.1, 0.3, len(df))
-                    elif col == 'social_media_pct':
-                        # Subset of entertainment
-                        df[col] = df.get('entertainment_pct', 0) * np.random.uniform(0.3, 0.6, len(df))
-                    elif col == 'streaming_pct':
-                        # Subset of entertainment
-                        df[col] = df.get('entertainment_pct', 0) * np.random.uniform(0.2, 0.5, len(df))
-                    elif col == 'dev_tools_pct':
-                        # Subset of work
-                        df[col] = df.get('work_pct', 0) * np.random.uniform(0.1, 0.4, len(df))
-                    elif col == 'cloud_services_pct':
-                        # Subset of work
-                        df[col] = df.get('work_pct', 0) * np.random.uniform(0.05, 0.2, len(df))
-                    elif col == 'pure_entertainment_pct':
-                        # Most of entertainment is pure content
-                        df[col] = df.get('entertainment_pct', 0) * np.random.uniform(0.7, 0.9, len(df))
-                    elif col == 'entertainment_tracking_pct':
-                        # Small portion is tracking
-                        df[col] = df.get('entertainment_pct', 0) * np.random.uniform(0.1, 0.3, len(df))
-                    else:
-                        # Default to zero for unknown features
-                        df[col] = 0
+                self._augment_missing_features(df, missing_features)
                 
                 logger.info(f"✅ Generated {len(missing_features)} enhanced features automatically")
             
@@ -736,8 +1283,67 @@ class EnhancedBehaviorClassifier:
             logger.error(f"Error loading training data: {e}")
             return pd.DataFrame(), np.array([])
     
-    def predict_enhanced(self, features):
-        """Enhanced XGBoost prediction with confidence and anomaly detection"""
+    def _augment_missing_features(self, df, missing_features, rng=None):
+        """Synthesize enhanced features for rows that only carry the basic ones
+        
+        Draws come from a seeded generator so the same rows always produce the
+        same matrix (bump AUGMENTATION_VERSION when changing these rules).
+        """
+        if rng is None:
+            rng = np.random.default_rng(AUGMENTATION_SEED)
+        
+        # Generate enhanced features based on existing basic features
+        for col in missing_features:
+            if col == 'shopping_pct':
+                # Shopping is usually a subset of work or neutral
+                df[col] = df.get('work_pct', 0) * rng.uniform(0.05, 0.15, len(df))
+            elif col == 'top_domain_concentration':
+                # High entropy = low concentration
+                df[col] = np.clip(1.0 - (df.get('domain_entropy', 2) / 5.0), 0.2, 0.8)
+            elif col == 'blocked_queries_pct':
+                # Minimal blocked queries in training data
+                df[col] = rng.uniform(0, 0.05, len(df))
+            elif col == 'category_diversity':
+                # Based on entropy
+                df[col] = np.clip(df.get('domain_entropy', 2) / 1.5, 1, 5).astype(int)
+            elif col == 'peak_activity_hour':
+                # Random working hours
+                df[col] = rng.choice(np.arange(9, 18), len(df))
+            elif col == 'weekend_activity':
+                # Mostly weekday activity
+                df[col] = rng.uniform(0, 0.3, len(df))
+            elif col == 'query_length_variance':
+                # Based on avg_query_length
+                df[col] = df.get('avg_query_length', 15) * rng.uniform(0.1, 0.3, len(df))
+            elif col == 'social_media_pct':
+                # Subset of entertainment
+                df[col] = df.get('entertainment_pct', 0) * rng.uniform(0.3, 0.6, len(df))
+            elif col == 'streaming_pct':
+                # Subset of entertainment
+                df[col] = df.get('entertainment_pct', 0) * rng.uniform(0.2, 0.5, len(df))
+            elif col == 'dev_tools_pct':
+                # Subset of work
+                df[col] = df.get('work_pct', 0) * rng.uniform(0.1, 0.4, len(df))
+            elif col == 'cloud_services_pct':
+                # Subset of work
+                df[col] = df.get('work_pct', 0) * rng.uniform(0.05, 0.2, len(df))
+            elif col == 'pure_entertainment_pct':
+                # Most of entertainment is pure content
+                df[col] = df.get('entertainment_pct', 0) * rng.uniform(0.7, 0.9, len(df))
+            elif col == 'entertainment_tracking_pct':
+                # Small portion is tracking
+                df[col] = df.get('entertainment_pct', 0) * rng.uniform(0.1, 0.3, len(df))
+            else:
+                # Default to zero for unknown features
+                df[col] = 0
+    
+    def predict_enhanced(self, features, need_probabilities: bool = True):
+        """Enhanced XGBoost prediction with confidence and anomaly detection
+        
+        The dominance override rules run first. When one decides the label and
+        need_probabilities is False, XGBoost is skipped and the confidence is
+        the rule's measured precision (rule_confidence), not a model probability.
+        """
         if not self.is_trained:
             logger.error("Enhanced model not trained yet")
             return 'neutral', 0.0, False
@@ -751,45 +1357,30 @@ class EnhancedBehaviorClassifier:
             feature_array = np.array(feature_vector).reshape(1, -1)
             feature_scaled = self.scaler.transform(feature_array)
             
-            # Predict using XGBoost
-            prediction = self.model.predict(feature_scaled)[0]
-            probabilities = self.model.predict_proba(feature_scaled)[0]
+            # Near-identical windows reuse the memoized label (anomaly scoring always runs)
+            cache_key = None
+            cached = None
+            if self.prediction_cache is not None:
+                cache_key = self.prediction_cache.key(
+                    feature_scaled, self.model_version, need_probabilities, self.cascade_enabled
+                )
+                cached = self.prediction_cache.get(cache_key)
+            
+            if cached is not None:
+                behavior, confidence, path, rule_label = cached
+                logger.info(f"Enhanced Cache hit: {behavior} (confidence: {confidence:.3f})")
+            else:
+                behavior, confidence, path, rule_label = self._classify_one(features, feature_scaled, need_probabilities)
+                if cache_key is not None:
+                    self.prediction_cache.put(cache_key, (behavior, confidence, path, rule_label))
+            self._count_path(path, rule_label)
             
-            # Get behavior label and confidence
-            behavior = self.label_encoder.inverse_transform([prediction])[0]
-            confidence = np.max(probabilities)
-            
-            # Debug: Show all class probabilities
-            classes = self.label_encoder.classes_
-            prob_dict = dict(zip(classes, probabilities))
-            logger.info(f"Enhanced Class probabilities: {prob_dict}")
-            logger.info(f"Enhanced Predicted class: {behavior} with confidence: {confidence:.3f}")
-            
-            # POST-PROCESSING: Override classification based on dominant category
-            ent_pct = features.get('entertainment_pct', 0)
-            work_pct = features.get('work_pct', 0)
-            unethical_pct = features.get('unethical_pct', 0)
-            
-            # If entertainment is clearly dominant (>35%), classify as entertainment
-            if ent_pct > 0.35 and ent_pct > work_pct and ent_pct > unethical_pct:
-                behavior = 'entertainment'
-                logger.info(f"Enhanced Override: Entertainment is dominant ({ent_pct:.1%})")
-            # If work is clearly dominant (>40%), classify as work
-            elif work_pct > 0.40 and work_pct > ent_pct:
-                behavior = 'work'
-                logger.info(f"Enhanced Override: Work is dominant ({work_pct:.1%})")
-            # If unethical is significant (>20%), classify as unethical
-            elif unethical_pct > 0.20:
-                behavior = 'unethical'
-                logger.info(f"Enhanced Override: Unethical activity detected ({unethical_pct:.1%})")
-            
-            # Enhanced anomaly detection using Isolation Forest + feature patterns
-            anomaly_score = self.anomaly_detector.decision_function(feature_scaled)[0]
-            is_anomaly_if = self.anomaly_detector.predict(feature_scaled)[0] == -1
+            # Enhanced anomaly detection using Isolation Forest and/or Half-Space Trees + feature patterns
+            is_anomaly_model = self._detect_model_anomaly(feature_scaled)
             is_anomaly_pattern = self._detect_anomaly(features)
             
             # Combine both anomaly detection methods
-            is_anomaly = is_anomaly_if or is_anomaly_pattern
+            is_anomaly = is_anomaly_model or is_anomaly_pattern
             
             logger.info(f"Enhanced Final: {behavior} (confidence: {confidence:.3f}, anomaly: {is_anomaly})")
             
@@ -799,6 +1390,380 @@ class EnhancedBehaviorClassifier:
             logger.error(f"Error in enhanced prediction: {e}")
             return 'neutral', 0.0, False
     
+    def _classify_one(self, features: Dict, feature_scaled, need_probabilities: bool) -> Tuple:
+        """(behavior, confidence, inference path, rule label) for one window; the memoized part"""
+        # Rule pre-classifier: dominant category decides the label outright
+        rule_label = self.rule_label(features)
+        
+        if rule_label and not need_probabilities:
+            logger.info(f"Enhanced Rule short-circuit: {rule_label} (model inference skipped)")
+            return rule_label, self.rule_confidence(rule_label), 'rule_short_circuit', rule_label
+        
+        if self.cascade_enabled:
+            # Linear first pass; XGBoost only when its margin is too small
+            cascade_probabilities, escalated = self.predict_cascade(feature_scaled)
+            probabilities = cascade_probabilities[0]
+            logger.info(f"Enhanced Cascade: {'escalated to XGBoost' if escalated[0] else 'decided by linear pass'}")
+        else:
+            # Predict using XGBoost (label is the most likely class)
+            probabilities = self.model.predict_proba(feature_scaled)[0]
+        prediction = int(np.argmax(probabilities))
+        
+        # Get behavior label and confidence
+        behavior = self.label_encoder.inverse_transform([prediction])[0]
+        confidence = np.max(probabilities)
+        
+        # Debug: Show all class probabilities
+        classes = self.label_encoder.classes_
+        prob_dict = dict(zip(classes, probabilities))
+        logger.info(f"Enhanced Class probabilities: {prob_dict}")
+        logger.info(f"Enhanced Predicted class: {behavior} with confidence: {confidence:.3f}")
+        
+        if not rule_label:
+            return behavior, confidence, 'model', rule_label
+        # Override classification based on dominant category
+        logger.info(f"Enhanced Override: {rule_label.capitalize()} is dominant")
+        return rule_label, confidence, 'rule_override' if rule_label != behavior else 'rule_agrees', rule_label
+    
+    def _count_path(self, path: str, rule_label: str):
+        """Count one window's inference path (cache hits included)"""
+        self.path_counts[path] += 1
+        if rule_label:
+            self.path_counts[f"rule:{rule_label}"] += 1
+    
+    def predict_enhanced_batch(self, features_list: List[Dict], need_probabilities: bool = True) -> List[Tuple]:
+        """predict_enhanced for many windows with one scaler, model and anomaly-detector call
+        
+        Returns the same (behavior, confidence, is_anomaly) per window as calling
+        predict_enhanced on each in turn, including cache use, path counters and
+        the streaming detector's in-order updates. Logs one summary line instead
+        of per-window detail.
+        """
+        if not self.is_trained:
+            logger.error("Enhanced model not trained yet")
+            return [('neutral', 0.0, False)] * len(features_list)
+        if not features_list:
+            return []
+        
+        try:
+            X = np.array([[features.get(col, 0) for col in self.feature_columns] for features in features_list],
+                         dtype=float)
+            X_scaled = self.scaler.transform(X)
+            
+            results = [None] * len(features_list)
+            cache_keys = [None] * len(features_list)
+            if self.prediction_cache is not None:
+                for i in range(len(features_list)):
+                    cache_keys[i] = self.prediction_cache.key(
+                        X_scaled[i:i + 1], self.model_version, need_probabilities, self.cascade_enabled
+                    )
+                    results[i] = self.prediction_cache.get(cache_keys[i])
+            pending = np.array([i for i, cached in enumerate(results) if cached is None], dtype=int)
+            run_model = np.zeros(0, dtype=bool)
+            if len(pending):
+                run_model = self._classify_pending(features_list, X_scaled, pending, need_probabilities,
+                                                   results, cache_keys)
+            
+            # Paths and anomaly scoring for every window in order, cached or not
+            is_anomaly_model = self._detect_model_anomalies(X_scaled)
+            predictions = []
+            for i, (behavior, confidence, path, rule_label) in enumerate(results):
+                self._count_path(path, rule_label)
+                predictions.append((behavior, confidence,
+                                    bool(is_anomaly_model[i]) or self._detect_anomaly(features_list[i])))
+            
+            logger.info(f"Enhanced Batch: {len(features_list)} windows "
+                        f"({len(features_list) - len(pending)} cached, {int(run_model.sum())} model inferences)")
+            return predictions
+            
+        except Exception as e:
+            logger.error(f"Error in enhanced batch prediction: {e}")
+            return [('neutral', 0.0, False)] * len(features_list)
+    
+    def _classify_pending(self, features_list: List[Dict], X_scaled, pending, need_probabilities: bool,
+                          results: List, cache_keys: List):
+        """Fill results[i] for uncached windows with one model call; returns the model-inference mask"""
+        rows = [features_list[i] for i in pending]
+        rule = self.rule_labels(
+            [features.get('entertainment_pct', 0) for features in rows],
+            [features.get('work_pct', 0) for features in rows],
+            [features.get('unethical_pct', 0) for features in rows]
+        )
+        behaviors = rule.astype(object)
+        predicted = np.full(len(rows), '', dtype=object)
+        confidences = np.array([self.rule_confidence(label) if label else 0.0 for label in rule])
+        
+        # Rule short-circuit rows skip the model unless probabilities were asked for
+        run_model = (rule == '') | need_probabilities
+        if run_model.any():
+            X_model = X_scaled[pending[run_model]]
+            if self.cascade_enabled:
+                probabilities, _ = self.predict_cascade(X_model)
+            else:
+                probabilities = self.model.predict_proba(X_model)
+            predicted[run_model] = self.label_encoder.inverse_transform(np.argmax(probabilities, axis=1))
+            confidences[run_model] = probabilities.max(axis=1)
+            behaviors[run_model] = np.where(rule[run_model] != '', rule[run_model], predicted[run_model])
+        
+        for j, i in enumerate(pending):
+            rule_label = str(rule[j])
+            if not rule_label:
+                path = 'model'
+            elif not run_model[j]:
+                path = 'rule_short_circuit'
+            else:
+                path = 'rule_override' if rule_label != predicted[j] else 'rule_agrees'
+            results[i] = (behaviors[j], confidences[j], path, rule_label)
+            if cache_keys[i] is not None:
+                self.prediction_cache.put(cache_keys[i], results[i])
+        return run_model
+    
+    def predict_provisional(self, features):
+        """Rule-only prediction while no trained model is available
+        
+        Dominance overrides decide the label ('neutral' when none fires, with
+        confidence 0) and the feature-pattern checks the anomaly flag.
+        """
+        rule_label = self.rule_label(features)
+        self.path_counts['provisional'] += 1
+        behavior = rule_label or 'neutral'
+        confidence = self.rule_confidence(rule_label) if rule_label else 0.0
+        return behavior, confidence, self._detect_anomaly(features)
+    
+    def probe_label(self, features: Dict, need_probabilities: bool = True) -> Tuple[str, float]:
+        """(behavior, confidence) predict_enhanced would report, without side effects
+        
+        Skips the anomaly detectors (the streaming one learns from every window
+        it scores), the prediction cache and the path counters, so callers can
+        score intermediate windows (early termination) without them counting.
+        """
+        rule_label = self.rule_label(features)
+        if rule_label and not need_probabilities:
+            return rule_label, self.rule_confidence(rule_label)
+        feature_scaled = self.scaler.transform(
+            np.array([[features.get(col, 0) for col in self.feature_columns]])
+        )
+        probabilities = (self.predict_cascade(feature_scaled)[0] if self.cascade_enabled
+                         else self.model.predict_proba(feature_scaled))[0]
+        behavior = rule_label or self.label_encoder.inverse_transform([int(np.argmax(probabilities))])[0]
+        return behavior, float(np.max(probabilities))
+    
+    def rule_label(self, features: Dict) -> str:
+        """Dominance override label for one window ('' when no rule fires)"""
+        return str(self.rule_labels(
+            [features.get('entertainment_pct', 0)],
+            [features.get('work_pct', 0)],
+            [features.get('unethical_pct', 0)]
+        )[0])
+    
+    def calibrate_rules(self, X, y) -> Dict[str, float]:
+        """Measure each dominance rule's precision on labeled rows
+        
+        The rules are fixed thresholds, not fitted, so every labeled training
+        row is an unbiased sample for them.
+        """
+        X, y = np.asarray(X), np.asarray(y)
+        fired = self.rule_labels(*(X[:, self.feature_columns.index(name)]
+                                   for name in ('entertainment_pct', 'work_pct', 'unethical_pct')))
+        self.rule_precision = {
+            label: float(np.mean(y[fired == label] == label))
+            for label in ('entertainment', 'work', 'unethical') if (fired == label).any()
+        }
+        logger.info(f"Dominance rule precision: {self.rule_precision}")
+        return self.rule_precision
+    
+    def rule_confidence(self, label: str) -> float:
+        """Confidence reported when a rule decides label without the model: the rule's precision
+        
+        Runs on the request path, so it never measures anything itself;
+        uncalibrated labels report DEFAULT_RULE_CONFIDENCE.
+        """
+        return (self.rule_precision or {}).get(label, DEFAULT_RULE_CONFIDENCE)
+    
+    def _calibrate_rules_from_training_file(self):
+        """Measure rule precision for models saved before calibration existed (load time)"""
+        try:
+            X, y = self.load_training_matrix()
+        except Exception as e:
+            logger.warning(f"Could not calibrate dominance rules: {e}")
+            return
+        if len(X) == 0:
+            logger.warning(f"No training data for rule calibration - rules report {DEFAULT_RULE_CONFIDENCE}")
+            return
+        self.calibrate_rules(X, y)
+    
+    @staticmethod
+    def rule_labels(ent_pct, work_pct, unethical_pct):
+        """Vectorized dominance overrides: label per window, '' where no rule fires"""
+        ent_pct, work_pct, unethical_pct = (np.asarray(a, dtype=float) for a in (ent_pct, work_pct, unethical_pct))
+        return np.select(
+            [
+                # If entertainment is clearly dominant (>35%), classify as entertainment
+                (ent_pct > 0.35) & (ent_pct > work_pct) & (ent_pct > unethical_pct),
+                # If work is clearly dominant (>40%), classify as work
+                (work_pct > 0.40) & (work_pct > ent_pct),
+                # If unethical is significant (>20%), classify as unethical
+                unethical_pct > 0.20,
+            ],
+            ['entertainment', 'work', 'unethical'],
+            default=''
+        )
+    
+    def enable_prediction_cache(self, max_entries: int = 10000, grid: float = 0.01) -> PredictionCache:
+        """Memoize predict_enhanced on scaled feature vectors snapped to a grid
+        
+        grid is the cell size in standard deviations; windows in the same cell
+        share one result. max_entries=0 disables the cache.
+        """
+        self.prediction_cache = PredictionCache(max_entries, grid) if max_entries else None
+        return self.prediction_cache
+    
+    def prediction_cache_stats(self) -> Dict:
+        """Hit-rate metrics of the prediction memo (empty when disabled)"""
+        return self.prediction_cache.stats() if self.prediction_cache is not None else {}
+    
+    def enable_explanation_cache(self, max_entries: int = 1000, grid: float = 0.01) -> PredictionCache:
+        """Memoize explain_batch like enable_prediction_cache, in its own LRU
+        
+        Explanations are far larger than predictions, so they get their own
+        (smaller) limit and never evict cached predictions.
+        """
+        self.explanation_cache = PredictionCache(max_entries, grid) if max_entries else None
+        return self.explanation_cache
+    
+    def explanation_cache_stats(self) -> Dict:
+        """Hit-rate metrics of the explanation memo (empty when disabled)"""
+        return self.explanation_cache.stats() if self.explanation_cache is not None else {}
+    
+    def _model_changed(self):
+        """Invalidate everything derived from the current model"""
+        self._required_features = None
+        for cache in (self.prediction_cache, self.explanation_cache):
+            if cache is not None:
+                cache.clear()
+    
+    def inference_path_stats(self) -> Dict:
+        """How often each predict_enhanced path was taken since the counters were reset"""
+        paths = ('rule_short_circuit', 'rule_override', 'rule_agrees', 'model')
+        total = sum(self.path_counts[path] for path in paths)
+        stats = {path: self.path_counts[path] for path in paths}
+        stats['total'] = total
+        stats['model_skipped_rate'] = self.path_counts['rule_short_circuit'] / total if total else 0.0
+        stats['rules'] = {k.split(':', 1)[1]: v for k, v in self.path_counts.items() if k.startswith('rule:')}
+        return stats
+    
+    def explain_batch(self, features_matrix, top_k: int = 5) -> List[Dict]:
+        """Per-feature contributions for many windows from XGBoost's native pred_contribs
+        
+        features_matrix: feature dicts or raw rows in feature_columns order.
+        Contributions are log-odds for the model's predicted class (before the
+        dominance overrides) and add up, with the bias, to its margin. Memoized in
+        the explanation cache when enabled; callers always get their own copies.
+        """
+        import xgboost as xgb
+        
+        if not self.is_trained:
+            logger.error("Enhanced model not trained yet")
+            return []
+        
+        rows = [[row.get(col, 0) for col in self.feature_columns] if isinstance(row, dict) else row
+                for row in features_matrix]
+        if not rows:
+            return []
+        X_scaled = self.scaler.transform(np.asarray(rows, dtype=float))
+        
+        explanations = [None] * len(X_scaled)
+        keys = [None] * len(X_scaled)
+        cache = self.explanation_cache
+        if cache is not None:
+            for i, row in enumerate(X_scaled):
+                keys[i] = cache.key(row, self.model_version, top_k)
+                explanations[i] = cache.get(keys[i])
+        
+        missing = [i for i, explanation in enumerate(explanations) if explanation is None]
+        if missing:
+            # Same trees predict() uses: stop at the early-stopping best iteration
+            best_iteration = getattr(self.model, 'best_iteration', None) if self.model.early_stopping_rounds else None
+            iteration_range = (0, best_iteration + 1) if best_iteration is not None else (0, 0)
+            contribs = self.model.get_booster().predict(
+                xgb.DMatrix(X_scaled[missing]), pred_contribs=True, iteration_range=iteration_range
+            )
+            if contribs.ndim == 2:
+                contribs = contribs[:, None, :]  # Binary models have one output
+            
+            # Margin of each class = bias column + feature contributions
+            predicted = (contribs.sum(axis=2)).argmax(axis=1)
+            labels = self.label_encoder.inverse_transform(predicted)
+            for j, i in enumerate(missing):
+                values = contribs[j, predicted[j]]
+                order = np.argsort(-np.abs(values[:-1]))
+                explanations[i] = {
+                    'behavior': labels[j],
+                    'bias': float(values[-1]),
+                    'contributions': dict(zip(self.feature_columns, values[:-1].tolist())),
+                    'top_features': [(self.feature_columns[f], float(values[f])) for f in order[:top_k]],
+                }
+                if keys[i] is not None:
+                    cache.put(keys[i], explanations[i])
+        
+        # Cached dicts are shared between callers: hand out copies
+        return [copy.deepcopy(explanation) for explanation in explanations] if cache is not None else explanations
+    
+    def explain(self, features: Dict, top_k: int = 5) -> Dict:
+        """Feature contributions for a single window (see explain_batch)"""
+        explanations = self.explain_batch([features], top_k)
+        return explanations[0] if explanations else {}
+    
+    def drift_reference_sketch(self) -> Optional[KLLSketch]:
+        """Training-distribution sketch; built from the training data for older models"""
+        if self.drift_reference is None:
+            X, _ = self.load_training_matrix()
+            if len(X) == 0:
+                return None
+            self.drift_reference = KLLSketch(len(self.feature_columns)).update_batch(X)
+            logger.info(f"Built drift reference sketch from {len(X)} training rows")
+        return self.drift_reference
+    
+    def set_anomaly_mode(self, mode: str):
+        """Select 'isolation_forest', 'streaming' (Half-Space Trees) or 'both'
+        
+        Models saved without a streaming detector get one fitted on the
+        reservoir sample of training rows.
+        """
+        if mode not in ANOMALY_MODES:
+            raise ValueError(f"Unknown anomaly mode: {mode}")
+        if mode != 'isolation_forest' and self.streaming_detector is None and self.is_trained:
+            if self.reservoir_X is None:
+                self._rebuild_reservoir_from_training_file()
+            if self.reservoir_X is not None:
+                self.streaming_detector = HalfSpaceTrees().fit(self.scaler.transform(self.reservoir_X))
+                logger.info(f"Fitted streaming anomaly detector on {len(self.reservoir_X)} reservoir rows")
+        self.anomaly_mode = mode
+    
+    def _detect_model_anomaly(self, feature_scaled) -> bool:
+        """Learned anomaly check for one scaled window according to anomaly_mode"""
+        return bool(self._detect_model_anomalies(feature_scaled)[0])
+    
+    def _detect_model_anomalies(self, X_scaled) -> np.ndarray:
+        """Learned anomaly flags for scaled windows (rows) according to anomaly_mode"""
+        mode = self.anomaly_mode
+        if mode not in ANOMALY_MODES:
+            raise ValueError(f"Unknown anomaly mode: {mode}")
+        if mode != 'isolation_forest' and self.streaming_detector is None:
+            logger.warning("No streaming detector in this model - using Isolation Forest")
+            mode = 'isolation_forest'
+        
+        is_anomaly = np.zeros(len(X_scaled), dtype=bool)
+        if mode in ('isolation_forest', 'both'):
+            # Same as IsolationForest.predict() == -1
+            is_anomaly |= self.anomaly_detector.decision_function(X_scaled) < 0
+        if mode in ('streaming', 'both'):
+            # Scores against the reference profile, then learns from each window in order
+            for i, row in enumerate(X_scaled):
+                _, is_anomaly_stream = self.streaming_detector.score_and_update(row)
+                is_anomaly[i] |= bool(is_anomaly_stream)
+        return is_anomaly
+    
     def _detect_anomaly(self, features):
         """Enhanced anomaly detection"""
         # Define normal ranges based on training data
@@ -865,30 +1830,73 @@ class EnhancedBehaviorClassifier:
     
     def save_model(self, filepath='enhanced_behavior_model.pkl'):
         """Save trained enhanced XGBoost model"""
+        import joblib
+        
         if self.is_trained:
             model_data = {
                 'model': self.model,
                 'scaler': self.scaler,
                 'label_encoder': self.label_encoder,
                 'anomaly_detector': self.anomaly_detector,
+                'streaming_detector': self.streaming_detector,
+                'drift_reference': self.drift_reference,
                 'feature_columns': self.feature_columns,
                 'cv_scores': self.cv_scores,
-                'is_trained': self.is_trained
+                'training_split': self.training_split,
+                'training_pipeline': self.training_pipeline,
+                'rule_precision': self.rule_precision,
+                'is_trained': self.is_trained,
+                'cascade': {
+                    'model': self.cascade_model,
+                    'threshold': self.cascade_threshold,
+                    'stats': self.cascade_stats
+                },
+                'reservoir': {
+                    'X': self.reservoir_X,
+                    'y': self.reservoir_y,
+                    'seen': self.reservoir_seen
+                }
             }
             joblib.dump(model_data, filepath)
             logger.info(f"Enhanced XGBoost model saved to {filepath}")
+            
+            # Persist the search config and frontier next to the model
+            if self.search_results:
+                search_file = os.path.splitext(filepath)[0] + '_search.json'
+                with open(search_file, 'w') as f:
+                    json.dump(self.search_results, f, indent=2)
+                logger.info(f"Hyperparameter search results saved to {search_file}")
     
     def load_model(self, filepath='enhanced_behavior_model.pkl'):
         """Load trained enhanced XGBoost model"""
+        import joblib
+        from sklearn.ensemble import IsolationForest
+        
         try:
             model_data = joblib.load(filepath)
             self.model = model_data['model']
             self.scaler = model_data['scaler']
             self.label_encoder = model_data['label_encoder']
             self.anomaly_detector = model_data.get('anomaly_detector', IsolationForest(contamination=0.1, random_state=42))
+            self.streaming_detector = model_data.get('streaming_detector')
+            self.drift_reference = model_data.get('drift_reference')
             self.feature_columns = model_data['feature_columns']
             self.cv_scores = model_data.get('cv_scores')
+            self.training_split = model_data.get('training_split')
+            self.training_pipeline = model_data.get('training_pipeline', 'in_memory')
+            self.rule_precision = model_data.get('rule_precision')
             self.is_trained = model_data.get('is_trained', True)
+            self._model_changed()
+            reservoir = model_data.get('reservoir') or {}
+            self.reservoir_X = reservoir.get('X')
+            self.reservoir_y = reservoir.get('y')
+            self.reservoir_seen = reservoir.get('seen', 0)
+            cascade = model_data.get('cascade') or {}
+            self.cascade_model = cascade.get('model')
+            self.cascade_threshold = cascade.get('threshold')
+            self.cascade_stats = cascade.get('stats')
+            if self.rule_precision is None:
+                self._calibrate_rules_from_training_file()
             logger.info(f"Enhanced XGBoost model loaded from {filepath}")
         except Exception as e:
             logger.error(f"Error loading enhanced model: {e}")
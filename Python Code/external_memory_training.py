@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Out-of-Core Training over Date-Partitioned Feature Files
+========================================================
+
+Trains the Enhanced XGBoost classifier on feature data that does not fit
+in memory. Partitions are streamed through an `xgboost.DataIter`, so only
+one partition is materialized at a time while XGBoost builds its quantile
+sketch (external-memory QuantileDMatrix where available).
+
+Partition layout (any depth, date taken from the file or directory name):
+    features/2025-01-01.jsonl
+    features/date=2025-01-02/part-0.csv
+    ...
+
+Each row carries the 23 feature columns plus `label`, like training_data.json.
+The newest partitions become the test split, the ones before them the
+validation split, everything older is used for training.
+
+Feature semantics match the in-memory pipeline: missing enhanced columns are
+synthesized by the classifier's seeded augmentation (seeded per file, so every
+pass over a partition sees the same values) and the dominance rules are
+calibrated. What differs, and is recorded as training_pipeline='out_of_core'
+in the saved model:
+    - the split is by partition date, not the seeded stratified row split, so
+      no training_split is stored and model_compaction cannot re-derive one
+    - rule precision is measured on the bounded row sample, not every row
+    - no cross-validation, hyperparameter search or cascade
+"""
+
+import glob
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+import zlib
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.preprocessing import StandardScaler, LabelEncoder
+
+from drift_monitor import KLLSketch
+from enhanced_classifier import AUGMENTATION_SEED
+from streaming_anomaly import HalfSpaceTrees
+
+logger = logging.getLogger(__name__)
+
+DATE_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2})')
+PARTITION_EXTENSIONS = ('.jsonl', '.ndjson', '.json', '.csv')
+
+
+def discover_partitions(partition_dir: str) -> "OrderedDict[str, List[str]]":
+    """Group feature files by partition date, oldest first"""
+    partitions = {}
+    for path in glob.glob(os.path.join(partition_dir, '**', '*'), recursive=True):
+        if not path.endswith(PARTITION_EXTENSIONS) or not os.path.isfile(path):
+            continue
+        match = DATE_PATTERN.search(os.path.relpath(path, partition_dir))
+        if not match:
+            logger.warning(f"Skipping feature file without a partition date: {path}")
+            continue
+        partitions.setdefault(match.group(1), []).append(path)
+
+    return OrderedDict((date, sorted(partitions[date])) for date in sorted(partitions))
+
+
+def split_partitions(partitions: "OrderedDict[str, List[str]]", val_partitions: int = 1,
+                     test_partitions: int = 1) -> Tuple[List[str], List[str], List[str]]:
+    """Split by partition date: newest -> test, before that -> validation, rest -> train"""
+    dates = list(partitions)
+    if len(dates) < val_partitions + test_partitions + 1:
+        raise ValueError(f"Need at least {val_partitions + test_partitions + 1} partitions, found {len(dates)}")
+
+    train_dates = dates[:len(dates) - val_partitions - test_partitions]
+    val_dates = dates[len(train_dates):len(train_dates) + val_partitions]
+    test_dates = dates[len(train_dates) + val_partitions:]
+
+    def files(selected):
+        return [path for date in selected for path in partitions[date]]
+
+    logger.info(f"Partition split - train: {train_dates[0]}..{train_dates[-1]}, "
+                f"validation: {', '.join(val_dates)}, test: {', '.join(test_dates)}")
+    return files(train_dates), files(val_dates), files(test_dates)
+
+
+def read_partition(path: str, feature_columns: List[str],
+                   augment: Optional[Callable] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Read one feature file into a float32 matrix and label array
+
+    augment(df, missing_columns, rng) fills columns the file lacks (the
+    classifier's _augment_missing_features); without it they are zero.
+    """
+    if path.endswith('.csv'):
+        df = pd.read_csv(path)
+    elif path.endswith(('.jsonl', '.ndjson')):
+        df = pd.read_json(path, lines=True)
+    else:
+        with open(path, 'r') as f:
+            df = pd.DataFrame(json.load(f))
+
+    missing = [col for col in feature_columns if col not in df.columns]
+    if missing and augment is not None and len(df):
+        # Same draws on every read of this file (scaler pass, DataIter passes, test scoring)
+        augment(df, missing, np.random.default_rng([AUGMENTATION_SEED, zlib.crc32(path.encode())]))
+    for col in missing:
+        if col not in df.columns:
+            df[col] = 0
+    X = df[feature_columns].fillna(0).to_numpy(dtype=np.float32)
+    y = df['label'].astype(str).to_numpy()
+    return X, y
+
+
+class PartitionIter(xgb.DataIter):
+    """Feeds one scaled partition at a time to XGBoost"""
+
+    def __init__(self, files: List[str], feature_columns: List[str], scaler: StandardScaler,
+                 label_encoder: LabelEncoder, cache_prefix: str = None, augment: Optional[Callable] = None):
+        self.files = files
+        self.feature_columns = feature_columns
+        self.augment = augment
+        self.scaler = scaler
+        self.label_encoder = label_encoder
+        self.rows = 0
+        self._index = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data) -> bool:
+        """Load the next partition; return False when exhausted"""
+        if self._index == len(self.files):
+            return False
+
+        X, y = read_partition(self.files[self._index], self.feature_columns, self.augment)
+        known = np.isin(y, self.label_encoder.classes_)
+        X, y = X[known], y[known]
+        self._index += 1
+        if len(X):
+            self.rows += len(X)
+            input_data(data=self.scaler.transform(X).astype(np.float32),
+                       label=self.label_encoder.transform(y))
+        return True
+
+    def reset(self):
+        """Rewind to the first partition"""
+        self._index = 0
+        self.rows = 0
+
+
+def train_out_of_core(classifier, partition_dir: str, val_partitions: int = 1,
+                      test_partitions: int = 1, num_boost_round: int = None,
+                      sample_size: int = 5000) -> Dict:
+    """Train an EnhancedBehaviorClassifier from partitions without loading them all"""
+    start = time.perf_counter()
+    feature_columns = classifier.feature_columns
+    augment = classifier._augment_missing_features
+    partitions = discover_partitions(partition_dir)
+    train_files, val_files, test_files = split_partitions(partitions, val_partitions, test_partitions)
+
+    # Pass 1: streaming scaler statistics, label set, drift sketch and a bounded row sample
+    scaler = StandardScaler()
+    drift_reference = KLLSketch(len(feature_columns))
+    label_counts = Counter()
+    sample_X, sample_y, seen = [], [], 0
+    rng = np.random.default_rng(42)
+    for path in train_files:
+        X, y = read_partition(path, feature_columns, augment)
+        if len(X) == 0:
+            continue
+        scaler.partial_fit(X)
+        drift_reference.update_batch(X)
+        label_counts.update(y)
+        for row, label in zip(X, y):
+            seen += 1
+            if len(sample_X) < sample_size:
+                sample_X.append(row)
+                sample_y.append(label)
+            else:
+                j = int(rng.integers(seen))
+                if j < sample_size:
+                    sample_X[j] = row
+                    sample_y[j] = label
+
+    if not label_counts:
+        raise ValueError(f"No training rows found in {partition_dir}")
+
+    label_encoder = LabelEncoder().fit(sorted(label_counts))
+    logger.info(f"Out-of-core training rows: {seen} across {len(train_files)} files")
+    logger.info(f"Label distribution: {label_counts}")
+
+    # Pass 2: quantile sketch over the streamed partitions, cached on disk
+    cache_dir = tempfile.mkdtemp(prefix='xgb_extmem_')
+    try:
+        train_iter = PartitionIter(train_files, feature_columns, scaler, label_encoder,
+                                   cache_prefix=os.path.join(cache_dir, 'train'), augment=augment)
+        if hasattr(xgb, 'ExtMemQuantileDMatrix'):
+            dtrain = xgb.ExtMemQuantileDMatrix(train_iter)
+            dval = xgb.QuantileDMatrix(
+                PartitionIter(val_files, feature_columns, scaler, label_encoder, augment=augment), ref=dtrain
+            )
+        else:
+            # Older XGBoost: paged external-memory DMatrix
+            dtrain = xgb.DMatrix(train_iter)
+            dval = xgb.DMatrix(PartitionIter(val_files, feature_columns, scaler, label_encoder,
+                                             cache_prefix=os.path.join(cache_dir, 'val'), augment=augment))
+
+        params = classifier.model.get_xgb_params()
+        params.update(num_class=len(label_encoder.classes_), tree_method='hist')
+        params = {k: v for k, v in params.items() if v is not None}
+        rounds = num_boost_round or classifier.model.n_estimators
+        early_stopping = classifier.model.early_stopping_rounds or 10
+
+        booster = xgb.train(
+            params, dtrain, num_boost_round=rounds,
+            evals=[(dval, 'validation')],
+            early_stopping_rounds=early_stopping,
+            verbose_eval=False
+        )
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    # Wrap the booster so predict_enhanced and save_model keep working unchanged
+    model = xgb.XGBClassifier(**classifier.model.get_params())
+    model.load_model(bytearray(booster.save_raw('json')))
+
+    # Test split is scored one partition at a time
+    correct = total = 0
+    for path in test_files:
+        X, y = read_partition(path, feature_columns, augment)
+        known = np.isin(y, label_encoder.classes_)
+        if not known.any():
+            continue
+        predictions = model.predict(scaler.transform(X[known]))
+        correct += int((predictions == label_encoder.transform(y[known])).sum())
+        total += int(known.sum())
+
+    sample_X = np.array(sample_X, dtype=float)
+    sample_y = np.array(sample_y)
+
+    classifier.model = model
+    classifier.scaler = scaler
+    classifier.label_encoder = label_encoder
+    classifier.anomaly_detector.fit(scaler.transform(sample_X))
+    classifier.streaming_detector = HalfSpaceTrees().fit(scaler.transform(sample_X))
+    classifier.drift_reference = drift_reference
+    classifier._reset_reservoir(sample_X, sample_y)
+    classifier.calibrate_rules(sample_X, sample_y)
+    classifier.cv_scores = None
+    classifier.is_trained = True
+
+    stats = {
+        'train_rows': seen,
+        'train_files': len(train_files),
+        'val_files': len(val_files),
+        'test_files': len(test_files),
+        'best_iteration': booster.best_iteration,
+        'best_val_mlogloss': booster.best_score,
+        'test_rows': total,
+        'test_accuracy': correct / total if total else None,
+        'seconds': time.perf_counter() - start,
+    }
+    test_accuracy = f"{stats['test_accuracy']:.3f}" if total else 'n/a'
+    logger.info(f"Out-of-core training finished in {stats['seconds']:.1f}s - "
+                f"best iteration {stats['best_iteration']}, test accuracy {test_accuracy}")
+    return stats
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Hyperparameter Search for the Enhanced XGBoost Classifier
+=========================================================
+
+Random search or successive halving over tree depth, learning rate,
+subsampling and regularization. Every trial trains with real early
+stopping on the validation split and runs in a process pool with its
+own XGBoost thread limit, so trials never oversubscribe the CPU.
+"""
+
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from resource_scheduler import get_scheduler
+
+# Parameters shared by every trial (same as EnhancedBehaviorClassifier)
+BASE_PARAMS = {
+    'random_state': 42,
+    'eval_metric': 'mlogloss',
+    'objective': 'multi:softprob',
+}
+
+# (kind, low, high) for continuous params, list of choices otherwise
+SEARCH_SPACE = {
+    'max_depth': [3, 4, 5, 6, 8],
+    'min_child_weight': [1, 3, 6, 10],
+    'learning_rate': ('log', 0.02, 0.3),
+    'subsample': ('uniform', 0.5, 1.0),
+    'colsample_bytree': ('uniform', 0.5, 1.0),
+    'reg_alpha': ('log', 1e-3, 10.0),
+    'reg_lambda': ('log', 1e-2, 10.0),
+}
+
+# Per-process trial data, set once by the pool initializer
+_worker_data = {}
+
+
+def sample_configs(n_trials: int, seed: int = 42) -> List[Dict]:
+    """Draw random configurations from SEARCH_SPACE"""
+    rng = np.random.default_rng(seed)
+    configs = []
+    for _ in range(n_trials):
+        config = {}
+        for name, space in SEARCH_SPACE.items():
+            if isinstance(space, list):
+                config[name] = space[int(rng.integers(len(space)))]
+            elif space[0] == 'log':
+                config[name] = float(math.exp(rng.uniform(math.log(space[1]), math.log(space[2]))))
+            else:
+                config[name] = float(rng.uniform(space[1], space[2]))
+        configs.append(config)
+    return configs
+
+
+def _init_worker(X_train, y_train, X_val, y_val, n_threads):
+    """Pool initializer: ship the data once per process and cap native threads"""
+    os.environ['OMP_NUM_THREADS'] = str(n_threads)
+    _worker_data.update(X_train=X_train, y_train=y_train, X_val=X_val, y_val=y_val, n_threads=n_threads)
+
+
+def _run_trial(task: Dict) -> Dict:
+    """Train one configuration with early stopping and report its metrics"""
+    import xgboost as xgb
+
+    config = task['config']
+    model = xgb.XGBClassifier(
+        **BASE_PARAMS,
+        **config,
+        n_estimators=task['n_estimators'],
+        early_stopping_rounds=task['early_stopping_rounds'],
+        n_jobs=_worker_data['n_threads'],
+    )
+
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    model.fit(
+        _worker_data['X_train'], _worker_data['y_train'],
+        eval_set=[(_worker_data['X_val'], _worker_data['y_val'])],
+        verbose=False
+    )
+    fit_seconds = time.perf_counter() - start
+    cpu_seconds = time.process_time() - cpu_start
+
+    val_accuracy = float((model.predict(_worker_data['X_val']) == _worker_data['y_val']).mean())
+    return {
+        'trial_id': task['trial_id'],
+        'config': config,
+        'n_estimators': task['n_estimators'],
+        'best_iteration': int(model.best_iteration),
+        'val_logloss': float(model.best_score),
+        'val_accuracy': val_accuracy,
+        'fit_seconds': fit_seconds,
+        'cpu_seconds': cpu_seconds,
+    }
+
+
+class HyperparameterSearch:
+    """Random or successive-halving search run in a process pool"""
+
+    def __init__(self, mode: str = 'random', n_trials: int = 20,
+                 max_rounds: int = 300, min_rounds: int = 25, halving_factor: int = 3,
+                 early_stopping_rounds: int = 20, max_workers: Optional[int] = None,
+                 seed: int = 42):
+        if mode not in ('random', 'halving'):
+            raise ValueError(f"Unknown search mode: {mode}")
+        self.mode = mode
+        self.n_trials = n_trials
+        self.max_rounds = max_rounds
+        self.min_rounds = min_rounds
+        self.halving_factor = halving_factor
+        self.early_stopping_rounds = early_stopping_rounds
+        self.seed = seed
+
+        # Split cores so workers x threads never exceeds the machine
+        allocation = get_scheduler().allocate(n_trials, max_outer=max_workers)
+        self.max_workers = allocation.outer
+        self.threads_per_trial = allocation.inner
+
+    def run(self, X_train, y_train, X_val, y_val) -> Dict:
+        """Run the search and return the best config with the full trial log"""
+        start = time.perf_counter()
+        configs = sample_configs(self.n_trials, self.seed)
+
+        with ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_init_worker,
+            initargs=(X_train, y_train, X_val, y_val, self.threads_per_trial)
+        ) as pool:
+            if self.mode == 'random':
+                trials = self._random(pool, configs)
+            else:
+                trials = self._successive_halving(pool, configs)
+
+        # Only trials trained with the largest budget are comparable (earlier halving rungs used fewer rounds)
+        final_budget = max(t['n_estimators'] for t in trials)
+        best = min((t for t in trials if t['n_estimators'] == final_budget),
+                   key=lambda t: (t['val_logloss'], -t['val_accuracy']))
+        return {
+            'mode': self.mode,
+            'n_trials': len(trials),
+            'max_workers': self.max_workers,
+            'threads_per_trial': self.threads_per_trial,
+            'search_seconds': time.perf_counter() - start,
+            'best_config': best['config'],
+            'best_n_estimators': best['n_estimators'],
+            'early_stopping_rounds': self.early_stopping_rounds,
+            'best_iteration': best['best_iteration'],
+            'best_val_logloss': best['val_logloss'],
+            'best_val_accuracy': best['val_accuracy'],
+            'frontier': pareto_frontier(trials),
+            'trials': trials,
+        }
+
+    def _task(self, trial_id: int, config: Dict, n_estimators: int) -> Dict:
+        """Build a picklable trial description"""
+        return {
+            'trial_id': trial_id,
+            'config': config,
+            'n_estimators': n_estimators,
+            'early_stopping_rounds': self.early_stopping_rounds,
+        }
+
+    def _random(self, pool, configs: List[Dict]) -> List[Dict]:
+        """Every config gets the full round budget"""
+        tasks = [self._task(i, c, self.max_rounds) for i, c in enumerate(configs)]
+        return list(pool.map(_run_trial, tasks))
+
+    def _successive_halving(self, pool, configs: List[Dict]) -> List[Dict]:
+        """Start all configs on a small budget, keep the best 1/factor each rung"""
+        all_trials = []
+        survivors = list(enumerate(configs))
+        budget = self.min_rounds
+
+        while survivors:
+            tasks = [self._task(i, c, budget) for i, c in survivors]
+            rung = list(pool.map(_run_trial, tasks))
+            for trial in rung:
+                trial['rung_budget'] = budget
+            all_trials.extend(rung)
+
+            if budget >= self.max_rounds or len(survivors) == 1:
+                break
+
+            keep = max(1, len(survivors) // self.halving_factor)
+            rung.sort(key=lambda t: t['val_logloss'])
+            survivors = [(t['trial_id'], t['config']) for t in rung[:keep]]
+            budget = min(self.max_rounds, budget * self.halving_factor)
+
+        return all_trials
+
+
+def pareto_frontier(trials: List[Dict]) -> List[Dict]:
+    """Trials not beaten on both fit time and validation accuracy"""
+    frontier = []
+    best_accuracy = -1.0
+    for trial in sorted(trials, key=lambda t: (t['fit_seconds'], -t['val_accuracy'])):
+        if trial['val_accuracy'] > best_accuracy:
+            best_accuracy = trial['val_accuracy']
+            frontier.append({
+                'trial_id': trial['trial_id'],
+                'fit_seconds': trial['fit_seconds'],
+                'val_accuracy': trial['val_accuracy'],
+                'val_logloss': trial['val_logloss'],
+                'best_iteration': trial['best_iteration'],
+            })
+    return frontier
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Import-Time Budget Check
+========================
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter for
+each command-line entry module and fails when importing it pulls in a heavy
+dependency (pandas, scikit-learn, XGBoost, joblib) or takes longer than its
+budget. Keeps CLI startup (`--help`, cached-model runs) from regressing as
+modules are added.
+
+Usage:
+    python import_budget.py            # check every module
+    python import_budget.py main 300   # check one module against a 300 ms budget
+    python -m pytest test_import_budget.py  # heavy-dependency check as a test suite
+    IMPORT_BUDGET_TIMING=1 python -m pytest test_import_budget.py  # plus the timing budgets
+
+The timing budgets are wall-clock and noisy on loaded machines, so the
+test suite only enforces them when asked to.
+"""
+
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Cumulative import time allowed per module, in milliseconds (numpy alone is ~100 ms)
+BUDGETS_MS = {
+    'main': 500,
+    'run_analysis': 500,
+    'enhanced_classifier': 500,
+    'csv_to_json_converter': 100,
+    'analysis_daemon': 200,
+}
+
+# Loaded on first use only - importing any of these at module level is a regression
+HEAVY_MODULES = ('pandas', 'sklearn', 'xgboost', 'joblib', 'scipy')
+
+
+def heavy_modules_loaded(module: str) -> List[str]:
+    """Heavy packages present in sys.modules after importing module in a fresh interpreter"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    probe = (f"import sys, {module}; "
+             f"print(' '.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))")
+    proc = subprocess.run([sys.executable, '-c', probe], cwd=here, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr}")
+    return proc.stdout.split()
+
+
+def measure_import(module: str) -> Tuple[float, Dict[str, float]]:
+    """Cumulative import time of module (ms) and of every package it loaded"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=here, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr}")
+
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        # "import time: <self us> | <cumulative us> | <indented module name>"
+        _, cumulative_us, name = line.split('|')
+        cumulative[name.strip()] = int(cumulative_us) / 1000
+    return cumulative.get(module, 0.0), cumulative
+
+
+def check_module(module: str, budget_ms: float) -> List[str]:
+    """Budget violations for one module (empty when it passes)"""
+    total_ms, loaded = measure_import(module)
+    problems = []
+    heavy = sorted(name for name in loaded if name.split('.')[0] in HEAVY_MODULES and '.' not in name)
+    if heavy:
+        problems.append(f"{module} imports heavy dependencies at load time: {', '.join(heavy)}")
+    if total_ms > budget_ms:
+        problems.append(f"{module} takes {total_ms:.0f} ms to import (budget {budget_ms:.0f} ms)")
+    status = "❌" if problems else "✅"
+    print(f"{status} {module:<24} {total_ms:7.1f} ms (budget {budget_ms:.0f} ms)")
+    return problems
+
+
+def main():
+    if len(sys.argv) > 1:
+        budgets = {sys.argv[1]: float(sys.argv[2]) if len(sys.argv) > 2 else BUDGETS_MS.get(sys.argv[1], 500)}
+    else:
+        budgets = BUDGETS_MS
+
+    problems = []
+    for module, budget_ms in budgets.items():
+        problems.extend(check_module(module, budget_ms))
+
+    for problem in problems:
+        print(f"   {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Adaptive Micro-Batching Inference Scheduler
+===========================================
+
+Sits between concurrent callers and EnhancedBehaviorClassifier. Each caller
+submits one window's features and gets a future; a single worker thread
+collects requests for up to the current batch window or max_batch_rows,
+runs one predict_enhanced_batch call (one scaler transform, one XGBoost
+predict_proba, one Isolation Forest pass) and fans the predictions back out.
+
+The batch window adapts:
+
+- to the arrival rate - it never waits longer than max_batch_rows arrivals
+  take at the observed rate, and not at all when the next request is not
+  expected within the window (a lone caller pays no batching delay);
+- to latency - every adjust_every completed requests, their p99 (queueing +
+  inference) is compared with p99_target_ms: above target the window halves,
+  with clear headroom it grows by a tenth of max_wait_ms (AIMD).
+
+Requests are grouped by classifier and need_probabilities, so hot swaps and
+mixed callers are batched separately and never see each other's model.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest inter-arrival gap in the arrival-rate EWMA
+ARRIVAL_EWMA_ALPHA = 0.1
+
+
+class _Request:
+    __slots__ = ('features', 'need_probabilities', 'classifier', 'future', 'enqueued')
+
+    def __init__(self, features: Dict, need_probabilities: bool, classifier):
+        self.features = features
+        self.need_probabilities = need_probabilities
+        self.classifier = classifier
+        self.future = Future()
+        self.enqueued = time.monotonic()
+
+
+class MicroBatcher:
+    """Collects single-window predictions into adaptive batches"""
+
+    def __init__(self, classifier, max_batch_rows: int = 64, max_wait_ms: float = 10.0,
+                 p99_target_ms: float = 50.0, adjust_every: int = 100):
+        self.classifier = classifier  # Default for submit(); callers may pass their own snapshot
+        self.max_batch_rows = max_batch_rows
+        self.max_wait_ms = max_wait_ms
+        self.p99_target_ms = p99_target_ms
+        self.adjust_every = adjust_every
+
+        self.wait_ms = max_wait_ms / 2
+        self._gap_ewma: Optional[float] = None  # Seconds between arrivals
+        self._last_arrival: Optional[float] = None
+        self._latencies: List[float] = []       # Since the last window adjustment, ms
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self.batches = 0
+        self.rows = 0
+        self.full_batches = 0
+        self.last_p99_ms: Optional[float] = None
+
+        self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, features: Dict, need_probabilities: bool = True, classifier=None) -> Future:
+        """Queue one window; the future resolves to (behavior, confidence, is_anomaly)"""
+        request = _Request(features, need_probabilities, classifier or self.classifier)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed")
+            if self._last_arrival is not None:
+                gap = request.enqueued - self._last_arrival
+                self._gap_ewma = gap if self._gap_ewma is None else (
+                    ARRIVAL_EWMA_ALPHA * gap + (1 - ARRIVAL_EWMA_ALPHA) * self._gap_ewma)
+            self._last_arrival = request.enqueued
+            self._queue.put(request)
+        return request.future
+
+    def predict(self, features: Dict, need_probabilities: bool = True, classifier=None,
+                timeout: Optional[float] = None) -> Tuple:
+        """Blocking submit()"""
+        return self.submit(features, need_probabilities, classifier).result(timeout)
+
+    async def predict_async(self, features: Dict, need_probabilities: bool = True, classifier=None) -> Tuple:
+        """submit() for asyncio callers"""
+        return await asyncio.wrap_future(self.submit(features, need_probabilities, classifier))
+
+    def _window_seconds(self) -> float:
+        """How long the batch opened by the current request may wait for company"""
+        with self._lock:
+            gap = self._gap_ewma
+        window = self.wait_ms / 1000
+        if gap is None or gap >= window:
+            return 0.0  # Next request not expected in time: waiting would only add latency
+        return min(window, gap * (self.max_batch_rows - 1))
+
+    def _run(self):
+        closing = False
+        while not closing:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            deadline = first.enqueued + self._window_seconds()
+            while len(batch) < self.max_batch_rows:
+                remaining = deadline - time.monotonic()
+                try:
+                    # Requests already queued always join, even past the deadline
+                    request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    closing = True
+                    break
+                batch.append(request)
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: List[_Request]):
+        """One batched inference per (classifier, need_probabilities) group"""
+        groups: Dict[Tuple[int, bool], List[_Request]] = {}
+        for request in batch:
+            groups.setdefault((id(request.classifier), request.need_probabilities), []).append(request)
+
+        for requests in groups.values():
+            try:
+                predictions = requests[0].classifier.predict_enhanced_batch(
+                    [request.features for request in requests], requests[0].need_probabilities
+                )
+            except Exception as e:
+                logger.error(f"Batched inference failed: {e}")
+                for request in requests:
+                    request.future.set_exception(e)
+                continue
+            for request, prediction in zip(requests, predictions):
+                request.future.set_result(prediction)
+
+        done = time.monotonic()
+        self.batches += 1
+        self.rows += len(batch)
+        self.full_batches += len(batch) >= self.max_batch_rows
+        self._latencies.extend((done - request.enqueued) * 1000 for request in batch)
+        if len(self._latencies) >= self.adjust_every:
+            self._adjust_window()
+
+    def _adjust_window(self):
+        """AIMD on the batch window from the p99 of the requests since the last adjustment"""
+        latencies = sorted(self._latencies)
+        self._latencies = []
+        p99 = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))]
+        self.last_p99_ms = p99
+        previous = self.wait_ms
+        if p99 > self.p99_target_ms:
+            self.wait_ms = self.wait_ms / 2
+        elif p99 < 0.8 * self.p99_target_ms:
+            self.wait_ms = min(self.max_wait_ms, self.wait_ms + self.max_wait_ms / 10)
+        if self.wait_ms != previous:
+            logger.debug(f"Micro-batch window {previous:.2f} -> {self.wait_ms:.2f} ms (p99 {p99:.1f} ms)")
+
+    def close(self, timeout: float = 5.0):
+        """Finish queued requests and stop the worker"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._worker.join(timeout)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            gap = self._gap_ewma
+        return {
+            'batches': self.batches,
+            'rows': self.rows,
+            'mean_batch_rows': self.rows / self.batches if self.batches else 0.0,
+            'full_batches': self.full_batches,
+            'wait_ms': self.wait_ms,
+            'max_batch_rows': self.max_batch_rows,
+            'arrival_rate_per_second': 1 / gap if gap else None,
+            'p99_ms': self.last_p99_ms,
+            'p99_target_ms': self.p99_target_ms,
+            'queued': self._queue.qsize(),
+        }
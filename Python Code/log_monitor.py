@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Continuous Log Monitoring
+=========================
+
+Follows a growing resolver log - newline-delimited JSON or a CSV export
+(NextDNS, Pi-hole, ...) - with asyncio, like `tail -F`:
+
+- LogTailer reads only the bytes appended since the last poll, keeping
+  (inode, offset). When the file is rotated (new inode) the old handle is
+  drained first; a truncated file is re-read from the start.
+- WindowTracker keeps one FeatureAccumulator per active client and closes
+  tumbling windows of window_minutes by log time (as
+  training_dataset_builder.slice_windows does). Windows of clients that went
+  quiet close once the stream's newest timestamp passes their end.
+- LogMonitor ties both to NetworkBehaviorParser.analyze_features, so every
+  closed window produces a classification.
+
+Memory is the partial last line plus one accumulator per client with an
+open window; nothing is re-read.
+"""
+
+import asyncio
+import csv
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from csv_to_json_converter import detect_column_mapping
+from log_stream import FeatureAccumulator
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_BYTES = 1024 * 1024
+
+
+class LogTailer:
+    """Rotation-aware follower of an appended NDJSON or CSV log file"""
+
+    def __init__(self, path: str, poll_interval: float = 1.0, from_start: bool = False):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.from_start = from_start
+        self.is_csv = path.lower().endswith('.csv')
+
+        self._file = None
+        self._inode: Optional[Tuple[int, int]] = None
+        self._offset = 0
+        self._partial = b''
+        self._csv_mapping = None
+        self._started = False
+        self._stopped = False
+
+        self.lines = 0
+        self.skipped = 0
+        self.rotations = 0
+
+    def _open(self, at_end: bool) -> bool:
+        """Open the current file at its start or end; False if it does not exist (yet)"""
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return False
+        stat = os.fstat(f.fileno())
+        self._file = f
+        self._inode = (stat.st_dev, stat.st_ino)
+        self._partial = b''
+        self._csv_mapping = None
+        self._offset = 0
+        if self.is_csv and at_end:
+            self._parse_line(f.readline())  # Header row, even when skipping existing rows
+        if at_end:
+            self._offset = f.seek(0, os.SEEK_END)
+        return True
+
+    def start(self) -> bool:
+        """Open the file now, at its end unless from_start; False if it does not exist yet
+
+        Records (inode, offset) synchronously, so lines appended after this
+        returns are never skipped. follow() calls it if the caller did not.
+        """
+        if not self._started:
+            self._started = True
+            self._open(at_end=not self.from_start)
+        return self._file is not None
+
+    def _read_chunk(self) -> List[Dict]:
+        """Logs in the next chunk of appended bytes (only complete lines)"""
+        self._file.seek(self._offset)
+        data = self._file.read(READ_CHUNK_BYTES)
+        if not data:
+            return []
+        self._offset += len(data)
+        lines = (self._partial + data).split(b'\n')
+        self._partial = lines.pop()
+        logs = []
+        for line in lines:
+            log = self._parse_line(line)
+            if log is not None:
+                logs.append(log)
+        return logs
+
+    def _parse_line(self, line: bytes) -> Optional[Dict]:
+        text = line.decode('utf-8', errors='replace').strip()
+        if not text:
+            return None
+        self.lines += 1
+        try:
+            if not self.is_csv:
+                log = json.loads(text)
+                return log if isinstance(log, dict) else None
+            row = next(csv.reader([text]))
+            if self._csv_mapping is None:
+                self._csv_mapping = (row, detect_column_mapping(row))
+                return None
+            header, mapping = self._csv_mapping
+            values = dict(zip(header, row))
+            return {
+                'timestamp': values.get(mapping.get('timestamp'), '') or '',
+                'domain': values.get(mapping.get('domain'), '') or '',
+                'client_ip': values.get(mapping.get('client_ip'), '') or 'unknown',
+                'status': values.get(mapping.get('status'), '') or '',
+            }
+        except (ValueError, StopIteration):
+            self.skipped += 1
+            return None
+
+    def _check_rotation(self) -> List[Dict]:
+        """Handle rotation/truncation; returns logs drained from a rotated-away file"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return []  # Rotated away, replacement not created yet: keep the old handle
+        if (stat.st_dev, stat.st_ino) != self._inode:
+            drained = []
+            while True:
+                chunk = self._read_chunk()
+                if not chunk and self._file.tell() >= os.fstat(self._file.fileno()).st_size:
+                    break
+                drained.extend(chunk)
+            if self._partial:
+                log = self._parse_line(self._partial)
+                if log is not None:
+                    drained.append(log)
+            self._file.close()
+            self.rotations += 1
+            logger.info(f"{self.path} rotated - following the new file from the start")
+            self._open(at_end=False)
+            return drained
+        if stat.st_size < self._offset:
+            logger.info(f"{self.path} truncated - re-reading from the start")
+            self._file.close()
+            self._open(at_end=False)
+        return []
+
+    async def follow(self) -> AsyncIterator[List[Dict]]:
+        """Yield batches of new logs until stop()"""
+        if not self.start():
+            # Created after we started: everything in it is new
+            while not self._stopped and not self._open(at_end=False):
+                await asyncio.sleep(self.poll_interval)
+        try:
+            while not self._stopped:
+                logs = self._read_chunk()
+                if logs:
+                    yield logs
+                    await asyncio.sleep(0)  # Catching up: let other tasks run between chunks
+                    continue
+                logs = self._check_rotation()
+                if logs:
+                    yield logs
+                else:
+                    await asyncio.sleep(self.poll_interval)
+        finally:
+            if self._file:
+                self._file.close()
+
+    def stop(self):
+        self._stopped = True
+
+
+def _log_time(log: Dict) -> Optional[datetime]:
+    """Log timestamp as naive UTC (None when missing or unparsable)"""
+    ts = log.get('timestamp')
+    if not ts or not isinstance(ts, str):
+        return None
+    try:
+        dt = datetime.fromisoformat(ts.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if dt.tzinfo is not None:
+        dt = (dt - dt.utcoffset()).replace(tzinfo=None)
+    return dt
+
+
+class WindowTracker:
+    """Per-client tumbling windows over incremental feature accumulators"""
+
+    def __init__(self, extractor, window_minutes: int = 30, required_features: Optional[set] = None):
+        self.extractor = extractor
+        self.window = timedelta(minutes=window_minutes)
+        self.required_features = required_features
+        self.open_windows: Dict[str, Tuple[datetime, datetime, FeatureAccumulator]] = {}
+        self.watermark: Optional[datetime] = None  # Newest log time seen on the stream
+
+    def add(self, logs: List[Dict]) -> List[Tuple[str, datetime, datetime, FeatureAccumulator]]:
+        """Fold logs into their clients' windows; returns the windows that closed"""
+        closed = []
+        pending: Dict[str, List[Dict]] = {}
+        for log in logs:
+            client = str(log.get('client_ip', log.get('device', 'unknown')))
+            ts = _log_time(log) or self.watermark or datetime.now(timezone.utc).replace(tzinfo=None)
+            if self.watermark is None or ts > self.watermark:
+                self.watermark = ts
+
+            window = self.open_windows.get(client)
+            if window is not None and ts >= window[1]:
+                window[2].add(pending.pop(client, []))
+                closed.append((client, *self.open_windows.pop(client)))
+                window = None
+            if window is None:
+                accumulator = FeatureAccumulator(self.extractor, self.required_features)
+                self.open_windows[client] = (ts, ts + self.window, accumulator)
+            pending.setdefault(client, []).append(log)
+
+        # One add() per client per batch keeps the per-call overhead off the hot path
+        for client, client_logs in pending.items():
+            self.open_windows[client][2].add(client_logs)
+        return closed + self.expire()
+
+    def expire(self) -> List[Tuple[str, datetime, datetime, FeatureAccumulator]]:
+        """Close windows of clients whose window end the stream has passed"""
+        if self.watermark is None:
+            return []
+        expired = [client for client, (_, end, _) in self.open_windows.items() if end <= self.watermark]
+        return [(client, *self.open_windows.pop(client)) for client in expired]
+
+    def flush(self) -> List[Tuple[str, datetime, datetime, FeatureAccumulator]]:
+        """Close every open window (on shutdown)"""
+        closed = [(client, *window) for client, window in self.open_windows.items()]
+        self.open_windows.clear()
+        return closed
+
+
+class LogMonitor:
+    """Tail a log file and classify each client window as it closes"""
+
+    def __init__(self, parser, log_file: str, window_minutes: int = 30, poll_interval: float = 1.0,
+                 from_start: bool = False, on_result: Optional[Callable[[Dict], None]] = None,
+                 flush_on_stop: bool = True):
+        self.parser = parser
+        self.tailer = LogTailer(log_file, poll_interval, from_start)
+        self.tracker = WindowTracker(parser.feature_extractor, window_minutes,
+                                     parser.required_features(parser.classifier))
+        self.on_result = on_result
+        self.flush_on_stop = flush_on_stop
+        self.windows_classified = 0
+
+    def start(self) -> bool:
+        """Open the log before run() is scheduled (see LogTailer.start)"""
+        return self.tailer.start()
+
+    async def run(self):
+        """Follow the log until stop()"""
+        logger.info(f"Monitoring {self.tailer.path} ({self.tracker.window.total_seconds() / 60:.0f}-minute windows)")
+        async for logs in self.tailer.follow():
+            for window in self.tracker.add(logs):
+                self._classify(*window)
+        if self.flush_on_stop:
+            for window in self.tracker.flush():
+                self._classify(*window)
+
+    def _classify(self, client: str, start: datetime, end: datetime, accumulator: FeatureAccumulator):
+        if accumulator.logs == 0:
+            return
+        extra = {'window': {'start': start.isoformat(), 'end': end.isoformat(), 'logs': accumulator.logs}}
+        result = self.parser.analyze_features(accumulator.features(), client, extra=extra)
+        self.windows_classified += 1
+        if self.on_result:
+            try:
+                self.on_result(result)
+            except Exception as e:
+                logger.error(f"Monitoring callback failed: {e}")
+
+    def stop(self):
+        self.tailer.stop()
+
+    def stats(self) -> Dict:
+        return {
+            'log_file': self.tailer.path,
+            'lines': self.tailer.lines,
+            'skipped_lines': self.tailer.skipped,
+            'rotations': self.tailer.rotations,
+            'open_windows': len(self.tracker.open_windows),
+            'windows_classified': self.windows_classified,
+        }
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Streaming DNS Log Loading
+=========================
+
+Reads networkLogs.json without materializing the whole file: a top-level
+array, the {"logs": [...]} / {"data": [...]} wrappers written by
+csv_to_json_converter.py, or newline-delimited JSON (one log per line).
+Logs come out in fixed-size batches.
+
+FeatureAccumulator folds those batches into the running totals behind
+EnhancedFeatureExtractor.extract_enhanced_features, so a window is scored
+with memory bounded by the batch size plus one counter per unique domain.
+"""
+
+import json
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from enhanced_classifier import CATEGORY_SHARE_FEATURES, INFRASTRUCTURE_KEYWORDS
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_CHARS = 1 << 20
+WRAPPER_KEYS = ('logs', 'data')
+
+# Neighbours on each side used for tracking-domain attribution (as in analyze_user_behavior_with_intelligence)
+CONTEXT_RANGE = 5
+
+_WHITESPACE = ' \t\r\n'
+
+
+class _JsonStream:
+    """Character buffer over a text file with incremental raw_decode"""
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        """Read another chunk; False at end of file"""
+        if self.eof:
+            return False
+        chunk = self.f.read(READ_CHUNK_CHARS)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop consumed text so the buffer stays around one chunk
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character ('' at end of file)"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' in JSON log stream, found '{self.peek()}'")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A value ending exactly at the buffer edge may be truncated (e.g. a number)
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def array_items(self) -> Iterator:
+        """Elements of the array starting at the current position"""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            separator = self.peek()
+            self.pos += 1
+            if separator == ']':
+                return
+            if separator != ',':
+                raise ValueError(f"Malformed JSON array in log stream near '{separator}'")
+
+
+def _iter_json_logs(f) -> Iterator[Dict]:
+    """Logs from a JSON array or a {"logs"|"data": [...]} object"""
+    stream = _JsonStream(f)
+    if stream.peek() == '[':
+        yield from stream.array_items()
+        return
+
+    stream.expect('{')
+    while stream.peek() not in ('}', ''):
+        key = stream.value()
+        stream.expect(':')
+        if key in WRAPPER_KEYS and stream.peek() == '[':
+            yield from stream.array_items()
+            return
+        stream.value()  # Skip metadata fields before the log list
+        if stream.peek() == ',':
+            stream.pos += 1
+    logger.warning(f"No 'logs' or 'data' list found in {getattr(f, 'name', 'log stream')}")
+
+
+def _iter_ndjson_logs(f, first: Dict) -> Iterator[Dict]:
+    """Logs from newline-delimited JSON (first line already decoded)"""
+    yield first
+    for line_number, line in enumerate(f, 2):
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Skipping malformed NDJSON line {line_number}: {e}")
+
+
+def iter_logs(filepath: str) -> Iterator[Dict]:
+    """Yield log dicts one by one from a JSON, wrapped JSON or NDJSON file"""
+    with open(filepath, 'r') as f:
+        # NDJSON when the first non-empty line is a complete log object on its own
+        # (bounded read: a compact single-line JSON file is not pulled in whole)
+        first_line = f.readline(READ_CHUNK_CHARS)
+        while first_line and not first_line.strip():
+            first_line = f.readline(READ_CHUNK_CHARS)
+        first = None
+        if first_line.lstrip().startswith('{'):
+            try:
+                first = json.loads(first_line)
+            except json.JSONDecodeError:
+                pass
+        is_ndjson = isinstance(first, dict) and not any(isinstance(first.get(key), list) for key in WRAPPER_KEYS)
+
+        if is_ndjson:
+            yield from _iter_ndjson_logs(f, first)
+        else:
+            f.seek(0)
+            yield from _iter_json_logs(f)
+
+
+def iter_log_batches(filepath: str, batch_size: int = 10000) -> Iterator[List[Dict]]:
+    """Yield lists of at most batch_size logs"""
+    batch = []
+    for log in iter_logs(filepath):
+        batch.append(log)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class FeatureAccumulator:
+    """Incremental extract_enhanced_features over batches of one window's logs
+
+    Keeps counters instead of logs: per-domain counts, category and
+    indicator counts, timestamp range, hour histogram and query-length
+    moments. Category shares use the same +-CONTEXT_RANGE neighbour context
+    as the batch extractor, so the last few logs of a batch are categorized
+    once the next batch (or features()) supplies their successors.
+    """
+
+    def __init__(self, extractor, required_features: Optional[set] = None):
+        self.extractor = extractor
+        self.required_features = extractor.required_features if required_features is None else required_features
+        self.category_shares = self._needed(*CATEGORY_SHARE_FEATURES)
+        self.timestamps_needed = self._needed('session_duration', 'queries_per_minute',
+                                              'peak_activity_hour', 'weekend_activity')
+
+        self.logs = 0
+        self.batches = 0
+        self.first_log = None
+        self.total_queries = 0           # Logs left after the infrastructure filter
+        self.domain_counts = Counter()
+        self.blocked_count = 0
+        self.length_sum = 0
+        self.length_sq_sum = 0
+        self.indicator_counts = Counter()
+
+        # Category shares: categorized counts plus the context carried between batches
+        self.category_counts = Counter()
+        self.breakdown = Counter()       # (category, subcategory) -> count
+        self._recent: List[str] = []     # Last CONTEXT_RANGE categorized domains
+        self._pending: List[str] = []    # Domains still waiting for their right-hand context
+
+        # Timestamps
+        self.timestamp_count = 0
+        self.first_time = None
+        self.last_time = None
+        self.hour_counts = Counter()
+        self.weekend_count = 0
+        self.timestamp_error = False
+
+    def _needed(self, *names) -> bool:
+        return self.required_features is None or any(name in self.required_features for name in names)
+
+    def add(self, dns_logs: List[Dict]):
+        """Fold one batch into the running totals"""
+        if not dns_logs:
+            return
+        if self.first_log is None:
+            self.first_log = dns_logs[0]
+        self.logs += len(dns_logs)
+        self.batches += 1
+
+        filtered_domains = []
+        for log in dns_logs:
+            domain = log.get('domain', '')
+            if not any(kw in domain.lower() for kw in INFRASTRUCTURE_KEYWORDS):
+                filtered_domains.append(domain)
+            if domain:
+                self.domain_counts[domain] += 1
+                if log.get('status') == 'blocked' or log.get('response_code') == 'BLOCKED':
+                    self.blocked_count += 1
+            self.length_sum += len(domain)
+            self.length_sq_sum += len(domain) ** 2
+        self.total_queries += len(filtered_domains)
+
+        if self.category_shares:
+            self._pending.extend(filtered_domains)
+            self._categorize(final=False)
+        if self.timestamps_needed:
+            self._add_timestamps(dns_logs)
+
+        # Indicator shares are per log, so batch counts add up
+        extractor = self.extractor
+        for name, share in (
+            ('social_media_pct', extractor._calculate_social_media_percentage),
+            ('streaming_pct', extractor._calculate_streaming_percentage),
+            ('dev_tools_pct', extractor._calculate_dev_tools_percentage),
+            ('cloud_services_pct', extractor._calculate_cloud_services_percentage),
+        ):
+            if self._needed(name):
+                self.indicator_counts[name] += round(share(dns_logs) * len(dns_logs))
+
+    def _categorize(self, final: bool, category_counts: Counter = None, breakdown: Counter = None):
+        """Categorize pending domains that have their full neighbour context"""
+        category_counts = self.category_counts if category_counts is None else category_counts
+        breakdown = self.breakdown if breakdown is None else breakdown
+        sequence = self._recent + self._pending
+        start = len(self._recent)
+        stop = len(sequence) if final else max(start, len(sequence) - CONTEXT_RANGE)
+        for i in range(start, stop):
+            domain = sequence[i]
+            if not domain:
+                continue
+            context = [d for d in sequence[max(0, i - CONTEXT_RANGE):i] + sequence[i + 1:i + CONTEXT_RANGE + 1] if d]
+            category, subcategory = self.extractor.enhanced_categorize_domain(domain, context)
+            category_counts[category] += 1
+            breakdown[(category, subcategory)] += 1
+        if not final:
+            self._recent = sequence[max(0, stop - CONTEXT_RANGE):stop]
+            self._pending = sequence[stop:]
+
+    def _add_timestamps(self, dns_logs: List[Dict]):
+        if self.timestamp_error:
+            return
+        try:
+            for log in dns_logs:
+                ts = log.get('timestamp', '')
+                if not ts:
+                    continue
+                self.timestamp_count += 1
+                dt = datetime.fromisoformat(ts.replace('Z', '+00:00'))
+                if self.first_time is None or dt < self.first_time:
+                    self.first_time = dt
+                if self.last_time is None or dt > self.last_time:
+                    self.last_time = dt
+                self.hour_counts[dt.hour] += 1
+                self.weekend_count += dt.weekday() >= 5
+        except Exception as e:
+            # Same as the batch extractor: one unparsable timestamp falls back to the defaults
+            logger.debug(f"Error parsing timestamps: {e}")
+            self.timestamp_error = True
+
+    def features(self) -> Dict:
+        """Feature dict for everything added so far (does not end accumulation)"""
+        extractor = self.extractor
+        if self.total_queries == 0:
+            return extractor._empty_features()
+        defaults = extractor._empty_features()
+        total_queries = self.total_queries
+
+        entertainment_pct = work_pct = unethical_pct = neutral_pct = shopping_pct = 0
+        pure_entertainment_pct = entertainment_tracking_pct = 0
+        if self.category_shares:
+            # Domains at the end have no right-hand context yet: categorize them on copies
+            category_counts, breakdown = Counter(self.category_counts), Counter(self.breakdown)
+            self._categorize(final=True, category_counts=category_counts, breakdown=breakdown)
+            entertainment_pct = category_counts['entertainment'] / total_queries
+            work_pct = category_counts['work'] / total_queries
+            unethical_pct = category_counts['unethical'] / total_queries
+            neutral_pct = category_counts['neutral'] / total_queries
+            shopping_pct = category_counts['shopping'] / total_queries
+            pure_entertainment_pct = breakdown[('entertainment', 'pure')] / total_queries
+            entertainment_tracking_pct = breakdown[('entertainment', 'tracking')] / total_queries
+
+        session_duration = defaults['session_duration']
+        queries_per_minute = defaults['queries_per_minute']
+        peak_hour = defaults['peak_activity_hour']
+        weekend_activity = defaults['weekend_activity']
+        timestamps_ok = self.timestamps_needed and not self.timestamp_error and self.timestamp_count > 0
+        if self._needed('session_duration', 'queries_per_minute'):
+            if timestamps_ok and self.timestamp_count >= 2:
+                session_duration = max((self.last_time - self.first_time).total_seconds() / 60, 1.0)
+            queries_per_minute = total_queries / max(session_duration, 1) if session_duration > 0 else total_queries
+        if timestamps_ok and self._needed('peak_activity_hour'):
+            peak_hour = self.hour_counts.most_common(1)[0][0]
+        if timestamps_ok and self._needed('weekend_activity'):
+            weekend_activity = self.weekend_count / self.timestamp_count
+
+        domain_category = {domain: extractor.categorize_domain(domain) for domain in self.domain_counts}
+        category_counts_meta = Counter()
+        for domain, count in self.domain_counts.items():
+            category_counts_meta[domain_category[domain]] += count
+
+        avg_query_length = defaults['avg_query_length']
+        query_length_variance = defaults['query_length_variance']
+        if self._needed('avg_query_length', 'query_length_variance'):
+            avg_query_length = self.length_sum / self.logs
+            query_length_variance = max(self.length_sq_sum / self.logs - avg_query_length ** 2, 0.0)
+        domain_entropy = defaults['domain_entropy']
+        if self._needed('domain_entropy'):
+            domain_entropy = extractor._calculate_entropy(list(self.domain_counts.values()))
+        category_diversity = defaults['category_diversity']
+        if self._needed('category_diversity'):
+            category_diversity = len(set(domain_category.values()))
+
+        return {
+            'total_queries': total_queries,
+            'unique_domains': len(self.domain_counts),
+            'entertainment_pct': entertainment_pct,
+            'work_pct': work_pct,
+            'unethical_pct': unethical_pct,
+            'neutral_pct': neutral_pct,
+            'shopping_pct': shopping_pct,
+            'pure_entertainment_pct': pure_entertainment_pct,
+            'entertainment_tracking_pct': entertainment_tracking_pct,
+            'session_duration': session_duration,
+            'queries_per_minute': queries_per_minute,
+            'domain_entropy': domain_entropy,
+            'top_domain_concentration': max(self.domain_counts.values()) / total_queries if self.domain_counts else 0,
+            'blocked_queries_pct': self.blocked_count / total_queries,
+            'category_diversity': category_diversity,
+            'peak_activity_hour': peak_hour,
+            'weekend_activity': weekend_activity,
+            'avg_query_length': avg_query_length,
+            'query_length_variance': query_length_variance,
+            'social_media_pct': self.indicator_counts['social_media_pct'] / self.logs,
+            'streaming_pct': self.indicator_counts['streaming_pct'] / self.logs,
+            'dev_tools_pct': self.indicator_counts['dev_tools_pct'] / self.logs,
+            'cloud_services_pct': self.indicator_counts['cloud_services_pct'] / self.logs,
+            'category_counts': dict(category_counts_meta),
+            'top_domains': dict(self.domain_counts.most_common(5))
+        }
+
+    def stats(self) -> Dict:
+        """Consumption counters for the analysis result"""
+        return {
+            'batches': self.batches,
+            'logs': self.logs,
+            'unique_domains': len(self.domain_counts),
+        }
@@ -8,38 +8,34 @@ Project: InsightNet - Converting network logs into actionable insights
 Version: 1.0
 """
 
+import asyncio
 import json
 import logging
-import pandas as pd
-import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional, Union
 import hashlib
-from collections import Counter, defaultdict
-import joblib
+import itertools
+import os
+import threading
+import time
+from collections import Counter, defaultdict, deque
 import warnings
-warnings.filterwarnings('ignore')
 
-# ML imports
-from sklearn.ensemble import IsolationForest
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.metrics import classification_report, accuracy_score
-import xgboost as xgb
-
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('network_behavior.log'),
-        logging.StreamHandler()
-    ]
-)
+# Logging and warning filters are configured by the entry points (see configure_logging),
+# so importing this module has no side effects; the ML libraries load on first use
 logger = logging.getLogger(__name__)
 
 # Import enhanced classes (REQUIRED - no fallback)
 from enhanced_classifier import EnhancedFeatureExtractor, EnhancedBehaviorClassifier
+from drift_monitor import DriftMonitor
+from inference_batcher import MicroBatcher
+from log_monitor import LogMonitor
+from log_stream import FeatureAccumulator, iter_log_batches
+from model_registry import ModelRegistry, RegistryWatcher
+from prediction_cache import PredictionCache
+from result_sink import JsonlResultSink
+from shadow_evaluator import ShadowEvaluator
+from user_baselines import UserBaselineStore
 
 # NOTE: All basic classifier classes (DomainCategorizer, FeatureExtractor, BehaviorClassifier) 
 # have been removed. We exclusively use the enhanced classifier with XGBoost for consistency.
@@ -50,7 +46,22 @@ class NetworkBehaviorParser:
     
     def __init__(self, network_logs_file: str = 'networkLogs.json',
                  domain_categories_file: str = 'domain_categories.json',
-                 training_data_file: str = 'training_data.json'):
+                 training_data_file: str = 'training_data.json',
+                 model_registry_dir: Optional[str] = None,
+                 registry_poll_seconds: float = 30.0,
+                 lazy_features: bool = False,
+                 prediction_cache_size: int = 0,
+                 prediction_cache_grid: float = 0.01,
+                 user_baselines_file: Optional[str] = None,
+                 shadow_model: Optional[str] = None,
+                 drift_report_every: int = 0,
+                 results_history_size: int = 1000,
+                 results_sink_file: Optional[str] = None,
+                 results_sink_max_bytes: int = 100 * 1024 * 1024,
+                 results_sink_rotate_seconds: Optional[float] = None,
+                 micro_batch_max_wait_ms: float = 0.0,
+                 micro_batch_max_rows: int = 64,
+                 micro_batch_p99_target_ms: float = 50.0):
         
         # Always use enhanced classifier with XGBoost
         self.feature_extractor = EnhancedFeatureExtractor(domain_categories_file)
@@ -58,42 +69,547 @@ class NetworkBehaviorParser:
         logger.info("Using Enhanced XGBoost Classifier with Domain Intelligence")
             
         self.network_logs_file = network_logs_file
-        self.results_history = []
+        self.training_data_file = training_data_file
+        # Recent results only (ring buffer); the full record goes to the optional JSONL sink
+        self.results_history = deque(maxlen=results_history_size)
+        self.results_sink = (JsonlResultSink(results_sink_file, results_sink_max_bytes, results_sink_rotate_seconds)
+                             if results_sink_file else None)
+        self._results_lock = threading.Lock()
+        
+        # Only compute features the active model and rules consume
+        self.lazy_features = lazy_features
+        
+        # Optional prediction memo shared across hot swaps (keys include the model version)
+        self.prediction_cache = (PredictionCache(prediction_cache_size, prediction_cache_grid)
+                                 if prediction_cache_size else None)
+        self.classifier.prediction_cache = self.prediction_cache
+        
+        # Optional per-user EWMA baselines (self-relative anomaly detection)
+        self.user_baselines_file = user_baselines_file
+        self.user_baselines = None
+        if user_baselines_file:
+            # Training-set std per feature sets the baseline std floor
+            X_train, _ = self.classifier.load_training_matrix()
+            global_std = X_train.std(axis=0) if len(X_train) else None
+            if os.path.exists(user_baselines_file):
+                self.user_baselines = UserBaselineStore.load(user_baselines_file, global_std=global_std)
+            else:
+                self.user_baselines = UserBaselineStore(self.classifier.feature_columns, global_std=global_std)
+        
+        # Optional versioned model registry with background hot swap
+        self.model_registry = ModelRegistry(model_registry_dir) if model_registry_dir else None
+        self.registry_watcher = None
+        self.registry_poll_seconds = registry_poll_seconds
+        self._previous_classifier = None
+        self._swap_lock = threading.Lock()
+        
+        # Cold-start training runs in the background; results are provisional until it ends
+        self.training_thread = None
+        self.training_error = None
+        # Provisional results still in results_history, re-scored once the model is installed
+        self._provisional_results = deque(maxlen=results_history_size)
+        self._provisional_drained = False
+        
+        # Optional feature drift monitoring against the training distribution (0 = off)
+        self.drift_report_every = drift_report_every
+        self.drift_monitor = None
+        
+        # Optional micro-batching of concurrent predictions (0 ms = each call predicts alone)
+        self.micro_batcher = (MicroBatcher(self.classifier, micro_batch_max_rows, micro_batch_max_wait_ms,
+                                           micro_batch_p99_target_ms)
+                              if micro_batch_max_wait_ms else None)
+        
+        # Continuous monitoring (start_monitoring): asyncio log tailer on a daemon thread
+        self.monitor = None
+        self._monitor_thread = None
+        
+        # Optional candidate model scored off the request path (model file or registry version)
+        self.shadow_evaluator = None
+        if shadow_model:
+            self.set_shadow_model(shadow_model)
     
-    def initialize(self):
-        """Initialize the system - train model if not exists"""
+    def initialize(self, background_training: bool = True):
+        """Initialize the system - train model if not exists
+        
+        Without a usable model, training runs on a background thread (unless
+        background_training=False) and analyses are answered by the dominance
+        rules, marked provisional, until it finishes.
+        """
+        if self.model_registry:
+            self._initialize_from_registry(background_training)
+        else:
+            try:
+                self.classifier.load_model()
+                logger.info("Loaded existing enhanced model")
+            except Exception as e:
+                logger.warning(f"Could not load enhanced model ({type(e).__name__}: {e})")
+                logger.info("Training new enhanced XGBoost model...")
+                self._train_model(background_training)
+        
+        if self.classifier.is_trained:
+            self._start_drift_monitor(self.classifier)
+    
+    def _start_drift_monitor(self, classifier: EnhancedBehaviorClassifier):
+        """Create the drift monitor against the model's training distribution"""
+        if self.drift_report_every:
+            reference = classifier.drift_reference_sketch()
+            if reference is not None:
+                self.drift_monitor = DriftMonitor(classifier.feature_columns, reference)
+    
+    def _initialize_from_registry(self, background_training: bool = True):
+        """Load the CURRENT registry version (training one if empty) and start polling"""
+        self.registry_watcher = RegistryWatcher(
+            self.model_registry, self._swap_classifier,
+            poll_interval=self.registry_poll_seconds,
+            training_data_file=self.training_data_file
+        )
+        version = self.model_registry.current_version()
+        if version is None:
+            logger.info("Model registry is empty - training new enhanced XGBoost model...")
+            self._train_model(background_training)
+        else:
+            # CURRENT names a version: a missing or broken artifact is an error, not a cold start
+            classifier = self.model_registry.load(version, self.training_data_file)
+            self._adopt_runtime_settings(classifier, self.classifier)
+            with self._swap_lock:
+                self._activate(classifier)
+            logger.info(f"Loaded model version {version} from registry")
+        
+        self.registry_watcher.start(loaded_version=self.classifier.model_version)
+    
+    def _train_model(self, background: bool = True):
+        """Train a fresh model, on a daemon thread unless background is False"""
+        if not background:
+            self._run_training()
+            return
+        
+        self.training_thread = threading.Thread(target=self._run_training, name='model-training', daemon=True)
+        self.training_thread.start()
+        logger.info("Model training started in the background - serving provisional rule-based results")
+    
+    def _run_training(self):
+        """Train, persist and install a new classifier, then upgrade provisional results"""
         try:
-            self.classifier.load_model()
-            logger.info("Loaded existing enhanced model")
-        except:
-            logger.info("Training new enhanced XGBoost model...")
-            self.classifier.train_with_validation()
-            self.classifier.save_model()
-    
-    def analyze_logs(self, dns_logs: List[Dict], window_minutes: int = 30) -> Dict:
-        """Analyze DNS logs and classify behavior using enhanced XGBoost"""
+            classifier = EnhancedBehaviorClassifier(self.training_data_file)
+            classifier.train_with_validation()
+            if not classifier.is_trained:
+                raise RuntimeError("training produced no model")
+            
+            if self.model_registry:
+                # Publish first so the watcher already knows this version when CURRENT moves
+                version = self.model_registry.publish_classifier(classifier, promote=False)
+                self._install_classifier(classifier, version)
+                self.model_registry.promote(version)
+            else:
+                classifier.save_model()
+                self._install_classifier(classifier, None)
+            
+            upgraded = self._upgrade_provisional_results(classifier)
+            logger.info(f"Background training finished - model active, {upgraded} provisional results upgraded")
+        except Exception as e:
+            self.training_error = e
+            logger.error(f"Model training failed - staying on rule-based results: {e}")
+    
+    def _install_classifier(self, classifier: EnhancedBehaviorClassifier, version: Optional[str]):
+        """Make a freshly trained classifier the active one"""
+        self._adopt_runtime_settings(classifier, self.classifier)
+        # Cold start has no monitor yet: drift is only tracked against a trained model
+        self._start_drift_monitor(classifier)
+        with self._swap_lock:
+            self._activate(classifier)
+            if self.registry_watcher:
+                self.registry_watcher.loaded_version = version
+    
+    def _adopt_runtime_settings(self, classifier: EnhancedBehaviorClassifier,
+                                current: EnhancedBehaviorClassifier):
+        """Carry settings made at runtime on the active classifier over to its replacement"""
+        if current is not classifier:
+            if classifier.anomaly_mode != current.anomaly_mode:
+                classifier.set_anomaly_mode(current.anomaly_mode)
+            classifier.cascade_enabled = current.cascade_enabled
+            classifier.explanation_cache = current.explanation_cache
+        classifier.prediction_cache = self.prediction_cache
+    
+    def _activate(self, classifier: EnhancedBehaviorClassifier):
+        """Make classifier the active one (caller holds _swap_lock)"""
+        if classifier.model_version != self.classifier.model_version:
+            # Entries of the outgoing model are never valid for the new one
+            for cache in (classifier.prediction_cache, classifier.explanation_cache):
+                if cache is not None:
+                    cache.clear()
+        # Single reference assignment: in-flight requests keep the model they started with
+        self.classifier = classifier
+        if self.micro_batcher:
+            self.micro_batcher.classifier = classifier
+    
+    def _upgrade_provisional_results(self, classifier: EnhancedBehaviorClassifier) -> int:
+        """Re-score results produced while no model was available"""
+        with self._results_lock:
+            pending = list(self._provisional_results)
+            self._provisional_results.clear()
+            # Provisional results recorded from now on are upgraded as they arrive
+            self._provisional_drained = True
+        self._replace_with_upgrades(pending, classifier)
+        return len(pending)
+    
+    def _replace_with_upgrades(self, results: List[Dict], classifier: EnhancedBehaviorClassifier):
+        """Swap provisional results in results_history for re-scored copies
+        
+        The provisional dicts were already returned to callers, so they are
+        never modified; the upgrades are new dicts.
+        """
+        upgrades = []
+        for result in results:
+            # Features skipped by lazy extraction are stored as None
+            features = {name: value for name, value in result['features'].items() if value is not None}
+            behavior, confidence, is_anomaly = classifier.predict_enhanced(features)
+            upgrades.append((result, {
+                **result,
+                'behavior': behavior, 'confidence': confidence, 'confidence_source': 'model',
+                'is_anomaly': is_anomaly, 'model_version': classifier.model_version, 'provisional': False,
+                'upgraded_at': datetime.now().isoformat(),
+                'summary': self._generate_summary(result['features'], behavior, confidence),
+            }))
+        
+        with self._results_lock:
+            position = {id(result): i for i, result in enumerate(self.results_history)}
+            for result, upgraded in upgrades:
+                if id(result) in position:
+                    self.results_history[position[id(result)]] = upgraded
+        if self.results_sink:
+            for _, upgraded in upgrades:
+                # Append-only: the upgraded result is a new line superseding the provisional one
+                self.results_sink.write(upgraded)
+    
+    def wait_for_model(self, timeout: Optional[float] = None) -> bool:
+        """Block until background training finishes; True when a trained model is active"""
+        if self.training_thread:
+            self.training_thread.join(timeout)
+        return self.classifier.is_trained
+    
+    def _swap_classifier(self, classifier: EnhancedBehaviorClassifier, version: str) -> bool:
+        """Atomically replace the active classifier with a pre-loaded one
+        
+        Returns False, dropping the load, when CURRENT no longer names version
+        (e.g. rollback_model ran while the watcher was loading it).
+        """
+        self._adopt_runtime_settings(classifier, self.classifier)
+        # Same lock order as ModelRegistry.rollback (registry, then swap): CURRENT can't move meanwhile
+        with self.model_registry.current_lock(), self._swap_lock:
+            if self.model_registry.current_version() != version:
+                logger.info(f"Dropping pre-loaded model version {version}: CURRENT moved on")
+                return False
+            if self.registry_watcher:
+                self.registry_watcher.loaded_version = version
+            if self.classifier.model_version == version:
+                return True  # Already active (swapped back in memory by rollback_model)
+            self._previous_classifier = self.classifier
+            self._activate(classifier)
+        if self.drift_monitor:
+            # Compare against the new model's training distribution from here on
+            self.drift_monitor.reset(classifier.drift_reference_sketch())
+        logger.info(f"Hot-swapped model to version {version}")
+        return True
+    
+    def rollback_model(self) -> bool:
+        """Roll back to the previously active model version"""
+        if not self.model_registry:
+            logger.error("Model rollback requires a model registry")
+            return False
+        
+        swapped = []
+        
+        def swap_in_memory(previous_version: str):
+            # Runs before CURRENT is rewritten, so the watcher never reloads this version from disk
+            with self._swap_lock:
+                previous = self._previous_classifier
+                if previous is not None and previous.model_version == previous_version:
+                    # Previous model is still warm in memory - swap back immediately
+                    self._adopt_runtime_settings(previous, self.classifier)
+                    self._previous_classifier = self.classifier
+                    self._activate(previous)
+                    if self.registry_watcher:
+                        self.registry_watcher.loaded_version = previous_version
+                    swapped.append(previous_version)
+        
+        previous_version = self.model_registry.rollback(before_write=swap_in_memory)
+        if previous_version is None:
+            return False
+        if swapped:
+            logger.info(f"Rolled back to in-memory model version {previous_version}")
+            return True
+        
+        # Otherwise let the watcher pre-load it from disk
+        if self.registry_watcher:
+            return self.registry_watcher.poll_once()
+        return False
+    
+    def set_shadow_model(self, model, max_workers: int = 1, max_queue: int = 256):
+        """Shadow-score live windows with a candidate classifier, model file or registry version"""
+        self.clear_shadow_model()
+        if isinstance(model, EnhancedBehaviorClassifier):
+            classifier = model
+        elif self.model_registry and model in self.model_registry.list_versions():
+            classifier = self.model_registry.load(model, self.training_data_file)
+        else:
+            classifier = EnhancedBehaviorClassifier(self.training_data_file)
+            classifier.load_model(model)
+        
+        self.shadow_evaluator = ShadowEvaluator(classifier, max_workers, max_queue)
+        self.shadow_evaluator.start()
+    
+    def clear_shadow_model(self):
+        """Stop shadow evaluation"""
+        if self.shadow_evaluator:
+            self.shadow_evaluator.stop()
+            self.shadow_evaluator = None
+    
+    def required_features(self, classifier: EnhancedBehaviorClassifier) -> Optional[set]:
+        """Features every active consumer reads (None = compute all)
+        
+        Per-user baselines and the drift monitor track every column, so lazy
+        features only skip work when neither is enabled; a shadow model adds
+        its own inputs.
+        """
+        if not self.lazy_features or self.user_baselines is not None or self.drift_report_every:
+            return None
+        required = set(classifier.required_features())
+        if self.shadow_evaluator:
+            required |= self.shadow_evaluator.classifier.required_features()
+        return required
+    
+    def drift_report(self) -> Dict:
+        """PSI/KS of live features vs the training sketch (only features actually computed)"""
+        if not self.drift_monitor:
+            return {}
+        return self.drift_monitor.report(self.required_features(self.classifier))
+    
+    def shadow_report(self) -> Dict:
+        """Agreement, confidence deltas and latency of the shadow model vs the primary"""
+        return self.shadow_evaluator.report() if self.shadow_evaluator else {}
+    
+    def shutdown(self):
+        """Stop background workers and close the result sink"""
+        self.stop_monitoring()
+        if self.registry_watcher:
+            self.registry_watcher.stop()
+        self.clear_shadow_model()
+        if self.micro_batcher:
+            self.micro_batcher.close()
+        if self.results_sink:
+            self.results_sink.close()
+    
+    def start_monitoring(self, interval_minutes: int = 30, log_file: Optional[str] = None,
+                         poll_seconds: float = 1.0, from_start: bool = False,
+                         on_result=None) -> LogMonitor:
+        """Follow a growing NDJSON/CSV log and classify every client window of interval_minutes
+        
+        Runs an asyncio tailer on a daemon thread (see log_monitor); results go to
+        results_history / the result sink and to on_result(result) if given.
+        """
+        self.stop_monitoring()
+        self.monitor = LogMonitor(self, log_file or self.network_logs_file, interval_minutes,
+                                  poll_seconds, from_start, on_result)
+        # Open at EOF here, not on the thread: lines written after we return are always seen
+        self.monitor.start()
+        self._monitor_thread = threading.Thread(target=asyncio.run, args=(self.monitor.run(),),
+                                                name='log-monitor', daemon=True)
+        self._monitor_thread.start()
+        return self.monitor
+    
+    def stop_monitoring(self, timeout: float = 5.0):
+        """Stop the log monitor, classifying windows still open"""
+        if self.monitor:
+            self.monitor.stop()
+            self._monitor_thread.join(timeout)
+            logger.info(f"Monitoring stopped: {self.monitor.stats()}")
+            self.monitor = None
+            self._monitor_thread = None
+    
+    def analyze_logs(self, dns_logs: Union[List[Dict], Iterable[List[Dict]]], window_minutes: int = 30,
+                     need_probabilities: bool = True, early_termination: bool = False,
+                     chunk_size: int = 1000, confidence_tolerance: float = 0.02,
+                     stable_chunks: int = 2) -> Dict:
+        """Analyze DNS logs and classify behavior using enhanced XGBoost
+        
+        need_probabilities=False lets a dominance rule decide the window without model inference.
+        early_termination=True scores growing prefixes (chunk_size, doubling) and stops once the
+        label is unchanged and confidence moves less than confidence_tolerance for stable_chunks
+        re-scores in a row.
+        
+        dns_logs may also be an iterable of log batches (see iter_network_logs): features are then
+        accumulated batch by batch, so memory is bounded by the batch size rather than the window.
+        Early termination applies to in-memory lists only.
+        """
+        # Pin the classifier for the whole request so a hot swap can't split it
+        classifier = self.classifier
+        
         # Extract enhanced features with domain intelligence
-        features = self.feature_extractor.extract_enhanced_features(dns_logs, window_minutes)
+        required = self.required_features(classifier)
+        early_stats = None
+        stream_stats = None
+        if not isinstance(dns_logs, list):
+            accumulator = FeatureAccumulator(self.feature_extractor, required)
+            for batch in dns_logs:
+                accumulator.add(batch)
+            features = accumulator.features()
+            stream_stats = accumulator.stats()
+            dns_logs = [accumulator.first_log] if accumulator.first_log is not None else []
+        elif early_termination and classifier.is_trained and len(dns_logs) > chunk_size:
+            dns_logs, features, early_stats = self._consume_until_stable(
+                classifier, dns_logs, required, need_probabilities,
+                chunk_size, confidence_tolerance, stable_chunks
+            )
+        else:
+            features = self.feature_extractor.extract_enhanced_features(dns_logs, window_minutes, required)
+        
+        extra = {}
+        if early_stats:
+            extra['early_termination'] = early_stats
+        if stream_stats:
+            extra['stream'] = stream_stats
+        return self._score_window(classifier, features, self._anonymize_user(dns_logs),
+                                  need_probabilities, extra)
+    
+    def analyze_features(self, features: Dict, client_id: str, need_probabilities: bool = True,
+                         extra: Optional[Dict] = None) -> Dict:
+        """Classify a window whose features were computed elsewhere (e.g. incrementally by the log monitor)
+        
+        client_id is the raw client IP/device; it is hashed like analyze_logs does.
+        """
+        return self._score_window(self.classifier, features, self._hash_identifier(client_id),
+                                  need_probabilities, extra or {})
+    
+    def _score_window(self, classifier: EnhancedBehaviorClassifier, features: Dict, user_hash: str,
+                      need_probabilities: bool, extra: Dict) -> Dict:
+        """Classify one window's features, build the result and record it"""
+        if self.drift_monitor:
+            self.drift_monitor.update(features)
+            if self.drift_monitor.current.n % self.drift_report_every == 0:
+                self._log_drift_report()
         
         # Classify behavior using enhanced XGBoost predictor
-        behavior, confidence, is_anomaly = self.classifier.predict_enhanced(features)
+        primary_seconds = None
+        provisional = not classifier.is_trained
+        if provisional:
+            # No model yet (training in the background) - dominance rules only
+            prediction = classifier.predict_provisional(features)
+        else:
+            start = time.perf_counter()
+            if self.micro_batcher:
+                # Joins other threads' windows in one batched inference on this classifier
+                prediction = self.micro_batcher.predict(features, need_probabilities, classifier)
+            else:
+                prediction = classifier.predict_enhanced(features, need_probabilities)
+            primary_seconds = time.perf_counter() - start
+        behavior, confidence, is_anomaly = prediction
         
-        # Anonymize user data
-        user_hash = self._anonymize_user(dns_logs)
+        # Rule decisions report the rule's measured precision, not a model probability
+        if (provisional or not need_probabilities) and classifier.rule_label(features):
+            confidence_source = 'rule_precision'
+        else:
+            confidence_source = 'none' if provisional else 'model'
+        
+        # Candidate model sees the same window in the background (dropped if it falls behind)
+        shadow = self.shadow_evaluator
+        if shadow and not provisional:
+            # Confidence deltas only compare model probabilities
+            primary_confidence = confidence if confidence_source == 'model' else None
+            shadow.submit(features, (behavior, primary_confidence, is_anomaly), primary_seconds)
         
         result = {
             'timestamp': datetime.now().isoformat(),
             'user_id': user_hash,
             'behavior': behavior,
             'confidence': confidence,
+            'confidence_source': confidence_source,
             'is_anomaly': is_anomaly,
-            'features': features,
+            'baseline': self.user_baselines.observe(user_hash, features) if self.user_baselines is not None else None,
+            'model_version': classifier.model_version,
+            'provisional': provisional,
+            'features': self._mark_skipped_features(classifier, features),
             'summary': self._generate_summary(features, behavior, confidence)
         }
+        result.update(extra)
         
-        self.results_history.append(result)
+        self._record_result(result)
         return result
     
+    def _mark_skipped_features(self, classifier: EnhancedBehaviorClassifier, features: Dict) -> Dict:
+        """Features for the result, with columns lazy extraction did not compute as None"""
+        required = self.required_features(classifier)
+        if required is None:
+            return features
+        return {name: None if name in classifier.feature_columns and name not in required else value
+                for name, value in features.items()}
+    
+    def _record_result(self, result: Dict):
+        """Keep a result in the recent-results ring buffer and append it to the sink"""
+        with self._results_lock:
+            self.results_history.append(result)
+            late = result['provisional'] and self._provisional_drained
+            if result['provisional'] and not late:
+                self._provisional_results.append(result)
+        if self.results_sink:
+            self.results_sink.write(result)
+        if late:
+            # Scored on the untrained classifier just before the swap
+            self._replace_with_upgrades([result], self.classifier)
+    
+    def _consume_until_stable(self, classifier: EnhancedBehaviorClassifier, dns_logs: List[Dict],
+                              required, need_probabilities: bool,
+                              chunk_size: int, confidence_tolerance: float,
+                              stable_chunks: int) -> Tuple[List[Dict], Dict, Dict]:
+        """Grow the consumed prefix until the prediction settles
+        
+        Each round folds only the newly consumed logs into a FeatureAccumulator
+        and scores them with the side-effect-free probe_label; the caller makes
+        the one real prediction on the final prefix. Returns the consumed prefix,
+        its features and consumption stats.
+        """
+        accumulator = FeatureAccumulator(self.feature_extractor, required)
+        consumed = 0
+        target = chunk_size
+        previous = None
+        stable = 0
+        rounds = 0
+        while True:
+            accumulator.add(dns_logs[consumed:target])
+            consumed = target
+            features = accumulator.features()
+            behavior, confidence = classifier.probe_label(features, need_probabilities)
+            rounds += 1
+            
+            if (previous and behavior == previous[0]
+                    and abs(confidence - previous[1]) <= confidence_tolerance):
+                stable += 1
+            else:
+                stable = 0
+            if stable >= stable_chunks or consumed >= len(dns_logs):
+                break
+            previous = (behavior, confidence)
+            target = min(len(dns_logs), consumed * 2)
+        
+        stats = {
+            'logs_consumed': consumed,
+            'total_logs': len(dns_logs),
+            'fraction_consumed': consumed / len(dns_logs),
+            'rounds': rounds,
+            'stopped_early': consumed < len(dns_logs),
+        }
+        logger.info(f"Early termination: label stable after {consumed}/{len(dns_logs)} logs "
+                    f"({stats['fraction_consumed']:.1%}, {rounds} rounds)")
+        return dns_logs[:consumed], features, stats
+    
+    def _log_drift_report(self):
+        """Emit the periodic drift report"""
+        report = self.drift_report()
+        if report['drifted_features']:
+            logger.warning(f"Feature drift after {report['windows']} windows: {report['drifted_features']} "
+                           f"(max PSI {report['max_psi']:.3f})")
+        else:
+            logger.info(f"No feature drift after {report['windows']} windows (max PSI {report['max_psi']:.3f})")
+    
     def _anonymize_user(self, dns_logs: List[Dict]) -> str:
         """Create anonymous hash for user identification"""
         # Use first IP or device identifier to create hash
@@ -101,6 +617,10 @@ class NetworkBehaviorParser:
         if dns_logs:
             identifier = dns_logs[0].get('client_ip', dns_logs[0].get('device', 'unknown'))
         
+        return self._hash_identifier(identifier)
+    
+    @staticmethod
+    def _hash_identifier(identifier) -> str:
         return hashlib.md5(str(identifier).encode()).hexdigest()[:8]
     
     def _generate_summary(self, features: Dict, behavior: str, confidence: float) -> str:
@@ -138,14 +658,54 @@ class NetworkBehaviorParser:
             logger.error(f"Unexpected error loading network logs: {e}")
             return []
     
+    def iter_network_logs(self, batch_size: int = 10000) -> Iterator[List[Dict]]:
+        """Stream network logs in batches (JSON array, {"logs"/"data": [...]} or NDJSON)
+        
+        A parse error part-way through is re-raised: ending the stream quietly would
+        let analyze_logs classify a truncated window as the whole input.
+        """
+        batches = 0
+        logs = 0
+        try:
+            for batch in iter_log_batches(self.network_logs_file, batch_size):
+                batches += 1
+                logs += len(batch)
+                yield batch
+            logger.info(f"Streamed {logs} network logs in {batches} batches from {self.network_logs_file}")
+        except FileNotFoundError:
+            logger.error(f"Network logs file {self.network_logs_file} not found.")
+        except (json.JSONDecodeError, ValueError) as e:
+            logger.error(f"Error parsing network logs file after {logs} logs: {e}")
+            raise
+    
     def save_results(self, filepath: str = 'behavior_results.json'):
-        """Save analysis results to file"""
+        """Save the recent results (ring buffer) to file and sync the JSONL sink"""
         with open(filepath, 'w') as f:
-            json.dump(self.results_history, f, indent=2, default=str)
+            json.dump(list(self.results_history), f, indent=2, default=str)
         logger.info(f"Results saved to {filepath}")
+        
+        if self.results_sink:
+            self.results_sink.flush()
+        
+        if self.user_baselines is not None:
+            self.user_baselines.save(self.user_baselines_file)
+
+def configure_logging(log_file: str = 'network_behavior.log'):
+    """Console + file logging for command-line entry points"""
+    warnings.filterwarnings('ignore')
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(log_file),
+            logging.StreamHandler()
+        ]
+    )
 
 def main():
     """Main function for testing and demo with file-based input"""
+    configure_logging()
+    
     # Initialize parser with file paths
     parser = NetworkBehaviorParser(
         network_logs_file='networkLogs.json',
@@ -157,18 +717,24 @@ def main():
     logger.info("Initializing Network Behavior Parser...")
     parser.initialize()
     
-    # Load network logs from file
+    # Stream network logs from file in batches
     logger.info("Loading network logs from file...")
-    network_logs = parser.load_network_logs()
-    
-    if not network_logs:
-        logger.error("No network logs found. Please provide networkLogs.json file.")
+    network_logs = parser.iter_network_logs()
+    try:
+        first_batch = next(network_logs, None)
+        
+        if not first_batch:
+            logger.error("No network logs found. Please provide networkLogs.json file.")
+            return
+        
+        # Analyze behavior
+        logger.info("Analyzing behavior...")
+        result = parser.analyze_logs(itertools.chain([first_batch], network_logs))
+    except ValueError as e:
+        # Includes json.JSONDecodeError: a partly parsed file gets no analysis
+        logger.error(f"Network logs could not be parsed - no analysis: {e}")
         return
     
-    # Analyze behavior
-    logger.info("Analyzing behavior...")
-    result = parser.analyze_logs(network_logs)
-    
     # Display results
     print("\n" + "="*50)
     print("NETWORK BEHAVIOR ANALYSIS RESULTS")
@@ -177,6 +743,8 @@ def main():
     print(f"Behavior: {result['behavior']}")
     print(f"Confidence: {result['confidence']:.1%}")
     print(f"Anomaly: {'Yes' if result['is_anomaly'] else 'No'}")
+    if result['provisional']:
+        print("Provisional: rule-based result, model still training in the background")
     print(f"\nSummary: {result['summary']}")
     
     print(f"\nFeature Details:")
@@ -210,7 +778,9 @@ def main():
             category = parser.feature_extractor.categorizer.categorize_domain(domain)
             print(f"- {domain} ({category})")
     
-    # Save results
+    # Save results (provisional results are upgraded once background training finishes)
+    if parser.training_thread:
+        parser.wait_for_model()
     parser.save_results()
     
     print("\n" + "="*50)
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Booster Pruning and Compaction with an Accuracy Budget
+======================================================
+
+Shrinks a trained Enhanced XGBoost model for edge and streaming inference
+while keeping accuracy within a tolerance of the original. The validation
+and test rows are the ones train_with_validation held out (saved with the
+model; rebuilt from its seeded split for older models):
+
+1. Drop the rounds early stopping rejected
+2. Truncate low-gain splits (XGBoost prune updater, growing gamma ladder)
+3. Re-fit leaf values on the training split (XGBoost refresh updater)
+4. Greedily drop whole trees, cheapest contribution first, evaluated
+   exactly from per-tree leaf outputs
+5. Rewrite trees without deleted nodes and save a smaller artifact
+
+Steps 2-4 decide on the validation rows with half of the tolerance, since
+a few hundred rows are a noisy estimate. The held-out test rows then gate
+the result: dropped trees are re-added (most recent drop first), then the
+gamma is stepped back down, until test accuracy is within the tolerance.
+
+Usage:
+    python model_compaction.py [model_file] [output_file] [tolerance]
+"""
+
+import copy
+import json
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import xgboost as xgb
+
+from enhanced_classifier import EnhancedBehaviorClassifier
+
+logger = logging.getLogger(__name__)
+
+GAMMA_LADDER = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0)
+
+# Share of the tolerance the validation-driven steps may spend (the test gate gets the rest)
+DECISION_BUDGET_SHARE = 0.5
+
+# Per-node arrays in XGBoost's JSON tree format
+NODE_FIELDS = ('base_weights', 'default_left', 'left_children', 'right_children', 'loss_changes',
+               'parents', 'split_conditions', 'split_indices', 'split_type', 'sum_hessian')
+
+
+def validation_split(classifier: EnhancedBehaviorClassifier):
+    """The train/validation/test rows the model was trained with
+
+    Uses the split persisted at training time. Models saved without one get
+    the seeded split train_with_validation uses, which is the same rows as
+    long as the training data has not changed since. Out-of-core models
+    have no split in the training file and are refused.
+    """
+    if classifier.training_pipeline == 'out_of_core':
+        raise ValueError("Model was trained out of core on date partitions - "
+                         f"{classifier.training_data_file} holds none of its held-out rows")
+    split = classifier.training_split
+    if split and split['matrix_key'] != classifier.training_matrix_key():
+        raise ValueError(f"{classifier.training_data_file} changed since the model was trained - "
+                         "its held-out rows can no longer be identified")
+    X, y = classifier.load_training_matrix()
+    X, y = np.asarray(X), np.asarray(y)
+    if not split:
+        logger.warning("Model has no recorded training split - rebuilding the seeded split "
+                       "(held-out rows are only unseen if the training data is unchanged)")
+        split = dict(zip(('train', 'val', 'test'), classifier.split_training_rows(y)))
+    return tuple(part for name in ('train', 'val', 'test') for part in (X[split[name]], y[split[name]]))
+
+
+def _accuracy(booster: xgb.Booster, dmatrix: xgb.DMatrix) -> float:
+    """Validation accuracy of a softprob booster"""
+    return float((booster.predict(dmatrix).argmax(axis=1) == dmatrix.get_label()).mean())
+
+
+def _model_json(booster: xgb.Booster) -> Dict:
+    """Parsed JSON model"""
+    return json.loads(bytes(booster.save_raw('json')))
+
+
+def _booster_from_json(model: Dict) -> xgb.Booster:
+    """Load a booster from a parsed JSON model"""
+    booster = xgb.Booster()
+    booster.load_model(bytearray(json.dumps(model).encode()))
+    return booster
+
+
+def _update(booster: xgb.Booster, params: Dict, dtrain: xgb.DMatrix, **updater) -> xgb.Booster:
+    """Run an in-place XGBoost updater (prune / refresh) over every round"""
+    return xgb.train(
+        {**params, 'process_type': 'update', **updater},
+        dtrain, num_boost_round=booster.num_boosted_rounds(), xgb_model=booster.copy()
+    )
+
+
+def _tree_outputs(booster: xgb.Booster, dmatrix: xgb.DMatrix) -> Tuple[np.ndarray, np.ndarray, List[int]]:
+    """Margins, per-tree leaf outputs (rows x trees) and the class of every tree"""
+    trees_json = _model_json(booster)['learner']['gradient_booster']['model']
+    leaves = booster.predict(dmatrix, pred_leaf=True).astype(int)
+    contribution = np.empty(leaves.shape, dtype=np.float64)
+    for t, tree in enumerate(trees_json['trees']):
+        contribution[:, t] = np.asarray(tree['split_conditions'])[leaves[:, t]]
+    return booster.predict(dmatrix, output_margin=True), contribution, trees_json['tree_info']
+
+
+def drop_trees(booster: xgb.Booster, dval: xgb.DMatrix, min_accuracy: float) -> List[int]:
+    """Trees that can be removed greedily while validation accuracy stays above min_accuracy
+
+    Returned in drop order. Margins are rebuilt from per-tree leaf outputs, so
+    each candidate costs a NumPy subtraction instead of a model reload.
+    """
+    margin, contribution, tree_class = _tree_outputs(booster, dval)
+    labels = dval.get_label()
+
+    # Cheapest first: smallest mean absolute output on validation rows
+    order = np.argsort(np.abs(contribution).mean(axis=0))
+    dropped = []
+    for t in order:
+        candidate = margin.copy()
+        candidate[:, tree_class[t]] -= contribution[:, t]
+        if (candidate.argmax(axis=1) == labels).mean() >= min_accuracy:
+            margin = candidate
+            dropped.append(int(t))
+    return dropped
+
+
+def keep_drops_within(booster: xgb.Booster, dropped: List[int], dtest: xgb.DMatrix,
+                      min_accuracy: float) -> Optional[List[int]]:
+    """Longest prefix of dropped (drop order) whose removal keeps test accuracy >= min_accuracy
+
+    Equivalent to re-adding the most recently dropped trees one at a time;
+    None when even the booster with every tree fails.
+    """
+    margin, contribution, tree_class = _tree_outputs(booster, dtest)
+    labels = dtest.get_label()
+    best = 0 if (margin.argmax(axis=1) == labels).mean() >= min_accuracy else None
+    for k, t in enumerate(dropped, 1):
+        margin[:, tree_class[t]] -= contribution[:, t]
+        if (margin.argmax(axis=1) == labels).mean() >= min_accuracy:
+            best = k
+    return None if best is None else dropped[:best]
+
+
+def remove_trees(booster: xgb.Booster, dropped: List[int]) -> xgb.Booster:
+    """Booster without the given trees"""
+    if not dropped:
+        return booster
+    dropped = set(dropped)
+    model = _model_json(booster)
+    trees_json = model['learner']['gradient_booster']['model']
+    trees, tree_class = trees_json['trees'], trees_json['tree_info']
+
+    keep = [t for t in range(len(trees)) if t not in dropped]
+    indptr = trees_json['iteration_indptr']
+    new_indptr = [0]
+    for it in range(len(indptr) - 1):
+        new_indptr.append(new_indptr[-1] + sum(1 for t in range(indptr[it], indptr[it + 1]) if t not in dropped))
+
+    trees_json['trees'] = [dict(trees[t], id=new_id) for new_id, t in enumerate(keep)]
+    trees_json['tree_info'] = [tree_class[t] for t in keep]
+    trees_json['iteration_indptr'] = new_indptr
+    trees_json['gbtree_model_param']['num_trees'] = str(len(keep))
+    return _booster_from_json(model)
+
+
+def compact_nodes(booster: xgb.Booster) -> xgb.Booster:
+    """Rewrite every tree keeping only nodes reachable from the root"""
+    model = _model_json(booster)
+    for tree in model['learner']['gradient_booster']['model']['trees']:
+        if tree.get('categories_nodes'):
+            continue  # Categorical splits index nodes separately - leave as is
+
+        # Breadth-first renumbering of live nodes
+        order, new_id = [0], {0: 0}
+        for nid in order:
+            for child in (tree['left_children'][nid], tree['right_children'][nid]):
+                if child != -1:
+                    new_id[child] = len(order)
+                    order.append(child)
+        if len(order) == len(tree['left_children']):
+            continue
+
+        old = {field: tree[field] for field in NODE_FIELDS}
+        for field in NODE_FIELDS:
+            tree[field] = [old[field][nid] for nid in order]
+        tree['left_children'] = [new_id.get(c, -1) if c != -1 else -1 for c in tree['left_children']]
+        tree['right_children'] = [new_id.get(c, -1) if c != -1 else -1 for c in tree['right_children']]
+        tree['parents'] = [new_id.get(p, p) if i else p for i, p in enumerate(tree['parents'])]
+        tree['tree_param']['num_nodes'] = str(len(order))
+        tree['tree_param']['num_deleted'] = '0'
+    return _booster_from_json(model)
+
+
+def _node_count(booster: xgb.Booster) -> int:
+    """Total nodes across all trees"""
+    trees = _model_json(booster)['learner']['gradient_booster']['model']['trees']
+    return sum(int(tree['tree_param']['num_nodes']) for tree in trees)
+
+
+def _latency_us(model, X: np.ndarray, repeats: int = 200) -> float:
+    """Mean single-row predict_proba latency in microseconds"""
+    row = X[:1]
+    model.predict_proba(row)
+    start = time.perf_counter()
+    for i in range(repeats):
+        model.predict_proba(X[i % len(X):i % len(X) + 1] if len(X) else row)
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def compact_classifier(classifier: EnhancedBehaviorClassifier, tolerance: float = 0.005,
+                       output_file: str = 'enhanced_behavior_model_compact.pkl') -> Dict:
+    """Prune, refit and drop trees within the accuracy budget; save a smaller artifact"""
+    X_train, y_train, X_val, y_val, X_test, y_test = validation_split(classifier)
+    X_train_scaled = classifier.scaler.transform(X_train)
+    X_val_scaled = classifier.scaler.transform(X_val)
+    X_test_scaled = classifier.scaler.transform(X_test)
+    y_train_encoded = classifier.label_encoder.transform(y_train)
+    y_test_encoded = classifier.label_encoder.transform(y_test)
+    dtrain = xgb.DMatrix(X_train_scaled, label=y_train_encoded)
+    dval = xgb.DMatrix(X_val_scaled, label=classifier.label_encoder.transform(y_val))
+    # Held out from every compaction decision; gates the final result
+    dtest = xgb.DMatrix(X_test_scaled, label=y_test_encoded)
+
+    original = classifier.model.get_booster()
+    params = {k: v for k, v in classifier.model.get_xgb_params().items() if v is not None}
+    params['num_class'] = len(classifier.label_encoder.classes_)
+
+    # 1. Rounds after the early-stopping best iteration never affect predictions
+    best_iteration = original.attr('best_iteration')
+    sliced = original[:int(best_iteration) + 1] if best_iteration is not None else original.copy()
+
+    baseline = _accuracy(sliced, dval)
+    min_accuracy = baseline - DECISION_BUDGET_SHARE * tolerance
+    test_before = _accuracy(sliced, dtest)
+    min_test_accuracy = test_before - tolerance
+    logger.info(f"Baseline validation accuracy {baseline:.4f}, decisions keep >= {min_accuracy:.4f}; "
+                f"held-out test {test_before:.4f} must stay >= {min_test_accuracy:.4f}")
+
+    # 2. Truncate low-gain splits: every gamma that stays in budget, largest last
+    pruned = {None: sliced}
+    for gamma in GAMMA_LADDER:
+        candidate = _update(sliced, params, dtrain, updater='prune', gamma=gamma)
+        if _accuracy(candidate, dval) < min_accuracy:
+            break
+        pruned[gamma] = candidate
+
+    # Largest gamma first; step it back down while the held-out gate fails
+    for gamma in reversed(list(pruned)):
+        # 3. Re-fit leaf values on the training split (tried first when in budget)
+        refreshed = _update(pruned[gamma], params, dtrain, updater='refresh', refresh_leaf=True)
+        candidates = [pruned[gamma]]
+        if _accuracy(refreshed, dval) >= min_accuracy:
+            candidates.insert(0, refreshed)
+
+        # 4. Drop whole trees; re-add the latest drops while held-out accuracy is out of budget
+        for booster in candidates:
+            dropped = keep_drops_within(booster, drop_trees(booster, dval, min_accuracy), dtest, min_test_accuracy)
+            if dropped is not None:
+                break
+        if dropped is not None:
+            leaves_refit = booster is refreshed
+            break
+        logger.info(f"Held-out test accuracy out of budget at gamma {gamma} - stepping back")
+    else:
+        # Only reachable with a negative tolerance: the sliced booster predicts like the original
+        raise ValueError(f"No compaction keeps held-out test accuracy within {tolerance} of {test_before:.4f}")
+    logger.info(f"Split pruning gamma: {gamma}, trees dropped: {len(dropped)}")
+
+    # 5. Remove the dropped trees and deleted nodes from the arrays
+    booster = compact_nodes(remove_trees(booster, dropped))
+    final_accuracy = _accuracy(booster, dval)
+    test_after = _accuracy(booster, dtest)
+
+    # Own caches, streaming detector and cascade: none of the original's carry over
+    compact = copy.copy(classifier)
+    compact.model = xgb.XGBClassifier(**classifier.model.get_params())
+    compact.model.load_model(bytearray(booster.save_raw('json')))
+    compact.model_version = None
+    compact.path_counts = Counter()
+    compact.streaming_detector = copy.deepcopy(classifier.streaming_detector)
+    compact.prediction_cache = None
+    compact.explanation_cache = None
+    if classifier.prediction_cache is not None:
+        compact.enable_prediction_cache(classifier.prediction_cache.max_entries, classifier.prediction_cache.grid)
+    if classifier.explanation_cache is not None:
+        compact.enable_explanation_cache(classifier.explanation_cache.max_entries, classifier.explanation_cache.grid)
+    compact._model_changed()
+    # The escalation margin was calibrated against the full booster
+    had_cascade = classifier.cascade_model is not None
+    compact._reset_cascade()
+    if had_cascade:
+        compact.fit_cascade(X_train_scaled, y_train_encoded, X_val_scaled, X_test_scaled, y_test_encoded)
+    compact.save_model(output_file)
+
+    stats = {
+        'baseline_accuracy': baseline,
+        'compact_accuracy': final_accuracy,
+        'test_accuracy_before': test_before,
+        'test_accuracy_after': test_after,
+        'tolerance': tolerance,
+        'prune_gamma': gamma,
+        'leaves_refit': leaves_refit,
+        'trees_before': len(original.get_dump()),
+        'trees_dropped': len(dropped),
+        'trees_after': len(booster.get_dump()),
+        'nodes_before': _node_count(original),
+        'nodes_after': _node_count(booster),
+        'booster_bytes_before': len(original.save_raw('ubj')),
+        'booster_bytes_after': len(booster.save_raw('ubj')),
+        'latency_us_before': _latency_us(classifier.model, X_val_scaled),
+        'latency_us_after': _latency_us(compact.model, X_val_scaled),
+        'output_file': output_file,
+        'output_file_bytes': os.path.getsize(output_file),
+    }
+    logger.info(f"Compacted {stats['trees_before']} -> {stats['trees_after']} trees, "
+                f"{stats['nodes_before']} -> {stats['nodes_after']} nodes, "
+                f"{stats['booster_bytes_before']:,} -> {stats['booster_bytes_after']:,} bytes, "
+                f"latency {stats['latency_us_before']:.0f}us -> {stats['latency_us_after']:.0f}us, "
+                f"accuracy {baseline:.4f} -> {final_accuracy:.4f}")
+    return stats
+
+
+def main():
+    """Main function for command-line usage"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if len(sys.argv) > 1 and sys.argv[1] in ['--help', '-h', 'help']:
+        print("Usage: python model_compaction.py [model_file] [output_file] [tolerance]")
+        print("\nExample:")
+        print("  python model_compaction.py enhanced_behavior_model.pkl enhanced_behavior_model_compact.pkl 0.005")
+        print("\nModels saved without their training split are evaluated on the seeded split")
+        print("train_with_validation uses; those rows are held out only if the training data is unchanged.")
+        return
+
+    model_file = sys.argv[1] if len(sys.argv) > 1 else 'enhanced_behavior_model.pkl'
+    output_file = sys.argv[2] if len(sys.argv) > 2 else 'enhanced_behavior_model_compact.pkl'
+    tolerance = float(sys.argv[3]) if len(sys.argv) > 3 else 0.005
+
+    classifier = EnhancedBehaviorClassifier()
+    classifier.load_model(model_file)
+    try:
+        stats = compact_classifier(classifier, tolerance, output_file)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print("\n" + "=" * 60)
+    print("MODEL COMPACTION RESULTS")
+    print("=" * 60)
+    print(f"Trees:    {stats['trees_before']} -> {stats['trees_after']}")
+    print(f"Nodes:    {stats['nodes_before']} -> {stats['nodes_after']}")
+    print(f"Size:     {stats['booster_bytes_before']:,} -> {stats['booster_bytes_after']:,} bytes")
+    print(f"Latency:  {stats['latency_us_before']:.0f}us -> {stats['latency_us_after']:.0f}us per window")
+    print(f"Accuracy: {stats['baseline_accuracy']:.4f} -> {stats['compact_accuracy']:.4f} "
+          f"(tolerance {stats['tolerance']})")
+    print(f"Test:     {stats['test_accuracy_before']:.4f} -> {stats['test_accuracy_after']:.4f} (held out)")
+    print(f"Saved to: {stats['output_file']}")
+
+
+if __name__ == "__main__":
+    main()
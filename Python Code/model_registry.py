@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Local Model Registry with In-Process Hot Swap
+=============================================
+
+Stores trained model artifacts as content-addressed versions and keeps a
+"current" pointer that can be promoted or rolled back without restarting
+the analysis process.
+
+Layout:
+    model_registry/
+        versions/<version>.pkl   - immutable model artifacts (version = sha256 prefix)
+        CURRENT                  - version id of the active model
+        HISTORY                  - one promoted version id per line (oldest first)
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from typing import Callable, List, Optional
+
+from enhanced_classifier import EnhancedBehaviorClassifier
+
+logger = logging.getLogger(__name__)
+
+VERSION_LENGTH = 16
+
+
+class ModelRegistry:
+    """Directory of content-addressed model versions with a CURRENT pointer"""
+
+    def __init__(self, registry_dir: str = 'model_registry'):
+        self.registry_dir = registry_dir
+        self.versions_dir = os.path.join(registry_dir, 'versions')
+        self.current_file = os.path.join(registry_dir, 'CURRENT')
+        self.history_file = os.path.join(registry_dir, 'HISTORY')
+        os.makedirs(self.versions_dir, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def path_for(self, version: str) -> str:
+        """Return the artifact path for a version id"""
+        return os.path.join(self.versions_dir, f"{version}.pkl")
+
+    def list_versions(self) -> List[str]:
+        """List all stored version ids"""
+        return sorted(
+            name[:-len('.pkl')] for name in os.listdir(self.versions_dir)
+            if name.endswith('.pkl')
+        )
+
+    def publish(self, model_file: str, promote: bool = False) -> str:
+        """Copy a model artifact into the registry and return its version id"""
+        version = self._hash_file(model_file)
+        target = self.path_for(version)
+
+        if not os.path.exists(target):
+            # Copy to a temp file first so readers never see a partial artifact
+            fd, tmp_path = tempfile.mkstemp(dir=self.versions_dir, suffix='.tmp')
+            os.close(fd)
+            shutil.copyfile(model_file, tmp_path)
+            os.replace(tmp_path, target)
+            logger.info(f"Published model version {version}")
+
+        if promote:
+            self.promote(version)
+        return version
+
+    def publish_classifier(self, classifier: EnhancedBehaviorClassifier, promote: bool = True) -> Optional[str]:
+        """Save a trained classifier and publish it as a new version"""
+        if not classifier.is_trained:
+            logger.error("Cannot publish an untrained model")
+            return None
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.registry_dir, suffix='.pkl')
+        os.close(fd)
+        try:
+            classifier.save_model(tmp_path)
+            version = self.publish(tmp_path, promote=promote)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        classifier.model_version = version
+        return version
+
+    def current_version(self) -> Optional[str]:
+        """Return the version id the CURRENT pointer refers to"""
+        try:
+            with open(self.current_file, 'r') as f:
+                version = f.read().strip()
+            return version or None
+        except FileNotFoundError:
+            return None
+
+    def current_lock(self) -> threading.Lock:
+        """Lock held while CURRENT is rewritten in this process
+
+        Hold it to act on current_version() before promote/rollback can move it.
+        """
+        return self._lock
+
+    def promote(self, version: str):
+        """Point CURRENT at a stored version"""
+        if not os.path.exists(self.path_for(version)):
+            raise ValueError(f"Unknown model version: {version}")
+
+        with self._lock:
+            self._write_atomic(self.current_file, version + '\n')
+            with open(self.history_file, 'a') as f:
+                f.write(version + '\n')
+        logger.info(f"Promoted model version {version}")
+
+    def rollback(self, before_write: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """Move CURRENT back to the previously promoted version
+
+        before_write(previous) runs under the registry lock before CURRENT
+        changes, so an in-process swap can be recorded before any watcher can
+        see the new pointer.
+        """
+        with self._lock:
+            history = self._read_history()
+            current = self.current_version()
+
+            # Drop trailing entries for the current version, then take the one before
+            while history and history[-1] == current:
+                history.pop()
+            if not history:
+                logger.warning("No previous model version to roll back to")
+                return None
+
+            previous = history[-1]
+            if before_write:
+                before_write(previous)
+            self._write_atomic(self.current_file, previous + '\n')
+            self._write_atomic(self.history_file, ''.join(v + '\n' for v in history))
+
+        logger.info(f"Rolled back model from {current} to {previous}")
+        return previous
+
+    def load(self, version: Optional[str] = None,
+             training_data_file: str = 'training_data.json') -> EnhancedBehaviorClassifier:
+        """Load a version (default: CURRENT) into a fresh classifier"""
+        version = version or self.current_version()
+        if version is None:
+            raise FileNotFoundError(f"No current model in registry {self.registry_dir}")
+        path = self.path_for(version)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Model version {version} is missing from registry {self.registry_dir} ({path})")
+
+        classifier = EnhancedBehaviorClassifier(training_data_file)
+        classifier.load_model(path)
+        classifier.model_version = version
+        return classifier
+
+    def _read_history(self) -> List[str]:
+        """Read promotion history"""
+        try:
+            with open(self.history_file, 'r') as f:
+                return [line.strip() for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    @staticmethod
+    def _write_atomic(path: str, content: str):
+        """Write a small file via rename so readers never see partial content"""
+        directory = os.path.dirname(path) or '.'
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _hash_file(path: str) -> str:
+        """Content hash used as the version id"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()[:VERSION_LENGTH]
+
+
+class RegistryWatcher:
+    """Background thread that polls the registry and pre-loads new versions
+
+    on_model_ready(classifier, version) installs a pre-loaded version, sets
+    loaded_version and returns True; it returns False to drop a load that
+    went stale (CURRENT moved while it was loading).
+    """
+
+    def __init__(self, registry: ModelRegistry,
+                 on_model_ready: Callable[[EnhancedBehaviorClassifier, str], bool],
+                 poll_interval: float = 30.0,
+                 training_data_file: str = 'training_data.json'):
+        self.registry = registry
+        self.on_model_ready = on_model_ready
+        self.poll_interval = poll_interval
+        self.training_data_file = training_data_file
+        self.loaded_version = None
+        self.failed_versions = set()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self, loaded_version: Optional[str] = None):
+        """Start polling in a daemon thread"""
+        self.loaded_version = loaded_version
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='model-registry-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop polling"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_interval + 1)
+
+    def poll_once(self) -> bool:
+        """Check CURRENT once; pre-load and hand over a new version if present"""
+        version = self.registry.current_version()
+        if version is None or version == self.loaded_version or version in self.failed_versions:
+            return False
+
+        try:
+            classifier = self.registry.load(version, self.training_data_file)
+            # Warm up the model off the request path so the first real call is not slower
+            classifier.predict_enhanced(classifier_warmup_features())
+        except Exception as e:
+            logger.error(f"Failed to pre-load model version {version}: {e}")
+            self.failed_versions.add(version)
+            return False
+
+        # The callback re-checks CURRENT and records loaded_version when it installs the model
+        return bool(self.on_model_ready(classifier, version))
+
+    def _run(self):
+        """Polling loop"""
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                self.poll_once()
+            except Exception as e:
+                logger.error(f"Model registry poll failed: {e}")
+
+
+def classifier_warmup_features() -> dict:
+    """Neutral feature dict used to warm up a freshly loaded model"""
+    return {
+        'total_queries': 100, 'unique_domains': 20, 'entertainment_pct': 0.2, 'work_pct': 0.3,
+        'unethical_pct': 0.0, 'neutral_pct': 0.5, 'shopping_pct': 0.0, 'session_duration': 30,
+        'queries_per_minute': 3.3, 'domain_entropy': 3.0, 'top_domain_concentration': 0.2,
+        'peak_activity_hour': 12, 'weekend_activity': 0.0, 'avg_query_length': 15
+    }
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+CPU-Aware Resource Scheduler
+============================
+
+Splits the available cores between outer parallelism (CV folds, search
+trials, users) and the inner thread pools of XGBoost / scikit-learn, so
+nested `n_jobs=-1` pools never oversubscribe the CPU. Also records wall
+time against CPU time for each training phase.
+
+Persistent worker pools (loky, ProcessPoolExecutor) are not reaped when a
+phase ends, so their CPU never shows up in os.times() children_*. Work run
+in other processes therefore reports its own CPU (measure_cpu) and the
+phase adds it via record['worker_cpu_seconds'].
+"""
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Environment override for containers where os.cpu_count() reports the host
+CPU_ENV_VAR = 'INSIGHTNET_CPUS'
+
+
+class Allocation(NamedTuple):
+    """Core split for one parallel section"""
+    outer: int  # Parallel tasks (folds, trials, users)
+    inner: int  # Threads each task may use (XGBoost nthread / sklearn n_jobs)
+
+
+def available_cores() -> int:
+    """Cores usable by this process (respects affinity and INSIGHTNET_CPUS)"""
+    env_value = os.environ.get(CPU_ENV_VAR)
+    if env_value:
+        try:
+            return max(1, int(env_value))
+        except ValueError:
+            logger.warning(f"Ignoring invalid {CPU_ENV_VAR}={env_value!r}")
+
+    if hasattr(os, 'sched_getaffinity'):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+class ResourceScheduler:
+    """Central core budget and per-phase wall/CPU timing"""
+
+    def __init__(self, total_cores: Optional[int] = None):
+        self.total_cores = total_cores or available_cores()
+        self.phases: List[Dict] = []
+
+    def allocate(self, outer_tasks: int, max_outer: Optional[int] = None) -> Allocation:
+        """Split cores so outer x inner never exceeds the budget"""
+        outer = max(1, min(outer_tasks, self.total_cores))
+        if max_outer:
+            outer = min(outer, max_outer)
+        inner = max(1, self.total_cores // outer)
+        return Allocation(outer=outer, inner=inner)
+
+    def configure_xgb(self, model, threads: Optional[int] = None):
+        """Pin an XGBClassifier to a thread count (n_jobs is XGBoost's nthread)"""
+        model.set_params(n_jobs=threads or self.total_cores)
+        return model
+
+    def configure_sklearn(self, estimator, jobs: Optional[int] = None):
+        """Pin a scikit-learn estimator with an n_jobs parameter"""
+        if 'n_jobs' in estimator.get_params():
+            estimator.set_params(n_jobs=jobs or self.total_cores)
+        return estimator
+
+    @contextmanager
+    def phase(self, name: str, allocation: Optional[Allocation] = None, records: Optional[List[Dict]] = None):
+        """Time a training phase: wall time vs CPU time
+        
+        Yields the phase record; code that runs work in worker processes adds
+        the CPU those tasks report to record['worker_cpu_seconds']. The record
+        is appended to records (one list per training run, so concurrent runs
+        keep separate logs) or, without one, to the shared self.phases.
+        In-process CPU comes from os.times(), so it still includes any other
+        run's threads active at the same time.
+        """
+        record = {'phase': name, 'worker_cpu_seconds': 0.0}
+        wall_start = time.perf_counter()
+        cpu_start = self._cpu_seconds()
+        try:
+            yield record
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = self._cpu_seconds() - cpu_start + record['worker_cpu_seconds']
+            record.update({
+                'wall_seconds': wall,
+                'cpu_seconds': cpu,
+                # Effective cores used; close to outer x inner means no oversubscription stalls
+                'parallelism': cpu / wall if wall > 0 else 0.0,
+                'outer': allocation.outer if allocation else 1,
+                'inner': allocation.inner if allocation else self.total_cores,
+            })
+            (self.phases if records is None else records).append(record)
+            logger.info(f"Phase {name}: wall {wall:.2f}s, cpu {cpu:.2f}s "
+                        f"({record['parallelism']:.1f}x, {record['outer']}x{record['inner']} of "
+                        f"{self.total_cores} cores)")
+
+    def report(self) -> List[Dict]:
+        """Return and clear recorded phase timings"""
+        phases, self.phases = self.phases, []
+        return phases
+
+    @staticmethod
+    def _cpu_seconds() -> float:
+        """User+system CPU of this process (all threads)"""
+        t = os.times()
+        return t.user + t.system
+
+
+def measure_cpu(fn: Callable, *args, **kwargs) -> Tuple[Any, float]:
+    """Run fn and return (result, CPU seconds it used), for tasks shipped to worker processes"""
+    cpu_start = time.process_time()
+    result = fn(*args, **kwargs)
+    return result, time.process_time() - cpu_start
+
+
+_default_scheduler = None
+
+
+def get_scheduler() -> ResourceScheduler:
+    """Process-wide scheduler shared by training code and scripts"""
+    global _default_scheduler
+    if _default_scheduler is None:
+        _default_scheduler = ResourceScheduler()
+    return _default_scheduler
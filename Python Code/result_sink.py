@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Append-Only JSONL Result Sink
+=============================
+
+Writes one compact JSON line per analysis result instead of rewriting the
+whole history. Writes go through a large userspace buffer; the file is
+flushed and fsynced every fsync_every results or, checked as results
+arrive, after fsync_seconds - a crash loses at most that much (flush() and
+close() sync immediately). Files rotate by size and/or age; rotated files
+get a numeric suffix, newest = .1 (the logging.handlers.RotatingFileHandler
+scheme).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JsonlResultSink:
+    """Buffered, periodically fsynced, rotating JSONL writer"""
+
+    def __init__(self, filepath: str = 'behavior_results.jsonl',
+                 max_bytes: int = 100 * 1024 * 1024, rotate_seconds: Optional[float] = None,
+                 backup_count: int = 10, fsync_every: int = 100, fsync_seconds: float = 5.0,
+                 buffer_bytes: int = 1024 * 1024):
+        self.filepath = filepath
+        self.max_bytes = max_bytes            # 0 = no size-based rotation
+        self.rotate_seconds = rotate_seconds  # None = no time-based rotation
+        self.backup_count = backup_count
+        self.fsync_every = fsync_every
+        self.fsync_seconds = fsync_seconds
+        self.buffer_bytes = buffer_bytes
+
+        self.written = 0
+        self.rotations = 0
+        self.fsyncs = 0
+        self._unsynced = 0
+        self._lock = threading.Lock()
+        self._open()
+
+    def _open(self):
+        directory = os.path.dirname(self.filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.filepath, 'ab', buffering=self.buffer_bytes)
+        self._size = self._file.tell()
+        self._opened_at = time.monotonic()
+        self._last_sync = self._opened_at
+
+    def write(self, result: Dict):
+        """Append one result"""
+        line = (json.dumps(result, separators=(',', ':'), default=str) + '\n').encode('utf-8')
+        with self._lock:
+            if self._should_rotate(len(line)):
+                self._rotate()
+            self._file.write(line)
+            self._size += len(line)
+            self.written += 1
+            self._unsynced += 1
+            if (self._unsynced >= self.fsync_every
+                    or time.monotonic() - self._last_sync >= self.fsync_seconds):
+                self._sync()
+
+    def _should_rotate(self, incoming: int) -> bool:
+        if self._size == 0:
+            return False
+        if self.max_bytes and self._size + incoming > self.max_bytes:
+            return True
+        return self.rotate_seconds is not None and time.monotonic() - self._opened_at >= self.rotate_seconds
+
+    def _sync(self):
+        """Flush the buffer and fsync (caller holds the lock)"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self.fsyncs += 1
+
+    def _rotate(self):
+        """Close the current file and shift backups: file -> .1 -> .2 ... (caller holds the lock)"""
+        self._sync()
+        self._file.close()
+        oldest = f"{self.filepath}.{self.backup_count}"
+        if os.path.exists(oldest):
+            os.remove(oldest)
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f"{self.filepath}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.filepath}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.filepath, f"{self.filepath}.1")
+        else:
+            os.remove(self.filepath)
+        self.rotations += 1
+        logger.info(f"Rotated result log {self.filepath} ({self.rotations} rotations)")
+        self._open()
+
+    def flush(self):
+        """Flush and fsync pending results"""
+        with self._lock:
+            if not self._file.closed and self._unsynced:
+                self._sync()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'filepath': self.filepath,
+                'written': self.written,
+                'unsynced': self._unsynced,
+                'current_bytes': self._size,
+                'rotations': self.rotations,
+                'fsyncs': self.fsyncs,
+            }
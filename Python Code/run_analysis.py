@@ -15,6 +15,7 @@ Author: InsightNet - Network Behavior Analysis System
 Date: October 2025
 """
 
+import itertools
 import os
 import sys
 import json
@@ -25,21 +26,12 @@ from typing import Dict, Optional
 # Import required modules
 try:
     from csv_to_json_converter import convert_csv_to_networklog_json
-    from main import NetworkBehaviorParser
+    from main import NetworkBehaviorParser, configure_logging
 except ImportError as e:
     print(f"❌ Error importing required modules: {e}")
     print("Please ensure csv_to_json_converter.py and main.py are in the same directory.")
     sys.exit(1)
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('analysis_pipeline.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 class AnalysisPipeline:
@@ -125,17 +117,17 @@ class AnalysisPipeline:
             
             # Load network logs
             print("📥 Loading network logs...")
-            network_logs = self.parser.load_network_logs()
+            network_logs = self.parser.iter_network_logs()
+            first_batch = next(network_logs, None)
             
-            if not network_logs:
+            if not first_batch:
                 print("❌ No network logs found!")
                 return None
             
-            print(f"✅ Loaded {len(network_logs)} log entries")
-            
-            # Analyze behavior
+            # Analyze behavior (logs are streamed in batches, never loaded whole)
             print("🔍 Analyzing behavior patterns...")
-            result = self.parser.analyze_logs(network_logs)
+            result = self.parser.analyze_logs(itertools.chain([first_batch], network_logs))
+            print(f"✅ Analyzed {result['stream']['logs']} log entries")
             
             # Save results
             self.parser.save_results(self.results_file)
@@ -378,6 +370,8 @@ class AnalysisPipeline:
 
 def main():
     """Main entry point"""
+    configure_logging('analysis_pipeline.log')
+    
     print("=" * 70)
     print("InsightNet - Network Behavior Analysis System")
     print("Converting network logs into actionable insights")
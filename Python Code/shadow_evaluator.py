@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Shadow-Mode Evaluation of a Candidate Model
+===========================================
+
+Scores live windows with a candidate EnhancedBehaviorClassifier off the
+request path. The primary result is handed over through a bounded queue;
+when the shadow workers fall behind, new windows are dropped instead of
+blocking the caller. Agreement, confidence deltas and latency of both
+models are recorded for the promotion decision.
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+
+from resource_scheduler import get_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+class ShadowEvaluator:
+    """Background worker pool comparing a shadow model with the primary"""
+
+    def __init__(self, classifier, max_workers: int = 1, max_queue: int = 256,
+                 latency_samples: int = 1000):
+        self.classifier = classifier
+        self.max_workers = max_workers
+        # One thread per shadow model call so it does not compete for the primary's cores
+        get_scheduler().configure_xgb(classifier.model, 1)
+        get_scheduler().configure_sklearn(classifier.anomaly_detector, 1)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._threads = []
+
+        # Counters and bounded samples (no per-window history is kept)
+        self.submitted = 0
+        self.dropped = 0
+        self.scored = 0
+        self.errors = 0
+        self.agreements = 0
+        self.anomaly_agreements = 0
+        self.confusion = {}  # (primary, shadow) -> count
+        self.confidence_deltas = deque(maxlen=latency_samples)  # shadow - primary
+        self.shadow_latency = deque(maxlen=latency_samples)
+        self.primary_latency = deque(maxlen=latency_samples)
+
+    def start(self):
+        """Start the daemon worker threads"""
+        if self._threads:
+            return
+        self._stop_event.clear()
+        for i in range(self.max_workers):
+            thread = threading.Thread(target=self._run, name=f'shadow-evaluator-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Shadow evaluation started for model version {self.classifier.model_version} "
+                    f"({self.max_workers} workers, queue {self._queue.maxsize})")
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the workers; windows still queued are discarded"""
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def submit(self, features: Dict, primary: tuple, primary_seconds: Optional[float] = None) -> bool:
+        """Queue one scored window without blocking; False when dropped under backpressure"""
+        with self._lock:
+            self.submitted += 1
+        try:
+            self._queue.put_nowait((features, primary, primary_seconds))
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    def _run(self):
+        """Worker loop"""
+        while not self._stop_event.is_set():
+            try:
+                features, primary, primary_seconds = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self._score(features, primary, primary_seconds)
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                logger.error(f"Shadow evaluation failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _score(self, features: Dict, primary: tuple, primary_seconds: Optional[float]):
+        """Score one window with the shadow model and record the comparison"""
+        start = time.perf_counter()
+        behavior, confidence, is_anomaly = self.classifier.predict_enhanced(features)
+        seconds = time.perf_counter() - start
+
+        primary_behavior, primary_confidence, primary_anomaly = primary
+        with self._lock:
+            self.scored += 1
+            self.agreements += behavior == primary_behavior
+            self.anomaly_agreements += bool(is_anomaly) == bool(primary_anomaly)
+            pair = (primary_behavior, behavior)
+            self.confusion[pair] = self.confusion.get(pair, 0) + 1
+            if primary_confidence is not None:  # None: the primary label came from a rule
+                self.confidence_deltas.append(float(confidence) - float(primary_confidence))
+            self.shadow_latency.append(seconds)
+            if primary_seconds is not None:
+                self.primary_latency.append(primary_seconds)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until queued windows are scored (for tests and batch jobs)"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    @staticmethod
+    def _percentiles(samples) -> Dict:
+        """Mean / p50 / p95 of a sample window in milliseconds"""
+        if not samples:
+            return {}
+        values = np.array(samples) * 1000
+        return {
+            'mean_ms': float(values.mean()),
+            'p50_ms': float(np.percentile(values, 50)),
+            'p95_ms': float(np.percentile(values, 95)),
+        }
+
+    def report(self) -> Dict:
+        """Agreement, confidence deltas and latency collected so far"""
+        with self._lock:
+            deltas = np.array(self.confidence_deltas)
+            return {
+                'shadow_version': self.classifier.model_version,
+                'submitted': self.submitted,
+                'scored': self.scored,
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'queued': self._queue.qsize(),
+                'agreement_rate': self.agreements / self.scored if self.scored else None,
+                'anomaly_agreement_rate': self.anomaly_agreements / self.scored if self.scored else None,
+                'confidence_delta': {
+                    'mean': float(deltas.mean()),
+                    'mean_abs': float(np.abs(deltas).mean()),
+                    'min': float(deltas.min()),
+                    'max': float(deltas.max()),
+                } if len(deltas) else {},
+                'disagreements': {f"{p} -> {s}": n for (p, s), n in self.confusion.items() if p != s},
+                'shadow_latency': self._percentiles(self.shadow_latency),
+                'primary_latency': self._percentiles(self.primary_latency),
+            }
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Streaming Anomaly Detection with Half-Space Trees
+=================================================
+
+Online complement to the IsolationForest in EnhancedBehaviorClassifier
+(Tan, Ting & Liu, "Fast Anomaly Detection for Streaming Data", IJCAI 2011).
+
+Every tree is a complete binary tree of fixed height whose splits halve a
+randomly perturbed workspace, so the trees never need the data to be built.
+Each scored window adds one unit of mass along its path in the "latest"
+profile; every window_size updates the latest profile replaces the
+"reference" profile used for scoring. Updates and scores are a fixed
+number of array lookups - O(n_trees x height) time, constant memory.
+"""
+
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class HalfSpaceTrees:
+    """Half-Space Trees ensemble with mass profiles stored as NumPy arrays"""
+
+    def __init__(self, n_trees: int = 25, height: int = 8, window_size: int = 250,
+                 size_limit: float = 0.1, contamination: float = 0.1, random_state: int = 42):
+        self.n_trees = n_trees
+        self.height = height
+        self.window_size = window_size
+        self.size_limit = size_limit      # Stop descending below this share of the reference mass
+        self.contamination = contamination
+        self.random_state = random_state
+
+        self.split_features = None  # (n_trees, internal nodes) feature index per split
+        self.split_values = None    # (n_trees, internal nodes) split threshold
+        self.reference_mass = None  # (n_trees, nodes) mass used for scoring
+        self.latest_mass = None     # (n_trees, nodes) mass collected in the current window
+        self.window_count = 0
+        self.threshold = None       # Scores below this are anomalous
+        self.windows_completed = 0
+        self._lock = threading.Lock()
+
+    def fit(self, X: np.ndarray) -> "HalfSpaceTrees":
+        """Build random workspaces from the feature ranges and load X as the reference profile"""
+        X = np.asarray(X, dtype=float)
+        rng = np.random.default_rng(self.random_state)
+        n_features = X.shape[1]
+        n_internal = 2 ** self.height - 1
+        n_nodes = 2 ** (self.height + 1) - 1
+
+        low, high = X.min(axis=0), X.max(axis=0)
+        span = np.where(high > low, high - low, 1.0)
+
+        self.split_features = np.empty((self.n_trees, n_internal), dtype=np.int64)
+        self.split_values = np.empty((self.n_trees, n_internal), dtype=float)
+        tree_index = np.arange(self.n_trees)
+
+        # Perturbed workspace per tree: random centre, half-width twice the larger side
+        centre = low + rng.uniform(size=(self.n_trees, n_features)) * span
+        half_width = 2 * np.maximum(centre - low, high - centre) + 1e-9
+        node_low = np.repeat((centre - half_width)[:, None, :], n_internal, axis=1)
+        node_high = np.repeat((centre + half_width)[:, None, :], n_internal, axis=1)
+
+        # Breadth-first: split each node at the midpoint of a random feature's range
+        for node in range(n_internal):
+            feature = rng.integers(n_features, size=self.n_trees)
+            lo = node_low[tree_index, node, feature]
+            hi = node_high[tree_index, node, feature]
+            mid = (lo + hi) / 2
+            self.split_features[:, node] = feature
+            self.split_values[:, node] = mid
+
+            left, right = 2 * node + 1, 2 * node + 2
+            if right < n_internal:
+                for child in (left, right):
+                    node_low[:, child] = node_low[:, node]
+                    node_high[:, child] = node_high[:, node]
+                node_high[tree_index, left, feature] = mid
+                node_low[tree_index, right, feature] = mid
+
+        # Reference profile from the training rows, normalized to a per-row share
+        self.reference_mass = np.zeros((self.n_trees, n_nodes))
+        for path in self._paths(X):
+            np.add.at(self.reference_mass, (tree_index[:, None], path), 1.0)
+        self.reference_mass /= len(X)
+        self.latest_mass = np.zeros((self.n_trees, n_nodes))
+        self.window_count = 0
+
+        # Calibrate like IsolationForest(contamination): lowest-scoring share is anomalous
+        scores = np.array([self.score(row) for row in X])
+        self.threshold = float(np.quantile(scores, self.contamination))
+        return self
+
+    def _path(self, x: np.ndarray) -> np.ndarray:
+        """Node ids from root to leaf in every tree, shape (n_trees, height + 1)"""
+        tree_index = np.arange(self.n_trees)
+        path = np.zeros((self.n_trees, self.height + 1), dtype=np.int64)
+        node = np.zeros(self.n_trees, dtype=np.int64)
+        for depth in range(self.height):
+            go_right = x[self.split_features[tree_index, node]] > self.split_values[tree_index, node]
+            node = 2 * node + 1 + go_right
+            path[:, depth + 1] = node
+        return path
+
+    def _paths(self, X: np.ndarray):
+        """Paths for many rows (used for the initial reference profile)"""
+        for row in X:
+            yield self._path(row)
+
+    def score(self, x: np.ndarray, path: Optional[np.ndarray] = None) -> float:
+        """Mass score (higher = more normal): reference mass x 2^depth at each tree's terminal node"""
+        if path is None:
+            path = self._path(np.asarray(x, dtype=float).ravel())
+        tree_index = np.arange(self.n_trees)[:, None]
+        mass = self.reference_mass[tree_index, path]
+
+        # Terminal node: first node on the path whose mass falls under size_limit (else the leaf)
+        small = mass < self.size_limit * mass[:, :1]
+        depth = np.where(small.any(axis=1), small.argmax(axis=1), self.height)
+        terminal_mass = mass[np.arange(self.n_trees), depth]
+        return float(np.mean(terminal_mass * np.exp2(depth)))
+
+    def update(self, x: np.ndarray, path: Optional[np.ndarray] = None):
+        """Add one window to the latest profile; rotate profiles every window_size updates"""
+        if path is None:
+            path = self._path(np.asarray(x, dtype=float).ravel())
+        with self._lock:
+            self.latest_mass[np.arange(self.n_trees)[:, None], path] += 1.0
+            self.window_count += 1
+            if self.window_count >= self.window_size:
+                self.reference_mass = self.latest_mass / self.window_count
+                self.latest_mass = np.zeros_like(self.latest_mass)
+                self.window_count = 0
+                self.windows_completed += 1
+
+    def score_and_update(self, x: np.ndarray):
+        """Score a window against the reference profile, then learn from it"""
+        path = self._path(np.asarray(x, dtype=float).ravel())
+        score = self.score(x, path)
+        self.update(x, path)
+        return score, score < self.threshold
+
+    def used_features(self) -> List[int]:
+        """Feature indices any tree splits on"""
+        return sorted(set(self.split_features.ravel().tolist()))
+
+    def stats(self) -> Dict:
+        """Profile state for monitoring"""
+        return {
+            'n_trees': self.n_trees,
+            'height': self.height,
+            'window_size': self.window_size,
+            'window_count': self.window_count,
+            'windows_completed': self.windows_completed,
+            'threshold': self.threshold,
+            'memory_bytes': int(self.split_features.nbytes + self.split_values.nbytes +
+                                self.reference_mass.nbytes + self.latest_mass.nbytes),
+        }
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
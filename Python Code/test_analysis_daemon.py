@@ -0,0 +1,87 @@
+"""Analysis daemon HTTP status codes for bad requests and failing analyses"""
+
+import http.client
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from analysis_daemon import AnalysisDaemon
+from main import NetworkBehaviorParser
+from model_registry import ModelRegistry
+
+LOGS = [{'timestamp': f"2025-01-06T09:{minute:02d}:00Z", 'domain': 'github.com', 'client_ip': '10.0.0.1'}
+        for minute in range(20)]
+
+
+@pytest.fixture
+def daemon(tmp_path, trained_model_file):
+    """Daemon over a warm parser, serving on an ephemeral localhost port"""
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    registry.publish(trained_model_file, promote=True)
+    parser = NetworkBehaviorParser(model_registry_dir=registry.registry_dir, registry_poll_seconds=3600)
+    parser.initialize()
+    daemon = AnalysisDaemon(parser, 2, 5)
+    thread = threading.Thread(target=daemon.serve, args=('127.0.0.1:0',), daemon=True)
+    thread.start()
+    while daemon._server is None:
+        time.sleep(0.01)
+    yield daemon
+    daemon.shutdown()
+    thread.join(5)
+    parser.shutdown()
+
+
+def _post(daemon, path, body):
+    connection = http.client.HTTPConnection(*daemon._server.server_address, timeout=10)
+    connection.request('POST', path, body=body, headers={'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    status, payload = response.status, json.loads(response.read())
+    connection.close()
+    return status, payload
+
+
+def _raw(daemon, request: bytes) -> int:
+    """Status code of a hand-written request (headers http.client would fix up)"""
+    with socket.create_connection(daemon._server.server_address, timeout=10) as sock:
+        sock.sendall(request)
+        return int(sock.recv(4096).split(b' ', 2)[1])
+
+
+def test_analyze_ok(daemon):
+    status, result = _post(daemon, '/analyze', json.dumps({'logs': LOGS}))
+    assert status == 200
+    assert result['features']['total_queries'] == 20
+    assert not result['provisional']
+
+
+@pytest.mark.parametrize('body', [b'{"logs": [1, 2]}', b'{"logs": "github.com"}', b'{not json'])
+def test_bad_body_is_400(daemon, body):
+    status, payload = _post(daemon, '/analyze', body)
+    assert status == 400
+    assert payload['error']
+    assert daemon.counters['bad_requests'] == 1
+
+
+def test_bad_batch_window_is_400(daemon):
+    status, _ = _post(daemon, '/analyze/batch', json.dumps({'windows': [{'logs': LOGS}, {'logs': [1]}]}))
+    assert status == 400
+
+
+@pytest.mark.parametrize('content_length, expected', [(None, 411), (b'abc', 400), (b'-5', 400)])
+def test_bad_content_length(daemon, content_length, expected):
+    header = b'' if content_length is None else b'Content-Length: ' + content_length + b'\r\n'
+    assert _raw(daemon, b'POST /analyze HTTP/1.1\r\nHost: localhost\r\n' + header + b'\r\n') == expected
+
+
+def test_failing_analysis_is_500(daemon, monkeypatch):
+    def fail(*args):
+        raise RuntimeError('model exploded')
+    monkeypatch.setattr(daemon.parser, 'analyze_logs', fail)
+
+    status, payload = _post(daemon, '/analyze', json.dumps({'logs': LOGS}))
+    assert status == 500
+    assert payload['error'] == 'model exploded'
+    assert daemon.counters['errors'] == 1
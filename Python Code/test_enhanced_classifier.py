@@ -0,0 +1,108 @@
+"""Inference bookkeeping and incremental updates of EnhancedBehaviorClassifier"""
+
+from collections import Counter
+
+import joblib
+import numpy as np
+import pytest
+
+from enhanced_classifier import DEFAULT_RULE_CONFIDENCE, EnhancedBehaviorClassifier
+
+
+def _windows(classifier, n: int = 40):
+    X, _ = classifier.load_training_matrix()
+    return [dict(zip(classifier.feature_columns, map(float, row))) for row in X[:n]]
+
+
+def _path_counts(classifier, windows, need_probabilities):
+    classifier.path_counts = Counter()
+    for features in windows:
+        classifier.predict_enhanced(features, need_probabilities)
+    return classifier.path_counts
+
+
+@pytest.mark.parametrize('need_probabilities', [True, False])
+def test_cache_hits_count_inference_paths(trained_classifier, need_probabilities):
+    windows = _windows(trained_classifier) * 2
+    uncached = _path_counts(trained_classifier, windows, need_probabilities)
+
+    trained_classifier.enable_prediction_cache()
+    cached = _path_counts(trained_classifier, windows, need_probabilities)
+
+    assert trained_classifier.prediction_cache_stats()['hits'] >= len(windows) // 2
+    assert cached == uncached
+
+
+def test_cache_hits_still_score_anomalies(trained_classifier, monkeypatch):
+    trained_classifier.enable_prediction_cache()
+    windows = _windows(trained_classifier, 5)
+    scored = []
+    monkeypatch.setattr(trained_classifier, '_detect_model_anomaly', lambda row: scored.append(row) or True)
+
+    for features in windows * 2:
+        _, _, is_anomaly = trained_classifier.predict_enhanced(features)
+        assert is_anomaly
+    assert len(scored) == 10
+
+
+def test_batch_matches_single_with_cache(trained_classifier, trained_model_file):
+    other = EnhancedBehaviorClassifier()
+    other.load_model(trained_model_file)
+    windows = _windows(trained_classifier, 20) * 2
+    for classifier in (trained_classifier, other):
+        classifier.set_anomaly_mode('streaming')
+        classifier.enable_prediction_cache()
+
+    single = [trained_classifier.predict_enhanced(features) for features in windows]
+    batch = other.predict_enhanced_batch(windows)
+
+    assert [(b, s, a) for b, s, a in batch] == [(b, pytest.approx(s), a) for b, s, a in single]
+    assert other.path_counts == trained_classifier.path_counts
+
+
+def test_rule_confidence_is_calibrated_at_load_time(trained_classifier, trained_model_file, tmp_path, monkeypatch):
+    model_data = joblib.load(trained_model_file)
+    del model_data['rule_precision']  # As in models saved before calibration existed
+    path = str(tmp_path / 'uncalibrated.pkl')
+    joblib.dump(model_data, path)
+
+    classifier = EnhancedBehaviorClassifier()
+    classifier.load_model(path)
+    assert classifier.rule_precision == trained_classifier.rule_precision
+
+    # The request path reads the calibration only
+    monkeypatch.setattr(classifier, 'load_training_matrix', pytest.fail)
+    classifier.rule_precision = None
+    assert classifier.rule_confidence('work') == DEFAULT_RULE_CONFIDENCE
+
+
+def _labeled_rows(classifier, label: str, n: int = 60, shift: float = 0.0):
+    X, y = classifier.load_training_matrix()
+    test_rows = classifier.training_split['test']
+    picked = [i for i in test_rows if y[i] == label][:n]
+    return [dict(zip(classifier.feature_columns, map(float, np.asarray(X[i]) * (1 + shift) + shift)), label=label)
+            for i in picked]
+
+
+def test_update_in_distribution_rows_warm_starts(trained_classifier):
+    trained_classifier.enable_prediction_cache().put(('stale',), ('work', 1.0, 'model', ''))
+    trees_before = trained_classifier.model.best_iteration + 1
+
+    stats = trained_classifier.update(_labeled_rows(trained_classifier, 'work'), extra_rounds=5)
+
+    assert stats['mode'] == 'warm_start'
+    assert stats['drift'] <= 0.5
+    assert stats['total_trees'] == trees_before + 5
+    assert trained_classifier.training_split is not None
+    assert trained_classifier.prediction_cache_stats()['entries'] == 0
+
+
+def test_update_shifted_rows_retrains_on_full_matrix(trained_classifier):
+    trees_before = trained_classifier.model.best_iteration + 1
+
+    stats = trained_classifier.update(_labeled_rows(trained_classifier, 'work', shift=3.0))
+
+    assert stats['mode'] == 'retrain'
+    assert stats['drift'] > 0.5
+    assert stats['total_trees'] == trees_before
+    assert trained_classifier.training_split is None
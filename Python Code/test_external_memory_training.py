@@ -0,0 +1,50 @@
+"""Out-of-core training shares the in-memory pipeline's feature semantics"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from enhanced_classifier import EnhancedBehaviorClassifier
+from external_memory_training import read_partition
+from model_compaction import validation_split
+
+
+@pytest.fixture
+def partition_dir(tmp_path):
+    """training_data.json (basic columns only) split into four daily partitions"""
+    with open('training_data.json') as f:
+        rows = json.load(f)
+    for day, chunk in enumerate(np.array_split(np.random.default_rng(0).permutation(len(rows)), 4)):
+        with open(tmp_path / f"2025-01-0{day + 1}.jsonl", 'w') as f:
+            f.writelines(json.dumps(rows[i]) + '\n' for i in chunk)
+    return tmp_path
+
+
+def test_missing_columns_are_augmented_reproducibly(partition_dir):
+    classifier = EnhancedBehaviorClassifier()
+    path = str(partition_dir / '2025-01-01.jsonl')
+    X, _ = read_partition(path, classifier.feature_columns, classifier._augment_missing_features)
+    again, _ = read_partition(path, classifier.feature_columns, classifier._augment_missing_features)
+
+    assert np.array_equal(X, again)
+    social = X[:, classifier.feature_columns.index('social_media_pct')]
+    entertainment = pd.read_json(path, lines=True)['entertainment_pct'].to_numpy()
+    assert (social[entertainment > 0] > 0).all()
+
+
+def test_out_of_core_model_records_its_pipeline(partition_dir, tmp_path):
+    classifier = EnhancedBehaviorClassifier()
+    classifier.train_out_of_core(str(partition_dir))
+    assert set(classifier.rule_precision) <= {'entertainment', 'work', 'unethical'}
+    assert classifier.rule_precision
+
+    path = str(tmp_path / 'out_of_core.pkl')
+    classifier.save_model(path)
+    loaded = EnhancedBehaviorClassifier()
+    loaded.load_model(path)
+    assert loaded.training_pipeline == 'out_of_core'
+    assert loaded.rule_precision == classifier.rule_precision
+    with pytest.raises(ValueError, match='out of core'):
+        validation_split(loaded)
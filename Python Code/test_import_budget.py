@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Import-time budget as a pytest check (see import_budget.py)
+
+Each entry module is imported in a fresh interpreter, so modules already
+loaded by pytest itself do not hide a regression. The structural check
+(no heavy dependency in sys.modules) always runs; the wall-clock budgets
+only with IMPORT_BUDGET_TIMING=1, since they are flaky on loaded machines.
+"""
+
+import os
+
+import pytest
+
+from import_budget import BUDGETS_MS, check_module, heavy_modules_loaded
+
+
+@pytest.mark.parametrize('module', sorted(BUDGETS_MS))
+def test_no_heavy_imports(module):
+    heavy = heavy_modules_loaded(module)
+    assert not heavy, f"{module} imports heavy dependencies at load time: {', '.join(heavy)}"
+
+
+@pytest.mark.skipif(not os.environ.get('IMPORT_BUDGET_TIMING'), reason='timing budgets are opt-in')
+@pytest.mark.parametrize('module', sorted(BUDGETS_MS))
+def test_import_budget(module):
+    problems = check_module(module, BUDGETS_MS[module])
+    assert not problems, '\n'.join(problems)
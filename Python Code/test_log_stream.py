@@ -0,0 +1,79 @@
+"""Streamed feature extraction matches the in-memory path"""
+
+import json
+import random
+
+import pytest
+
+from enhanced_classifier import EnhancedFeatureExtractor
+from log_stream import FeatureAccumulator, iter_log_batches
+from main import NetworkBehaviorParser
+
+DOMAINS = ['github.com', 'youtube.com', 'stackoverflow.com', 'netflix.com', 'docs.python.org',
+           'linkedin.com', 'amazon.com', 'api.github.com', 'ocsp.digicert.com', '']
+
+
+def _logs(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [{
+        'timestamp': f"2025-01-0{1 + i // 5000}T{(i // 240) % 24:02d}:{(i // 4) % 60:02d}:{i % 4 * 15:02d}Z",
+        'domain': rng.choice(DOMAINS),
+        'client_ip': '10.0.0.1',
+        'status': rng.choice(['default', 'default', 'blocked']),
+    } for i in range(n)]
+
+
+def _assert_same_features(streamed, batch):
+    assert streamed.keys() == batch.keys()
+    for name, value in batch.items():
+        if isinstance(value, (int, float)):
+            assert streamed[name] == pytest.approx(value, abs=1e-9), name
+        else:
+            assert streamed[name] == value, name
+
+
+@pytest.fixture(scope='module')
+def extractor():
+    return EnhancedFeatureExtractor()
+
+
+@pytest.mark.parametrize('batch_size', [1, 7, 500, 10000])
+def test_accumulator_matches_batch_extraction(extractor, batch_size):
+    logs = _logs(3000)
+    accumulator = FeatureAccumulator(extractor)
+    for start in range(0, len(logs), batch_size):
+        accumulator.add(logs[start:start + batch_size])
+    _assert_same_features(accumulator.features(), extractor.extract_enhanced_features(logs))
+
+
+def test_accumulator_features_is_repeatable_mid_stream(extractor):
+    logs = _logs(1000)
+    accumulator = FeatureAccumulator(extractor)
+    accumulator.add(logs[:400])
+    _assert_same_features(accumulator.features(), extractor.extract_enhanced_features(logs[:400]))
+    accumulator.add(logs[400:])
+    _assert_same_features(accumulator.features(), extractor.extract_enhanced_features(logs))
+
+
+@pytest.mark.parametrize('layout', ['array', 'wrapped', 'ndjson'])
+def test_file_layouts_stream_the_same_logs(tmp_path, layout):
+    logs = _logs(250)
+    path = tmp_path / 'logs.json'
+    if layout == 'array':
+        path.write_text(json.dumps(logs))
+    elif layout == 'wrapped':
+        path.write_text(json.dumps({'logs': logs}))
+    else:
+        path.write_text(''.join(json.dumps(log) + '\n' for log in logs))
+    batches = list(iter_log_batches(str(path), batch_size=100))
+    assert [len(batch) for batch in batches] == [100, 100, 50]
+    assert [log for batch in batches for log in batch] == logs
+
+
+def test_parse_error_mid_stream_is_raised(tmp_path):
+    path = tmp_path / 'logs.json'
+    path.write_text(json.dumps(_logs(50))[:-200])  # Truncated JSON array
+    parser = NetworkBehaviorParser(network_logs_file=str(path))
+    with pytest.raises(ValueError):
+        parser.analyze_logs(parser.iter_network_logs(batch_size=10))
+    assert not parser.results_history
@@ -0,0 +1,62 @@
+"""End-to-end model_compaction runs at the default tolerance"""
+
+import numpy as np
+
+from enhanced_classifier import EnhancedBehaviorClassifier
+from model_compaction import compact_classifier, validation_split
+
+DEFAULT_TOLERANCE = 0.005
+
+
+def _load(path):
+    classifier = EnhancedBehaviorClassifier()
+    classifier.load_model(path)
+    return classifier
+
+
+def test_compacts_fresh_model_within_tolerance(trained_classifier, tmp_path):
+    output = str(tmp_path / 'compact.pkl')
+    stats = compact_classifier(trained_classifier, DEFAULT_TOLERANCE, output)
+
+    assert stats['trees_after'] < stats['trees_before']
+    assert stats['test_accuracy_after'] >= stats['test_accuracy_before'] - DEFAULT_TOLERANCE
+
+    # The saved artifact reproduces the reported held-out accuracy
+    compact = _load(output)
+    _, _, _, _, X_test, y_test = validation_split(compact)
+    predicted = compact.label_encoder.inverse_transform(compact.model.predict(compact.scaler.transform(X_test)))
+    assert np.mean(predicted == y_test) == stats['test_accuracy_after']
+
+
+def test_compacts_model_without_recorded_split(trained_model_file, tmp_path):
+    classifier = _load(trained_model_file)
+    recorded = classifier.training_split
+    classifier.training_split = None  # As in models saved before splits were persisted
+
+    # The seeded re-split is the split the model was trained with
+    rebuilt = classifier.split_training_rows(classifier.load_training_matrix()[1])
+    for name, indices in zip(('train', 'val', 'test'), rebuilt):
+        assert np.array_equal(indices, recorded[name])
+
+    stats = compact_classifier(classifier, DEFAULT_TOLERANCE, str(tmp_path / 'compact.pkl'))
+    assert stats['test_accuracy_after'] >= stats['test_accuracy_before'] - DEFAULT_TOLERANCE
+
+
+def test_compact_copy_does_not_share_caches_or_cascade(trained_classifier, tmp_path):
+    trained_classifier.enable_prediction_cache(100)
+    trained_classifier.enable_explanation_cache(10)
+    X, _ = trained_classifier.load_training_matrix()
+    trained_classifier.predict_enhanced(dict(zip(trained_classifier.feature_columns, X[0])))
+    threshold = trained_classifier.cascade_threshold
+
+    output = str(tmp_path / 'compact.pkl')
+    compact_classifier(trained_classifier, DEFAULT_TOLERANCE, output)
+
+    # The original keeps its own state untouched
+    assert len(trained_classifier.prediction_cache) == 1
+    assert trained_classifier.cascade_threshold == threshold
+
+    # The cascade margin is re-calibrated against the compacted booster
+    compact = _load(output)
+    assert compact.cascade_model is not None
+    assert compact.cascade_stats['agreement'] >= 0.9
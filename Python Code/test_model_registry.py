@@ -0,0 +1,87 @@
+"""Registry promote / rollback and the parser's hot swap"""
+
+import os
+
+import pytest
+
+from enhanced_classifier import EnhancedBehaviorClassifier
+from main import NetworkBehaviorParser
+from model_registry import ModelRegistry
+
+
+@pytest.fixture
+def registry(tmp_path, trained_model_file):
+    """Registry with two versions of the session model; the first is CURRENT"""
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    first = registry.publish(trained_model_file, promote=True)
+    classifier = EnhancedBehaviorClassifier()
+    classifier.load_model(trained_model_file)
+    classifier.cascade_threshold = 0.5  # Different bytes, different version
+    second = registry.publish_classifier(classifier, promote=False)
+    return registry, first, second
+
+
+@pytest.fixture
+def parser(registry):
+    parser = NetworkBehaviorParser(model_registry_dir=registry[0].registry_dir, registry_poll_seconds=3600,
+                                   prediction_cache_size=100)
+    parser.initialize()
+    yield parser
+    parser.shutdown()
+
+
+def test_promote_hot_swaps_and_keeps_runtime_settings(registry, parser):
+    registry, first, second = registry
+    assert parser.classifier.model_version == first
+
+    parser.classifier.set_anomaly_mode('both')
+    parser.classifier.cascade_enabled = True
+    explanation_cache = parser.classifier.enable_explanation_cache(10)
+    parser.prediction_cache.put(('stale',), ('work', 1.0, False))
+
+    registry.promote(second)
+    assert parser.registry_watcher.poll_once()
+
+    classifier = parser.classifier
+    assert classifier.model_version == second
+    assert classifier.anomaly_mode == 'both'
+    assert classifier.cascade_enabled
+    assert classifier.explanation_cache is explanation_cache
+    assert len(parser.prediction_cache) == 0  # Old model's entries are not served for the new one
+
+
+def test_rollback_swaps_back_in_memory_once(registry, parser):
+    registry, first, second = registry
+    registry.promote(second)
+    parser.registry_watcher.poll_once()
+    swapped_out = parser._previous_classifier
+
+    assert parser.rollback_model()
+    assert parser.classifier is swapped_out
+    assert registry.current_version() == first
+    assert not parser.registry_watcher.poll_once()  # Already active: no second swap from disk
+
+
+def test_load_made_stale_by_rollback_is_dropped(registry, parser):
+    registry, first, second = registry
+    registry.promote(second)
+    watched = parser.model_registry
+    load = watched.load
+
+    def load_during_rollback(version, training_data_file):
+        classifier = load(version, training_data_file)
+        watched.rollback()  # CURRENT moves back to first while the watcher is loading second
+        return classifier
+
+    watched.load = load_during_rollback
+    assert not parser.registry_watcher.poll_once()
+    assert parser.classifier.model_version == first
+    assert parser.registry_watcher.loaded_version == first
+
+
+def test_missing_current_artifact_is_an_error(registry, parser):
+    registry, first, _ = registry
+    parser.shutdown()
+    os.remove(registry.path_for(first))
+    with pytest.raises(FileNotFoundError):
+        NetworkBehaviorParser(model_registry_dir=registry.registry_dir).initialize()
@@ -0,0 +1,29 @@
+"""Labeled raw logs become training rows"""
+
+import json
+
+from training_dataset_builder import build_training_dataset
+
+
+def test_mixed_naive_and_aware_timestamps(tmp_path):
+    work = tmp_path / 'labeled' / 'work'
+    work.mkdir(parents=True)
+    # One client, alternating naive (taken as UTC) and offset timestamps within one window
+    entries = [{
+        'timestamp': (f"2025-01-06T09:{minute:02d}:00" if minute % 2 else f"2025-01-06T11:{minute:02d}:00+02:00"),
+        'domain': 'github.com',
+        'client_ip': '10.0.0.1',
+    } for minute in range(20)]
+    entries.append({'timestamp': 'not a time', 'domain': 'github.com', 'client_ip': '10.0.0.1'})
+    with open(work / 'monday.jsonl', 'w') as f:
+        f.writelines(json.dumps(entry) + '\n' for entry in entries)
+
+    output = str(tmp_path / 'training.json')
+    stats = build_training_dataset(str(tmp_path / 'labeled'), output, max_workers=1)
+
+    assert stats['rows'] == 1
+    assert stats['skipped_entries'] == 1
+    with open(output) as f:
+        rows = json.load(f)
+    assert rows[0]['label'] == 'work'
+    assert rows[0]['total_queries'] == 20
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Parallel Training-Dataset Builder from Labeled Raw DNS Logs
+===========================================================
+
+Turns labeled raw captures (like job_hunting_behavior.csv) into training
+rows for the Enhanced XGBoost classifier.
+
+Input layout - the directory name is the label:
+    labeled_logs/
+        unethical/job_hunting_behavior.csv
+        work/dev_team_monday.json
+        entertainment/evening.jsonl
+
+Files may also carry a per-row `label` column instead. Every file is split
+per client into fixed time windows, each window goes through
+EnhancedFeatureExtractor, and worker processes write their rows to their
+own shard before the shards are merged into one training_data.json-style
+file.
+
+Usage:
+    python training_dataset_builder.py <labeled_logs_dir> [output_file] [window_minutes]
+"""
+
+import csv
+import glob
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from csv_to_json_converter import detect_column_mapping
+from enhanced_classifier import EnhancedFeatureExtractor, FEATURE_COLUMNS
+from resource_scheduler import get_scheduler
+
+logger = logging.getLogger(__name__)
+
+RAW_LOG_EXTENSIONS = ('.csv', '.json', '.jsonl', '.ndjson')
+
+# Per-process state, set once by the pool initializer
+_worker_state = {}
+
+
+def discover_labeled_files(input_dir: str) -> List[Tuple[str, Optional[str]]]:
+    """Find raw log files and the label implied by their parent directory"""
+    files = []
+    for path in sorted(glob.glob(os.path.join(input_dir, '**', '*'), recursive=True)):
+        if not path.endswith(RAW_LOG_EXTENSIONS) or not os.path.isfile(path):
+            continue
+        parent = os.path.relpath(os.path.dirname(path), input_dir)
+        # Files directly in input_dir must carry a per-row label column
+        label = None if parent == '.' else parent.split(os.sep)[0]
+        files.append((path, label))
+    return files
+
+
+def read_raw_logs(path: str) -> Iterator[Dict]:
+    """Yield normalized log entries (timestamp, domain, client_ip, status, label)"""
+    if path.endswith('.csv'):
+        with open(path, 'r', newline='') as f:
+            reader = csv.DictReader(f)
+            mapping = detect_column_mapping(reader.fieldnames or [])
+            label_column = next((c for c in reader.fieldnames or [] if c.lower() == 'label'), None)
+            for row in reader:
+                yield {
+                    'timestamp': row.get(mapping.get('timestamp'), '') or '',
+                    'domain': row.get(mapping.get('domain'), '') or '',
+                    'client_ip': row.get(mapping.get('client_ip'), '') or 'unknown',
+                    'status': row.get(mapping.get('status'), '') or '',
+                    'label': row.get(label_column) if label_column else None,
+                }
+        return
+
+    with open(path, 'r') as f:
+        if path.endswith(('.jsonl', '.ndjson')):
+            entries = (json.loads(line) for line in f if line.strip())
+        else:
+            data = json.load(f)
+            if isinstance(data, dict):
+                data = data.get('logs', data.get('data', []))
+            entries = iter(data)
+
+        for entry in entries:
+            yield {
+                'timestamp': entry.get('timestamp', ''),
+                'domain': entry.get('domain', ''),
+                'client_ip': entry.get('client_ip', entry.get('device', 'unknown')),
+                'status': entry.get('status', ''),
+                'label': entry.get('label'),
+            }
+
+
+def _entry_time(ts) -> datetime:
+    """Entry timestamp as naive UTC, like log_monitor's _log_time
+
+    Offsets are applied and naive values taken as UTC, so entries of one
+    file always compare - mixing the two would make the sort raise.
+    Raises ValueError/AttributeError for missing or unparsable values.
+    """
+    dt = datetime.fromisoformat(ts.replace('Z', '+00:00'))
+    if dt.tzinfo is not None:
+        dt = (dt - dt.utcoffset()).replace(tzinfo=None)
+    return dt
+
+
+def slice_windows(entries: List[Dict], window_minutes: int) -> Iterator[List[Dict]]:
+    """Split time-sorted entries of one client into tumbling windows"""
+    window = []
+    window_end = None
+    for entry in entries:
+        ts = entry['_dt']
+        if window_end is None or ts >= window_end:
+            if window:
+                yield window
+            window = []
+            window_end = ts + timedelta(minutes=window_minutes)
+        window.append(entry)
+    if window:
+        yield window
+
+
+def _init_worker(domain_categories_file: str, shard_dir: str, window_minutes: int, min_queries: int):
+    """Pool initializer: one feature extractor and one shard file per process"""
+    logging.getLogger('enhanced_classifier').setLevel(logging.WARNING)
+    _worker_state.update(
+        extractor=EnhancedFeatureExtractor(domain_categories_file),
+        shard_path=os.path.join(shard_dir, f"shard-{os.getpid()}.jsonl"),
+        window_minutes=window_minutes,
+        min_queries=min_queries,
+    )
+
+
+def _process_file(task: Tuple[str, Optional[str]]) -> Dict:
+    """Window one labeled file and append its feature rows to this worker's shard"""
+    path, dir_label = task
+    extractor = _worker_state['extractor']
+
+    # Group by (label, client) so each window is a single user with a single label
+    sessions = defaultdict(list)
+    skipped = 0
+    for entry in read_raw_logs(path):
+        label = entry.pop('label') or dir_label
+        try:
+            entry['_dt'] = _entry_time(entry['timestamp'])
+        except (AttributeError, ValueError):
+            skipped += 1
+            continue
+        if not label or not entry['domain']:
+            skipped += 1
+            continue
+        sessions[(label, entry['client_ip'])].append(entry)
+
+    rows = 0
+    with open(_worker_state['shard_path'], 'a') as shard:
+        for (label, _client), entries in sessions.items():
+            entries.sort(key=lambda e: e['_dt'])
+            for window in slice_windows(entries, _worker_state['window_minutes']):
+                if len(window) < _worker_state['min_queries']:
+                    continue
+                logs = [{k: v for k, v in e.items() if k != '_dt'} for e in window]
+                features = extractor.extract_enhanced_features(logs, _worker_state['window_minutes'])
+                row = {'label': label}
+                row.update({col: _to_builtin(features.get(col, 0)) for col in FEATURE_COLUMNS})
+                shard.write(json.dumps(row) + '\n')
+                rows += 1
+
+    return {'file': path, 'rows': rows, 'skipped_entries': skipped}
+
+
+def _to_builtin(value):
+    """Convert NumPy scalars so rows serialize as plain JSON numbers"""
+    return value.item() if hasattr(value, 'item') else value
+
+
+def build_training_dataset(input_dir: str, output_file: str = 'training_data_generated.json',
+                           domain_categories_file: str = 'domain_categories.json',
+                           window_minutes: int = 30, min_queries: int = 10,
+                           max_workers: Optional[int] = None) -> Dict:
+    """Build training rows from a directory of labeled raw logs using a process pool"""
+    start = time.perf_counter()
+    files = discover_labeled_files(input_dir)
+    if not files:
+        raise ValueError(f"No raw log files found in {input_dir}")
+
+    shard_dir = output_file + '.shards'
+    shutil.rmtree(shard_dir, ignore_errors=True)
+    os.makedirs(shard_dir)
+
+    allocation = get_scheduler().allocate(len(files), max_outer=max_workers)
+    logger.info(f"Building training data from {len(files)} files with {allocation.outer} workers")
+
+    with ProcessPoolExecutor(
+        max_workers=allocation.outer,
+        initializer=_init_worker,
+        initargs=(domain_categories_file, shard_dir, window_minutes, min_queries)
+    ) as pool:
+        file_stats = list(pool.map(_process_file, files))
+
+    total_rows = merge_shards(shard_dir, output_file)
+    shutil.rmtree(shard_dir, ignore_errors=True)
+
+    stats = {
+        'files': len(files),
+        'workers': allocation.outer,
+        'rows': total_rows,
+        'skipped_entries': sum(s['skipped_entries'] for s in file_stats),
+        'seconds': time.perf_counter() - start,
+        'output_file': output_file,
+    }
+    logger.info(f"Wrote {total_rows} training rows to {output_file} in {stats['seconds']:.1f}s")
+    return stats
+
+
+def merge_shards(shard_dir: str, output_file: str) -> int:
+    """Stream every shard into one JSON array without holding all rows in memory"""
+    rows = 0
+    tmp_path = output_file + '.tmp'
+    with open(tmp_path, 'w') as out:
+        out.write('[\n')
+        for shard_path in sorted(glob.glob(os.path.join(shard_dir, 'shard-*.jsonl'))):
+            with open(shard_path, 'r') as shard:
+                for line in shard:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    out.write((',\n' if rows else '') + '  ' + line)
+                    rows += 1
+        out.write('\n]\n')
+    os.replace(tmp_path, output_file)
+    return rows
+
+
+def main():
+    """Main function for command-line usage"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if len(sys.argv) < 2 or sys.argv[1] in ['--help', '-h', 'help']:
+        print("Usage: python training_dataset_builder.py <labeled_logs_dir> [output_file] [window_minutes]")
+        print("\nExample:")
+        print("  python training_dataset_builder.py labeled_logs/ training_data_generated.json 30")
+        print("\nLayout: labeled_logs/<label>/<capture>.csv|json|jsonl")
+        return
+
+    input_dir = sys.argv[1]
+    output_file = sys.argv[2] if len(sys.argv) > 2 else 'training_data_generated.json'
+    window_minutes = int(sys.argv[3]) if len(sys.argv) > 3 else 30
+
+    stats = build_training_dataset(input_dir, output_file, window_minutes=window_minutes)
+    print(f"\n✅ Generated {stats['rows']:,} training rows from {stats['files']} files "
+          f"in {stats['seconds']:.1f}s -> {stats['output_file']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Per-User Rolling Baseline Profiles
+==================================
+
+Keeps an exponentially weighted mean and variance of every model feature
+for each (anonymized) user, so a window can be judged against that user's
+own history instead of global thresholds. A heavy dev user and a light
+office user each get their own "normal".
+
+Storage is three dense NumPy arrays indexed by a per-user row number
+(float32 means and variances, uint32 window counts): about 190 bytes per
+user for 23 features, ~19 MB for 100k users (capacity grows by doubling).
+Updates are O(features). Standard deviations are floored per feature at a
+share of the global (training-set) std, so a user whose feature sat at or
+near zero is not flagged for tiny absolute changes.
+"""
+
+import logging
+import os
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class UserBaselineStore:
+    """EWMA mean/variance per user and feature in NumPy arrays"""
+
+    def __init__(self, feature_columns: List[str], alpha: float = 0.05,
+                 z_threshold: float = 3.0, min_windows: int = 10,
+                 min_std_fraction: float = 0.1, initial_capacity: int = 1024,
+                 global_std: Optional[np.ndarray] = None):
+        self.feature_columns = list(feature_columns)
+        self.alpha = alpha                        # Weight of the newest window
+        self.z_threshold = z_threshold            # |z| above this is a deviation
+        self.min_windows = min_windows            # Warm-up before a user can be flagged
+        self.min_std_fraction = min_std_fraction  # Std floor as a share of the global std (stable users)
+
+        n_features = len(self.feature_columns)
+        global_std = np.ones(n_features) if global_std is None else np.asarray(global_std, dtype=np.float32)
+        global_std = np.where(global_std > 0, global_std, 1.0)  # Constant in training: unit scale
+        # Absolute per-feature floor: holds for features whose user mean is 0
+        self.std_floor = (min_std_fraction * global_std).astype(np.float32)
+        self.mean = np.zeros((initial_capacity, n_features), dtype=np.float32)
+        self.var = np.zeros((initial_capacity, n_features), dtype=np.float32)
+        self.count = np.zeros(initial_capacity, dtype=np.uint32)
+        self.user_index: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.user_index)
+
+    def _row(self, user_id: str) -> int:
+        """Row of a user, allocating (and doubling capacity) for new users"""
+        row = self.user_index.get(user_id)
+        if row is None:
+            row = len(self.user_index)
+            if row == len(self.count):
+                capacity = 2 * len(self.count)
+                self.mean = np.resize(self.mean, (capacity, self.mean.shape[1]))
+                self.var = np.resize(self.var, (capacity, self.var.shape[1]))
+                self.count = np.resize(self.count, capacity)
+                self.mean[row:] = 0
+                self.var[row:] = 0
+                self.count[row:] = 0
+            self.user_index[user_id] = row
+        return row
+
+    def vector(self, features: Dict) -> np.ndarray:
+        """Feature dict -> vector in store column order"""
+        return np.array([features.get(col, 0) for col in self.feature_columns], dtype=np.float32)
+
+    def z_scores(self, user_id: str, x: np.ndarray) -> Optional[np.ndarray]:
+        """Deviation of x from the user's baseline in (floored) standard deviations"""
+        with self._lock:
+            return self._z_scores(self.user_index.get(user_id), x)
+
+    def _z_scores(self, row: Optional[int], x: np.ndarray) -> Optional[np.ndarray]:
+        if row is None or self.count[row] == 0:
+            return None
+        mean = self.mean[row]
+        std = np.sqrt(self.var[row] + self.std_floor ** 2 + 1e-6)
+        return (x - mean) / std
+
+    def update(self, user_id: str, x: np.ndarray):
+        """Fold one window into the user's EWMA mean and variance"""
+        with self._lock:
+            self._update(self._row(user_id), x)
+
+    def _update(self, row: int, x: np.ndarray):
+        if self.count[row] == 0:
+            self.mean[row] = x
+            self.var[row] = 0
+        else:
+            diff = x - self.mean[row]
+            increment = self.alpha * diff
+            self.mean[row] += increment
+            self.var[row] = (1 - self.alpha) * (self.var[row] + diff * increment)
+        self.count[row] += 1
+
+    def observe(self, user_id: str, features: Dict) -> Dict:
+        """Score a window against the user's own history, then update the baseline"""
+        x = self.vector(features)
+        # Scoring and folding in happen under one lock so concurrent windows
+        # of a user each see the baseline the other did not yet update
+        with self._lock:
+            row = self._row(user_id)
+            windows = int(self.count[row])
+            z = self._z_scores(row, x)
+            self._update(row, x)
+
+        deviations = {}
+        if z is not None and windows >= self.min_windows:
+            flagged = np.nonzero(np.abs(z) > self.z_threshold)[0]
+            deviations = {self.feature_columns[i]: round(float(z[i]), 2) for i in flagged}
+
+        return {
+            'is_deviation': bool(deviations),
+            'deviations': deviations,
+            'baseline_windows': windows,
+        }
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the baseline arrays"""
+        return int(self.mean.nbytes + self.var.nbytes + self.count.nbytes)
+
+    def save(self, filepath: str = 'user_baselines.npz'):
+        """Persist baselines atomically"""
+        with self._lock:
+            users = len(self.user_index)
+            user_ids = np.empty(users, dtype=object)
+            for user_id, row in self.user_index.items():
+                user_ids[row] = user_id
+            tmp_path = filepath + '.tmp.npz'
+            np.savez(
+                tmp_path,
+                feature_columns=np.array(self.feature_columns),
+                user_ids=user_ids.astype(str),
+                mean=self.mean[:users], var=self.var[:users], count=self.count[:users],
+                std_floor=self.std_floor,
+                params=np.array([self.alpha, self.z_threshold, self.min_windows, self.min_std_fraction])
+            )
+            os.replace(tmp_path, filepath)
+        logger.info(f"Saved baselines for {users} users to {filepath}")
+
+    @classmethod
+    def load(cls, filepath: str = 'user_baselines.npz',
+             global_std: Optional[np.ndarray] = None) -> "UserBaselineStore":
+        """Load baselines saved with save()
+
+        global_std sets the std floor of files saved before it was persisted.
+        """
+        with np.load(filepath) as data:
+            alpha, z_threshold, min_windows, min_std_fraction = data['params'].tolist()
+            users = len(data['user_ids'])
+            store = cls(data['feature_columns'].tolist(), alpha, z_threshold, int(min_windows),
+                        min_std_fraction, initial_capacity=max(1024, users), global_std=global_std)
+            if 'std_floor' in data:
+                store.std_floor = data['std_floor']
+            store.mean[:users] = data['mean']
+            store.var[:users] = data['var']
+            store.count[:users] = data['count']
+            store.user_index = {user_id: row for row, user_id in enumerate(data['user_ids'].tolist())}
+        logger.info(f"Loaded baselines for {users} users from {filepath}")
+        return store
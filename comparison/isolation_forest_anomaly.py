@@ -15,6 +15,8 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 import warnings
 warnings.filterwarnings('ignore')
 
+from utils import cpu_jobs
+
 class IsolationForestNetworkClassifier:
     def __init__(self, contamination=0.3):
         """
@@ -27,7 +29,7 @@ class IsolationForestNetworkClassifier:
             n_estimators=100,
             contamination=contamination,  # Expected anomaly rate
             random_state=42,
-            n_jobs=-1
+            n_jobs=cpu_jobs()[1]
         )
         self.vectorizer = TfidfVectorizer(max_features=1000)
         self.label_mapping = {
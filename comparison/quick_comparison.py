@@ -19,6 +19,8 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 import warnings
 warnings.filterwarnings('ignore')
 
+from utils import cpu_jobs
+
 
 def load_data():
     """Load actual training data with behavioral features"""
@@ -147,14 +149,15 @@ def main():
     
     # Train all models
     results = {}
+    _, n_jobs = cpu_jobs()
     
     # 1. Random Forest
-    rf = RandomForestClassifier(n_estimators=100, max_depth=None, random_state=42, n_jobs=-1)
+    rf = RandomForestClassifier(n_estimators=100, max_depth=None, random_state=42, n_jobs=n_jobs)
     results['Random Forest'] = train_model('Random Forest', rf, X_train_vec, X_test_vec, y_train, y_test)
     
     # 2. XGBoost
     xgb_model = xgb.XGBClassifier(n_estimators=100, max_depth=6, learning_rate=0.1, 
-                                   random_state=42, n_jobs=-1)
+                                   random_state=42, n_jobs=n_jobs)
     results['XGBoost'] = train_model('XGBoost', xgb_model, X_train_vec, X_test_vec, y_train, y_test)
     
     # 3. Logistic Regression
@@ -166,7 +169,7 @@ def main():
     results['K-Means Clustering'] = train_model('K-Means', kmeans, X_train_vec, X_test_vec, y_train, y_test, is_unsupervised=True)
     
     # 5. Isolation Forest
-    isof = IsolationForest(n_estimators=100, contamination=0.3, random_state=42, n_jobs=-1)
+    isof = IsolationForest(n_estimators=100, contamination=0.3, random_state=42, n_jobs=n_jobs)
     results['Isolation Forest'] = train_model('Isolation Forest', isof, X_train_vec, X_test_vec, y_train, y_test, is_unsupervised=True)
     
     # Print comparison table
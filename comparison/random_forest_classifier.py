@@ -15,6 +15,8 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 import warnings
 warnings.filterwarnings('ignore')
 
+from utils import cpu_jobs
+
 class RandomForestNetworkClassifier:
     def __init__(self, n_estimators=200, max_depth=None, min_samples_split=2):
         """
@@ -31,7 +33,7 @@ class RandomForestNetworkClassifier:
             min_samples_split=min_samples_split,  # Low value - can overfit
             min_samples_leaf=1,  # Very low - high risk of overfitting
             random_state=42,
-            n_jobs=-1
+            n_jobs=cpu_jobs()[1]
         )
         self.vectorizer = TfidfVectorizer(max_features=1000)
         self.label_mapping = {
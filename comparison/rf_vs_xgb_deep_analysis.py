@@ -7,12 +7,15 @@ import json
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 import xgboost as xgb
+from sklearn.base import clone
 from sklearn.model_selection import train_test_split, cross_val_score, learning_curve
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import accuracy_score, classification_report
 import warnings
 warnings.filterwarnings('ignore')
 
+from utils import cpu_jobs
+
 
 def load_data():
     """Load training data with behavioral features"""
@@ -112,6 +115,10 @@ def main():
     print(f"\n📊 Dataset: {len(X)} samples, {len(unique_labels)} classes")
     print(f"   Classes: {', '.join(unique_labels)}")
     
+    # Core budget: single fits use every core, CV splits them between folds
+    _, n_jobs = cpu_jobs()
+    cv_outer, cv_inner = cpu_jobs(5)
+    
     # Standardize
     scaler = StandardScaler()
     X_scaled = scaler.fit_transform(X)
@@ -129,7 +136,7 @@ def main():
     print("="*80)
     
     # Test with default params (the one showing good results)
-    rf_default = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1)
+    rf_default = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=n_jobs)
     rf_default.fit(X_train, y_train)
     
     rf_train_acc = accuracy_score(y_train, rf_default.predict(X_train))
@@ -143,14 +150,15 @@ def main():
     
     # Cross-validation (more reliable)
     print(f"\n🔄 5-Fold Cross-Validation:")
-    rf_cv_scores = cross_val_score(rf_default, X_train, y_train, cv=5, n_jobs=-1)
+    rf_cv_scores = cross_val_score(clone(rf_default).set_params(n_jobs=cv_inner),
+                                   X_train, y_train, cv=5, n_jobs=cv_outer)
     print(f"   CV Scores: {[f'{s:.4f}' for s in rf_cv_scores]}")
     print(f"   CV Mean: {rf_cv_scores.mean():.4f} ± {rf_cv_scores.std():.4f}")
     
     # Multiple random splits
     print(f"\n🎲 Multiple Random Splits (5 trials):")
     rf_multi = test_with_different_splits(
-        RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1),
+        RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=n_jobs),
         X_scaled, y, "Random Forest", n_trials=5
     )
     print(f"   Mean Test Acc: {rf_multi['mean_test']:.4f} ± {rf_multi['std_test']:.4f}")
@@ -164,7 +172,7 @@ def main():
     # Learning curve
     print(f"\n📈 Learning Curve Analysis:")
     sizes, rf_train_curve, rf_test_curve = analyze_learning_curve(
-        RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1),
+        RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=n_jobs),
         X_scaled, y, "Random Forest"
     )
     for size, train_acc, test_acc in zip(sizes, rf_train_curve, rf_test_curve):
@@ -185,7 +193,7 @@ def main():
         reg_alpha=0.1,
         reg_lambda=1.0,
         random_state=42,
-        n_jobs=-1
+        n_jobs=n_jobs
     )
     xgb_model.fit(X_train, y_train)
     
@@ -200,7 +208,8 @@ def main():
     
     # Cross-validation
     print(f"\n🔄 5-Fold Cross-Validation:")
-    xgb_cv_scores = cross_val_score(xgb_model, X_train, y_train, cv=5, n_jobs=-1)
+    xgb_cv_scores = cross_val_score(clone(xgb_model).set_params(n_jobs=cv_inner),
+                                    X_train, y_train, cv=5, n_jobs=cv_outer)
     print(f"   CV Scores: {[f'{s:.4f}' for s in xgb_cv_scores]}")
     print(f"   CV Mean: {xgb_cv_scores.mean():.4f} ± {xgb_cv_scores.std():.4f}")
     
@@ -210,7 +219,7 @@ def main():
         xgb.XGBClassifier(
             n_estimators=100, max_depth=6, learning_rate=0.1,
             subsample=0.8, reg_alpha=0.1, reg_lambda=1.0,
-            random_state=42, n_jobs=-1
+            random_state=42, n_jobs=n_jobs
         ),
         X_scaled, y, "XGBoost", n_trials=5
     )
@@ -228,7 +237,7 @@ def main():
         xgb.XGBClassifier(
             n_estimators=100, max_depth=6, learning_rate=0.1,
             subsample=0.8, reg_alpha=0.1, reg_lambda=1.0,
-            random_state=42, n_jobs=-1
+            random_state=42, n_jobs=n_jobs
         ),
         X_scaled, y, "XGBoost"
     )
@@ -3,6 +3,12 @@ Shared utility functions for all comparison models
 """
 
 import json
+import os
+import sys
+
+# One core budget for the whole repo: Python Code/resource_scheduler.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Python Code'))
+from resource_scheduler import get_scheduler  # noqa: E402
 
 def load_domain_categories(filepath='../Python Code/domain_categories.json'):
     """
@@ -26,3 +32,7 @@ def load_domain_categories(filepath='../Python Code/domain_categories.json'):
 def get_label_name(label_int, unique_labels):
     """Convert integer label back to string name"""
     return unique_labels[label_int]
+
+def cpu_jobs(outer_tasks=1):
+    """Return (outer, inner) job counts from the shared scheduler (never oversubscribes the CPU)"""
+    return tuple(get_scheduler().allocate(outer_tasks))
@@ -15,6 +15,8 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 import warnings
 warnings.filterwarnings('ignore')
 
+from utils import cpu_jobs
+
 class XGBoostNetworkClassifier:
     def __init__(self):
         """
@@ -29,7 +31,7 @@ class XGBoostNetworkClassifier:
             reg_alpha=0.1,  # L1 regularization
             reg_lambda=1.0,  # L2 regularization
             random_state=42,
-            n_jobs=-1
+            n_jobs=cpu_jobs()[1]
         )
         self.vectorizer = TfidfVectorizer(max_features=1000)
         self.label_mapping = {